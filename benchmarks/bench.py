@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""Benchmark the relay and the socket server addon without Blender.
+
+The addon runs headless in a child process against the fake ``bpy`` and
+``bmesh`` in ``benchmarks/fake_blender``, and requests go through the real
+relay code: ``build_command`` (validation and binary decoding) and a
+``BlenderConnectionPool`` or ``BlenderConnection``. The relay needs its own
+dependencies (``mcp``) and numpy.
+
+    python benchmarks/bench.py                              # every scenario
+    python benchmarks/bench.py -s small_commands -s mesh_upload -n 2000
+    python benchmarks/bench.py --trace benchmarks/traces/basic.jsonl --json out.json
+
+Scenarios:
+
+- ``small_commands``: one client, one small command at a time (latency).
+- ``pipelined``: one connection with many commands in flight.
+- ``concurrent_clients``: several connections sending at once.
+- ``mesh_upload``: mesh_create_from_buffers with large binary buffers.
+- ``large_list``: scene_query pages over a scene with many objects.
+- ``bulk_animation``: object_transform_bulk and object_keyframes_bulk over
+  many objects and frames.
+- ``scatter``: scatter_instances of one object on many points, then
+  scatter_realize of a few of them.
+
+A trace is a JSON-lines file with one command per line,
+``{"tool_name": ..., "params": {...}}`` as sent by USE_COMMAND, with an
+optional ``"repeat"`` count. Binary parameters are given base64-encoded.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+FAKE_BLENDER = os.path.join(BENCH_DIR, "fake_blender", "blender.py")
+ADDON_PATH = os.path.join(REPO_DIR, "blender_mcp_socket_server.py")
+DEFAULT_PORT = 9899
+
+# Keep both processes' logs quiet unless asked otherwise.
+os.environ.setdefault("BLENDER_MCP_LOG_LEVEL", "WARNING")
+sys.path.insert(0, REPO_DIR)
+
+import blender_mcp_metrics as mcp_metrics  # noqa: E402
+import blender_mcp_stdio_relay as relay  # noqa: E402
+
+
+class Result:
+    """Client-side latencies and payload sizes for one scenario."""
+
+    def __init__(self, name):
+        self.name = name
+        self.latency = mcp_metrics.Histogram(window=1_000_000)
+        self.errors = 0
+        self.bytes_sent = 0
+        self.wall = 0.0
+        self.notes = {}
+
+    def report(self):
+        summary = self.latency.summary()
+        count = summary.pop("count")
+        return {
+            "scenario": self.name,
+            "requests": count,
+            "errors": self.errors,
+            "seconds": round(self.wall, 3),
+            "requests_per_s": round(count / self.wall, 1) if self.wall else 0.0,
+            "mb_sent_per_s": round(self.bytes_sent / self.wall / 1e6, 2) if self.wall else 0.0,
+            **summary,
+            **self.notes,
+        }
+
+
+async def timed(result, conn, command):
+    start = time.perf_counter()
+    try:
+        await conn.send_command(command)
+    except Exception:
+        result.errors += 1
+    result.latency.add(time.perf_counter() - start)
+
+
+# --- Addon process ---
+def start_addon(port):
+    env = dict(os.environ, BLENDER_MCP_PORT=str(port))
+    process = subprocess.Popen(
+        [sys.executable, FAKE_BLENDER, "--background", "--python", ADDON_PATH, "--", "--port", str(port), "--exit-with-parent"],
+        env=env, stdout=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Fake Blender exited with code {process.returncode}")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise TimeoutError("Fake Blender did not start listening within 30 seconds")
+
+
+def stop_addon(process):
+    process.terminate()
+    try:
+        process.wait(10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+# --- Scenarios ---
+def move_command(i):
+    return relay.build_command("object_set_location", {"object_name": "BenchTarget", "value": [i % 10, 0.0, 0.0]})
+
+
+async def setup_target(conn):
+    await conn.send_command({"type": "create_object", "params": {"shape": "cube", "name": "BenchTarget"}})
+
+
+async def small_commands(port, args):
+    result = Result("small_commands")
+    conn = relay.BlenderConnection(port=port)
+    await setup_target(conn)
+    start = time.perf_counter()
+    for i in range(args.iterations):
+        await timed(result, conn, move_command(i) if i % 2 else {"type": "test_connection"})
+    result.wall = time.perf_counter() - start
+    await conn.disconnect()
+    return result
+
+
+async def pipelined(port, args):
+    result = Result("pipelined")
+    result.notes["in_flight"] = args.window
+    conn = relay.BlenderConnection(port=port)
+    await setup_target(conn)
+    commands = iter(range(args.iterations))
+
+    async def lane():
+        for i in commands:
+            await timed(result, conn, move_command(i))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(lane() for _ in range(args.window)))
+    result.wall = time.perf_counter() - start
+    await conn.disconnect()
+    return result
+
+
+async def concurrent_clients(port, args):
+    result = Result("concurrent_clients")
+    result.notes["clients"] = args.clients
+    conns = [relay.BlenderConnection(port=port) for _ in range(args.clients)]
+    await setup_target(conns[0])
+    for conn in conns:
+        await conn.connect()
+    per_client = max(1, args.iterations // args.clients)
+
+    async def client(conn):
+        for i in range(per_client):
+            await timed(result, conn, move_command(i))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(conn) for conn in conns))
+    result.wall = time.perf_counter() - start
+    for conn in conns:
+        await conn.disconnect()
+    return result
+
+
+def grid_mesh(side):
+    """A side x side vertex grid as float32 positions and triangle indices."""
+    xs, ys = np.meshgrid(np.arange(side, dtype=np.float32), np.arange(side, dtype=np.float32))
+    vertices = np.stack([xs.ravel(), ys.ravel(), np.zeros(side * side, dtype=np.float32)], axis=1)
+    cells = np.arange(side * side, dtype=np.int32).reshape(side, side)[:-1, :-1].ravel()
+    quads = np.stack([cells, cells + 1, cells + side + 1, cells + side], axis=1)
+    triangles = np.concatenate([quads[:, [0, 1, 2]], quads[:, [0, 2, 3]]])
+    return vertices.reshape(-1), triangles.reshape(-1).astype(np.int32)
+
+
+async def mesh_upload(port, args):
+    result = Result("mesh_upload")
+    vertices, indices = grid_mesh(args.mesh_side)
+    payload = vertices.nbytes + indices.nbytes
+    result.notes["vertices"] = args.mesh_side ** 2
+    result.notes["mb_per_request"] = round(payload / 1e6, 2)
+    conn = relay.BlenderConnection(port=port)
+    start = time.perf_counter()
+    for i in range(args.uploads):
+        command = relay.build_command("mesh_create_from_buffers", {
+            "object_name": f"BenchGrid{i}",
+            "vertices": memoryview(vertices).cast("B"),
+            "indices": memoryview(indices).cast("B"),
+        })
+        await timed(result, conn, command)
+        result.bytes_sent += payload
+    result.wall = time.perf_counter() - start
+    await conn.send_command({"type": "object_delete", "params": {"object_names": [f"BenchGrid{i}" for i in range(args.uploads)]}})
+    await conn.disconnect()
+    return result
+
+
+async def large_list(port, args):
+    result = Result("large_list")
+    result.notes["objects"] = args.objects
+    conn = relay.BlenderConnection(port=port)
+    batch = [{"type": "create_object", "params": {"shape": "cube", "name": f"BenchList{i}", "location": [i, 0, 0]}} for i in range(args.objects)]
+    await conn.send_command({"type": "batch", "params": {"commands": batch, "mode": "continue_on_error"}})
+    fields = ["location", "rotation", "scale", "matrix_world"]
+    start = time.perf_counter()
+    for _ in range(args.pages):
+        cursor = 0
+        while cursor is not None:
+            command = relay.build_command("scene_query", {"cursor": cursor, "limit": args.page_size, "fields": fields})
+            t = time.perf_counter()
+            try:
+                response = await conn.send_command(command)
+                cursor = response.get("next_cursor")
+            except Exception:
+                result.errors += 1
+                cursor = None
+            result.latency.add(time.perf_counter() - t)
+    result.wall = time.perf_counter() - start
+    await conn.send_command({"type": "object_delete", "params": {"object_names": [f"BenchList{i}" for i in range(args.objects)]}})
+    await conn.disconnect()
+    return result
+
+
+async def bulk_animation(port, args):
+    result = Result("bulk_animation")
+    result.notes["objects"] = args.anim_objects
+    result.notes["frames"] = args.anim_frames
+    conn = relay.BlenderConnection(port=port)
+    names = [f"BenchAnim{i}" for i in range(args.anim_objects)]
+    batch = [{"type": "create_object", "params": {"shape": "cube", "name": name}} for name in names]
+    await conn.send_command({"type": "batch", "params": {"commands": batch, "mode": "continue_on_error"}})
+    rng = np.random.default_rng(0)
+    transforms = rng.random(args.anim_objects * 3, dtype=np.float32)
+    frames = np.arange(1, args.anim_frames + 1, dtype=np.float32)
+    track = rng.random(args.anim_objects * args.anim_frames * 3, dtype=np.float32)
+    commands = [
+        relay.build_command("object_transform_bulk", {"object_names": names, "locations": memoryview(transforms).cast("B")}),
+        relay.build_command("object_keyframes_bulk", {
+            "object_names": names,
+            "frames": memoryview(frames).cast("B"),
+            "locations": memoryview(track).cast("B"),
+            "replace": True,
+        }),
+    ]
+    start = time.perf_counter()
+    for command in commands:
+        await timed(result, conn, command)
+    result.wall = time.perf_counter() - start
+    result.bytes_sent = transforms.nbytes + frames.nbytes + track.nbytes
+    await conn.send_command({"type": "object_delete", "params": {"object_names": names}})
+    await conn.disconnect()
+    return result
+
+
+async def scatter(port, args):
+    result = Result("scatter")
+    result.notes["instances"] = args.scatter_points
+    conn = relay.BlenderConnection(port=port)
+    await setup_target(conn)
+    rng = np.random.default_rng(0)
+    points = (rng.random(args.scatter_points * 3, dtype=np.float32) * 100).astype(np.float32)
+    rotations = rng.random(args.scatter_points * 3, dtype=np.float32)
+    start = time.perf_counter()
+    await timed(result, conn, relay.build_command("scatter_instances", {
+        "object_name": "BenchScatter",
+        "source_object": "BenchTarget",
+        "points": memoryview(points).cast("B"),
+        "rotations": memoryview(rotations).cast("B"),
+    }))
+    await timed(result, conn, relay.build_command("scatter_realize", {"object_name": "BenchScatter", "indices": list(range(0, args.scatter_points, max(1, args.scatter_points // 100)))}))
+    result.wall = time.perf_counter() - start
+    result.bytes_sent = points.nbytes + rotations.nbytes
+    await conn.send_command({"type": "object_delete", "params": {"object_names": ["BenchScatter"]}})
+    await conn.disconnect()
+    return result
+
+
+async def replay_trace(port, args):
+    result = Result(f"trace:{os.path.basename(args.trace)}")
+    commands = []
+    with open(args.trace, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            entry = json.loads(line)
+            command = relay.build_command(entry["tool_name"], entry.get("params"))
+            commands.extend([command] * int(entry.get("repeat", 1)))
+    pool = relay.BlenderConnectionPool(port=port, size=args.clients)
+    start = time.perf_counter()
+    for command in commands:
+        await timed(result, pool, command)
+    result.wall = time.perf_counter() - start
+    await pool.close()
+    return result
+
+
+SCENARIOS = {
+    "small_commands": small_commands,
+    "pipelined": pipelined,
+    "concurrent_clients": concurrent_clients,
+    "mesh_upload": mesh_upload,
+    "large_list": large_list,
+    "bulk_animation": bulk_animation,
+    "scatter": scatter,
+}
+
+
+# --- Report ---
+COLUMNS = ("scenario", "requests", "errors", "requests_per_s", "mb_sent_per_s", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms")
+
+
+def print_table(rows):
+    widths = [max(len(column), *(len(str(row.get(column, ""))) for row in rows)) for column in COLUMNS]
+    print("  ".join(column.ljust(width) for column, width in zip(COLUMNS, widths)))
+    for row in rows:
+        print("  ".join(str(row.get(column, "")).ljust(width) for column, width in zip(COLUMNS, widths)))
+
+
+async def run(args):
+    process = start_addon(args.port)
+    try:
+        names = args.scenario or ([] if args.trace else list(SCENARIOS))
+        rows = []
+        for name in names:
+            rows.append((await SCENARIOS[name](args.port, args)).report())
+        if args.trace:
+            rows.append((await replay_trace(args.port, args)).report())
+        report = {"scenarios": rows}
+        if args.server_stats:
+            conn = relay.BlenderConnection(port=args.port)
+            report["server"] = (await conn.send_command({"type": "stats", "params": {}}))["result"]
+            await conn.disconnect()
+    finally:
+        stop_addon(process)
+    print_table(rows)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-s", "--scenario", action="append", choices=sorted(SCENARIOS), help="Scenario to run (repeatable; default all).")
+    parser.add_argument("--trace", help="JSON-lines trace of tool calls to replay.")
+    parser.add_argument("-n", "--iterations", type=int, default=1000, help="Requests per small-command scenario.")
+    parser.add_argument("--window", type=int, default=16, help="Requests in flight for the pipelined scenario.")
+    parser.add_argument("--clients", type=int, default=4, help="Connections for concurrent_clients and trace replay.")
+    parser.add_argument("--mesh-side", type=int, default=500, help="Grid side for mesh_upload (side^2 vertices).")
+    parser.add_argument("--uploads", type=int, default=10, help="Meshes sent by mesh_upload.")
+    parser.add_argument("--objects", type=int, default=5000, help="Scene size for large_list.")
+    parser.add_argument("--page-size", type=int, default=1000, help="scene_query page size for large_list.")
+    parser.add_argument("--pages", type=int, default=5, help="Full passes over the scene for large_list.")
+    parser.add_argument("--anim-objects", type=int, default=5000, help="Objects animated by bulk_animation.")
+    parser.add_argument("--anim-frames", type=int, default=500, help="Keyframes per F-curve for bulk_animation.")
+    parser.add_argument("--scatter-points", type=int, default=100000, help="Instances placed by the scatter scenario.")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--server-stats", action="store_true", help="Include the addon's per-phase stats in the JSON report.")
+    parser.add_argument("--json", help="Also write the report to this file.")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""Run a script the way ``blender --background --python <script> -- <args>`` would.
+
+The fake ``bpy`` and ``bmesh`` modules next to this file are imported in
+place of Blender's, so the socket server addon can run headless on a plain
+Python install:
+
+    python benchmarks/fake_blender/blender.py --background --python blender_mcp_socket_server.py -- --port 9880
+
+The file is executable, so it can also stand in for Blender in the relay's
+worker pool via BLENDER_PATH.
+"""
+import os
+import runpy
+import sys
+
+FAKE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def main(argv):
+    if "--python" not in argv or argv.index("--python") + 1 >= len(argv):
+        sys.exit("usage: blender.py [--background] [--factory-startup] --python SCRIPT [-- ARGS...]")
+    script = argv[argv.index("--python") + 1]
+    sys.path.insert(0, FAKE_DIR)
+    sys.argv = ["blender"] + argv
+    runpy.run_path(script, run_name="__main__")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
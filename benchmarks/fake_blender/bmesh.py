@@ -0,0 +1,35 @@
+"""Minimal stand-in for Blender's ``bmesh`` module (see bpy.py)."""
+import types as _types
+
+import numpy as np
+
+
+class BMesh:
+    def __init__(self):
+        self.vertices = np.zeros((0, 3), dtype=np.float32)
+
+    def to_mesh(self, mesh):
+        mesh.vertices.add(len(self.vertices))
+        mesh.vertices.foreach_set("co", self.vertices.reshape(-1))
+
+    def free(self):
+        self.vertices = None
+
+
+def new():
+    return BMesh()
+
+
+def _primitive(vertex_count):
+    def create(bm, **_kwargs):
+        bm.vertices = np.zeros((vertex_count, 3), dtype=np.float32)
+        return {"verts": []}
+    return create
+
+
+ops = _types.SimpleNamespace(
+    create_cube=_primitive(8),
+    create_uvsphere=_primitive(482),
+    create_cone=_primitive(33),
+    create_grid=_primitive(4),
+)
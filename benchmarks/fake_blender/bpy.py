@@ -0,0 +1,557 @@
+"""Minimal stand-in for Blender's ``bpy`` module.
+
+It implements just enough of the data API for the socket server addon to
+import and serve its hot paths on a plain Python install: datablock
+collections, meshes whose element arrays live in numpy buffers behind
+``foreach_set``/``foreach_get``, objects with transforms, and a scene.
+Operators are no-ops and timers never fire, as in ``blender --background``,
+so the addon's headless loop drives the executor. Nothing here is meant to
+match Blender's timings; it only keeps bpy from dominating the numbers.
+"""
+import contextlib
+import itertools
+import types as _types
+
+import numpy as np
+
+_session_uids = itertools.count(1)
+
+
+class ID:
+    id_type = "ID"
+
+    def __init__(self, name):
+        self.name = name
+        self.users = 0
+        self.session_uid = next(_session_uids)
+        self.library = None
+        self._props = {}
+
+    @property
+    def original(self):
+        return self
+
+    def __getitem__(self, key):
+        return self._props[key]
+
+    def __setitem__(self, key, value):
+        self._props[key] = value
+
+    def __delitem__(self, key):
+        del self._props[key]
+
+    def __contains__(self, key):
+        return key in self._props
+
+    def get(self, key, default=None):
+        return self._props.get(key, default)
+
+    def copy(self):
+        clone = type(self).__new__(type(self))
+        clone.__dict__.update({key: type(value)(value) if isinstance(value, list) else value for key, value in self.__dict__.items()})
+        clone._props = dict(self._props)
+        clone.session_uid = next(_session_uids)
+        clone.users = 0
+        return clone
+
+
+class _Elements:
+    """Vertex/edge/loop/polygon arrays; attributes are flat numpy buffers."""
+
+    def __init__(self):
+        self._count = 0
+        self._attributes = {}
+
+    def __len__(self):
+        return self._count
+
+    def add(self, count):
+        self._count += count
+
+    def foreach_set(self, attr, seq):
+        self._attributes[attr] = np.array(seq, copy=True).reshape(-1)
+
+    def foreach_get(self, attr, seq):
+        data = self._attributes.get(attr)
+        if data is None:
+            seq[:] = 0
+        else:
+            seq[:] = data[:len(seq)]
+
+
+class _UVLayer:
+    def __init__(self, name):
+        self.name = name
+        self.data = _Elements()
+
+
+class _UVLayers(list):
+    active = None
+
+    def new(self, name="UVMap"):
+        layer = _UVLayer(name)
+        self.append(layer)
+        self.active = self.active or layer
+        return layer
+
+    def get(self, name, default=None):
+        return next((layer for layer in self if layer.name == name), default)
+
+
+class _Attributes(dict):
+    def new(self, name, type, domain):
+        attribute = _types.SimpleNamespace(name=name, data_type=type, domain=domain, data=_Elements())
+        self[name] = attribute
+        return attribute
+
+
+class Mesh(ID):
+    id_type = "MESH"
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.vertices = _Elements()
+        self.edges = _Elements()
+        self.loops = _Elements()
+        self.polygons = _Elements()
+        self.uv_layers = _UVLayers()
+        self.attributes = _Attributes()
+        self.materials = []
+
+    def clear_geometry(self):
+        self.vertices = _Elements()
+        self.edges = _Elements()
+        self.loops = _Elements()
+        self.polygons = _Elements()
+        self.attributes = _Attributes()
+
+    def update(self, calc_edges=False, **_kwargs):
+        pass
+
+    def validate(self, **_kwargs):
+        return False
+
+    def normals_split_custom_set(self, normals):
+        pass
+
+    def normals_split_custom_set_from_vertices(self, normals):
+        pass
+
+    def shade_smooth(self):
+        pass
+
+    def shade_flat(self):
+        pass
+
+
+class _KeyframePoints(_Elements):
+    def clear(self):
+        self._count = 0
+        self._attributes.clear()
+
+
+class FCurve:
+    def __init__(self, data_path, index=0, action_group=""):
+        self.data_path = data_path
+        self.array_index = index
+        self.group = action_group
+        self.keyframe_points = _KeyframePoints()
+
+    def update(self):
+        pass
+
+
+class _FCurves(list):
+    def new(self, data_path, index=0, action_group=""):
+        fcurve = FCurve(data_path, index, action_group)
+        self.append(fcurve)
+        return fcurve
+
+    def find(self, data_path, index=0):
+        return next((f for f in self if f.data_path == data_path and f.array_index == index), None)
+
+
+class Action(ID):
+    id_type = "ACTION"
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.fcurves = _FCurves()
+
+
+class _Sockets(dict):
+    def __missing__(self, name):
+        socket = self[name] = _types.SimpleNamespace(name=name, default_value=None)
+        return socket
+
+
+class _Node:
+    def __init__(self, type):
+        self.type = type
+        self.inputs = _Sockets()
+        self.outputs = _Sockets()
+
+
+class _Nodes(list):
+    def new(self, type):
+        node = _Node(type)
+        self.append(node)
+        return node
+
+
+class _Links(list):
+    def new(self, from_socket, to_socket):
+        link = _types.SimpleNamespace(from_socket=from_socket, to_socket=to_socket)
+        self.append(link)
+        return link
+
+
+class _Interface:
+    def __init__(self):
+        self.items_tree = {}
+
+    def new_socket(self, name, in_out="INPUT", socket_type="NodeSocketFloat"):
+        socket = _types.SimpleNamespace(name=name, in_out=in_out, socket_type=socket_type, identifier=f"Socket_{len(self.items_tree)}")
+        self.items_tree.setdefault(name, socket)
+        return socket
+
+
+class NodeTree(ID):
+    id_type = "NODETREE"
+
+    def __init__(self, name, type="GeometryNodeTree"):
+        super().__init__(name)
+        self.bl_idname = type
+        self.nodes = _Nodes()
+        self.links = _Links()
+        self.interface = _Interface()
+
+
+class _Modifier(_types.SimpleNamespace):
+    """Modifier whose node-group inputs are set by item, like ``modifier["Socket_1"]``."""
+
+    def __setitem__(self, key, value):
+        self.__dict__.setdefault("_inputs", {})[key] = value
+
+    def __getitem__(self, key):
+        return self.__dict__.get("_inputs", {})[key]
+
+
+class _Modifiers(list):
+    def new(self, name, type):
+        modifier = _Modifier(name=name, type=type, node_group=None)
+        self.append(modifier)
+        return modifier
+
+
+class _Matrix:
+    def identity(self):
+        pass
+
+
+class Object(ID):
+    id_type = "OBJECT"
+
+    def __init__(self, name, object_data=None):
+        super().__init__(name)
+        self.data = object_data
+        if object_data is None:
+            self.type = "EMPTY"
+        else:
+            self.type = getattr(object_data, "id_type", "MESH")
+            object_data.users += 1
+        self.location = [0.0, 0.0, 0.0]
+        self.rotation_euler = [0.0, 0.0, 0.0]
+        self.scale = [1.0, 1.0, 1.0]
+        self.dimensions = [2.0, 2.0, 2.0]
+        self.matrix_world = [1.0, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 0.0, 1.0]
+        self.modifiers = _Modifiers()
+        self.material_slots = []
+        self.users_collection = []
+        self.hide_viewport = False
+        self.hide_render = False
+        self.animation_data = None
+        self.parent = None
+        self.matrix_parent_inverse = _Matrix()
+        self.instance_type = "NONE"
+        self.instance_collection = None
+        self.mode = "OBJECT"
+
+    def select_set(self, state):
+        pass
+
+    def update_tag(self, refresh=None):
+        pass
+
+    def animation_data_create(self):
+        self.animation_data = _types.SimpleNamespace(action=None)
+        return self.animation_data
+
+
+class _ObjectList(list):
+    """A collection's objects; supports the ``foreach_get`` used by scene queries."""
+
+    def link(self, obj):
+        self.append(obj)
+        obj.users += 1
+
+    def unlink(self, obj):
+        self.remove(obj)
+        obj.users -= 1
+
+    def foreach_get(self, attr, seq):
+        if self:
+            seq[:] = np.asarray([getattr(obj, attr) for obj in self], dtype=np.float32).reshape(-1)
+
+
+class Collection(ID):
+    id_type = "COLLECTION"
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.objects = _ObjectList()
+        self.children = _ObjectList()
+
+    @property
+    def all_objects(self):
+        return self.objects
+
+
+class Image(ID):
+    id_type = "IMAGE"
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.filepath = ""
+        self.packed_file = None
+
+    def pack(self):
+        with open(self.filepath, "rb") as f:
+            self.packed_file = _types.SimpleNamespace(data=f.read())
+
+
+class BlendDataCollection:
+    """``bpy.data.<collection>``: datablocks by unique name."""
+
+    def __init__(self, cls=ID, id_type="ID"):
+        self._cls = cls
+        self._id_type = id_type
+        self._items = {}
+
+    def __iter__(self):
+        return iter(list(self._items.values()))
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, name):
+        return name in self._items
+
+    def __getitem__(self, name):
+        return self._items[name]
+
+    def get(self, name, default=None):
+        return self._items.get(name, default)
+
+    def keys(self):
+        return self._items.keys()
+
+    def values(self):
+        return self._items.values()
+
+    def find(self, name):
+        return list(self._items).index(name) if name in self._items else -1
+
+    def foreach_get(self, attr, seq):
+        if self._items:
+            seq[:] = np.asarray([getattr(block, attr) for block in self._items.values()], dtype=np.float32).reshape(-1)
+
+    def foreach_set(self, attr, seq):
+        blocks = list(self._items.values())
+        if blocks:
+            for block, value in zip(blocks, np.asarray(seq).reshape(len(blocks), -1).tolist()):
+                setattr(block, attr, value)
+
+    def _unique(self, name):
+        base, n = name, 1
+        while name in self._items:
+            name = "%s.%03d" % (base, n)
+            n += 1
+        return name
+
+    def new(self, name, *args, **kwargs):
+        block = self._cls(self._unique(name), *args) if self._cls is not ID else self._cls(self._unique(name))
+        if self._cls is ID:
+            block.id_type = self._id_type
+        for key, value in kwargs.items():
+            setattr(block, key, value)
+        self._items[block.name] = block
+        return block
+
+    def load(self, filepath, check_existing=False):
+        block = self.new(filepath.replace("\\", "/").rsplit("/", 1)[-1])
+        block.filepath = filepath
+        return block
+
+    def remove(self, block, do_unlink=True):
+        self._items.pop(block.name, None)
+        if isinstance(block, Object):
+            for coll in [scene_collection] + list(data.collections):
+                if block in coll.objects:
+                    coll.objects.unlink(block)
+            if block.data is not None:
+                block.data.users -= 1
+
+
+class _BlendData:
+    """``bpy.data``; collections the addon does not create explicitly appear on first use."""
+
+    def __init__(self):
+        self.objects = BlendDataCollection(Object)
+        self.meshes = BlendDataCollection(Mesh)
+        self.collections = BlendDataCollection(Collection)
+        self.actions = BlendDataCollection(Action)
+        self.node_groups = BlendDataCollection(NodeTree)
+        self.images = BlendDataCollection(Image)
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        collection = BlendDataCollection(ID, name.rstrip("s").upper())
+        setattr(self, name, collection)
+        return collection
+
+
+data = _BlendData()
+scene_collection = Collection("Scene Collection")
+
+
+class _Render(_types.SimpleNamespace):
+    def frame_path(self, frame=None):
+        return f"{self.filepath}{frame:04d}.png"
+
+
+class Scene(ID):
+    id_type = "SCENE"
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.collection = scene_collection
+        self.render = _Render(
+            engine="BLENDER_EEVEE", filepath="/tmp/", resolution_x=1920, resolution_y=1080,
+            resolution_percentage=100, use_border=False, use_crop_to_border=False,
+            border_min_x=0.0, border_max_x=1.0, border_min_y=0.0, border_max_y=1.0,
+            image_settings=_types.SimpleNamespace(file_format="PNG"),
+        )
+        self.world = None
+        self.camera = None
+        self.use_nodes = False
+        self.node_tree = None
+        self.frame_current = 1
+        self.frame_start = 1
+        self.frame_end = 250
+
+    @property
+    def objects(self):
+        return self.collection.objects
+
+    def frame_set(self, frame):
+        self.frame_current = frame
+
+
+_scene = Scene("Scene")
+data.scenes._items[_scene.name] = _scene
+
+
+@contextlib.contextmanager
+def _temp_override(**_kwargs):
+    yield
+
+
+context = _types.SimpleNamespace(
+    scene=_scene,
+    view_layer=_types.SimpleNamespace(objects=_types.SimpleNamespace(active=None), update=lambda: None),
+    window=None,
+    window_manager=_types.SimpleNamespace(windows=[]),
+    screen=None,
+    region=None,
+    region_data=None,
+    active_object=None,
+    selected_objects=[],
+    tool_settings=_types.SimpleNamespace(sculpt=None),
+    temp_override=_temp_override,
+)
+
+
+class _Operator:
+    """Any ``bpy.ops`` path; calling it does nothing and reports success."""
+
+    def __init__(self, path="bpy.ops"):
+        self._path = path
+
+    def __getattr__(self, name):
+        return _Operator(f"{self._path}.{name}")
+
+    def __call__(self, *args, **kwargs):
+        return {"FINISHED"}
+
+
+ops = _Operator()
+
+
+class _Timers:
+    """Timers are registered but never fire, as in background mode."""
+
+    def __init__(self):
+        self._registered = set()
+
+    def register(self, function, first_interval=0.0, persistent=False):
+        self._registered.add(function)
+
+    def unregister(self, function):
+        self._registered.discard(function)
+
+    def is_registered(self, function):
+        return function in self._registered
+
+
+def _persistent(function):
+    return function
+
+
+app = _types.SimpleNamespace(
+    version=(4, 2, 0),
+    background=True,
+    timers=_Timers(),
+    handlers=_types.SimpleNamespace(
+        persistent=_persistent,
+        depsgraph_update_post=[], load_post=[], render_pre=[], render_post=[],
+        render_stats=[], render_complete=[], render_cancel=[],
+    ),
+)
+
+
+class Panel:
+    pass
+
+
+class Operator:
+    pass
+
+
+class SpaceView3D:
+    @staticmethod
+    def draw_handler_add(*args):
+        return object()
+
+    @staticmethod
+    def draw_handler_remove(*args):
+        pass
+
+
+types = _types.SimpleNamespace(
+    ID=ID, Object=Object, Mesh=Mesh, Scene=Scene, Collection=Collection, Action=Action, NodeTree=NodeTree,
+    Panel=Panel, Operator=Operator, SpaceView3D=SpaceView3D,
+)
+utils = _types.SimpleNamespace(register_class=lambda cls: None, unregister_class=lambda cls: None)
+path = _types.SimpleNamespace(abspath=lambda filepath: filepath)
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""Measure how long the relay takes to answer its first MCP requests.
+
+MCP clients start a relay process per session, so its cold start is paid on
+every connection. Each run spawns ``blender_mcp_stdio_relay.py`` with no
+Blender listening and times, from process start, the responses to
+``initialize`` and the first ``tools/list``.
+
+    python benchmarks/startup.py                  # warm spec cache
+    python benchmarks/startup.py --cold -r 5      # spec cache disabled
+    python benchmarks/startup.py --max-ms 1500    # exit 1 when slower
+    python benchmarks/startup.py --importtime     # slowest imports of one run
+"""
+import argparse
+import json
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+RELAY_PATH = os.path.join(REPO_DIR, "blender_mcp_stdio_relay.py")
+PROTOCOL_VERSION = "2024-11-05"
+
+
+def unused_port():
+    with socket.socket() as sock:
+        sock.bind(("localhost", 0))
+        return sock.getsockname()[1]
+
+
+def rpc(method, request_id=None, params=None):
+    message = {"jsonrpc": "2.0", "method": method}
+    if request_id is not None:
+        message["id"] = request_id
+    if params is not None:
+        message["params"] = params
+    return (json.dumps(message) + "\n").encode()
+
+
+def read_response(proc, request_id):
+    while True:
+        line = proc.stdout.readline()
+        if not line:
+            raise RuntimeError(f"relay exited with code {proc.wait()} before answering request {request_id}")
+        message = json.loads(line)
+        if message.get("id") == request_id:
+            if "error" in message:
+                raise RuntimeError(f"request {request_id} failed: {message['error']}")
+            return message["result"]
+
+
+def start_relay(args, extra_env=None):
+    env = dict(os.environ, BLENDER_MCP_PORT=str(unused_port()), BLENDER_MCP_LOG_LEVEL="WARNING")
+    if args.cold:
+        env["BLENDER_MCP_SPEC_CACHE"] = ""
+    env.update(extra_env or {})
+    return subprocess.Popen(
+        [sys.executable, RELAY_PATH], cwd=REPO_DIR, env=env,
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE if extra_env else subprocess.DEVNULL,
+    )
+
+
+def measure(args):
+    """Return (initialize, tools/list) times in milliseconds for one relay process."""
+    started = time.perf_counter()
+    proc = start_relay(args)
+    try:
+        proc.stdin.write(rpc("initialize", 1, {
+            "protocolVersion": PROTOCOL_VERSION,
+            "capabilities": {},
+            "clientInfo": {"name": "startup-bench", "version": "1"},
+        }))
+        proc.stdin.flush()
+        read_response(proc, 1)
+        initialized = time.perf_counter()
+        proc.stdin.write(rpc("notifications/initialized") + rpc("tools/list", 2))
+        proc.stdin.flush()
+        tools = read_response(proc, 2)["tools"]
+        listed = time.perf_counter()
+    finally:
+        proc.stdin.close()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+    return (initialized - started) * 1000, (listed - started) * 1000, len(tools)
+
+
+def import_times(args, top):
+    """Return the ``top`` slowest imports (cumulative microseconds) of one relay start."""
+    proc = start_relay(args, {"PYTHONPROFILEIMPORTTIME": "1"})
+    _, stderr = proc.communicate(b"", timeout=30)
+    rows = []
+    for line in stderr.decode(errors="replace").splitlines():
+        match = re.match(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)", line)
+        if match:
+            rows.append((int(match.group(2)), len(match.group(3)) // 2, match.group(4)))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-r", "--runs", type=int, default=10, help="Relay processes to start.")
+    parser.add_argument("--cold", action="store_true", help="Disable the spec cache (BLENDER_MCP_SPEC_CACHE='').")
+    parser.add_argument("--max-ms", type=float, help="Fail when the median time to answer tools/list exceeds this.")
+    parser.add_argument("--importtime", type=int, nargs="?", const=15, metavar="N", help="Also list the N slowest imports.")
+    parser.add_argument("--json", help="Also write the report to this file.")
+    args = parser.parse_args()
+
+    measure(args)  # populate the spec cache and the OS file cache
+    samples = [measure(args) for _ in range(args.runs)]
+    report = {"runs": args.runs, "spec_cache": not args.cold, "tools": samples[0][2]}
+    for index, name in ((0, "initialize"), (1, "tools_list")):
+        values = [sample[index] for sample in samples]
+        report[name] = {"min_ms": round(min(values), 1), "median_ms": round(statistics.median(values), 1), "max_ms": round(max(values), 1)}
+        print(f"{name:<12} min {report[name]['min_ms']:8.1f} ms  median {report[name]['median_ms']:8.1f} ms  max {report[name]['max_ms']:8.1f} ms")
+    print(f"{report['tools']} tools, {args.runs} runs, spec cache {'off' if args.cold else 'on'}")
+
+    if args.importtime:
+        report["imports"] = []
+        print("\nslowest imports (cumulative):")
+        for cumulative, depth, module in import_times(args, args.importtime):
+            report["imports"].append({"module": module, "depth": depth, "ms": round(cumulative / 1000, 1)})
+            print(f"  {cumulative / 1000:8.1f} ms  {'  ' * depth}{module}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.max_ms is not None and report["tools_list"]["median_ms"] > args.max_ms:
+        print(f"tools/list median {report['tools_list']['median_ms']} ms exceeds --max-ms {args.max_ms}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
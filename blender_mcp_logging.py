@@ -0,0 +1,188 @@
+"""Queue-backed logging shared by the Blender MCP relay and the socket server addon.
+
+Callers only format the message and put the record on a queue; a listener
+thread writes it to a size-rotated file (and optionally a stream), so no
+file I/O happens on the request path.
+
+Command and response payloads are wrapped in ``Payload``, which renders a
+bounded summary only when the record is actually emitted: binary values
+become their size and CRC, long strings and lists are cut short. Chatty
+commands (pings, polls, upload chunks) are sampled so only one in N of
+their records is kept.
+"""
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import zlib
+
+FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+DEFAULT_LEVEL = os.environ.get("BLENDER_MCP_LOG_LEVEL", "INFO").upper()
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_BACKUP_COUNT = 3
+MAX_STRING = 200  # characters kept from a string value
+MAX_ITEMS = 20  # items kept from a list or dict
+MAX_DEPTH = 6
+BINARY_TYPES = (bytes, bytearray, memoryview)
+
+# Keep one in N records for commands that are issued at a high rate
+DEFAULT_SAMPLE_EVERY = {
+    "test_connection": 100,
+    "job_status": 20,
+    "render_job_status": 20,
+    "changes_since": 20,
+    "chunked_upload_chunk": 50,
+    "chunked_upload_status": 20,
+}
+
+_listeners = {}
+_setup_lock = threading.Lock()
+
+
+def _summarize_binary(value):
+    view = memoryview(value).cast("B")
+    return f"<{view.nbytes} bytes crc32={zlib.crc32(view):08x}>"
+
+
+def summarize(value, max_string=MAX_STRING, max_items=MAX_ITEMS, depth=MAX_DEPTH):
+    """Return a copy of ``value`` that is cheap to format.
+
+    Binary data and base64 fields are replaced by their size and checksum,
+    strings longer than ``max_string`` and containers longer than
+    ``max_items`` are truncated with a note of how much was dropped.
+    """
+    if isinstance(value, BINARY_TYPES):
+        return _summarize_binary(value)
+    if isinstance(value, str):
+        if len(value) <= max_string:
+            return value
+        return f"{value[:max_string]}...<+{len(value) - max_string} chars>"
+    if depth <= 0 and isinstance(value, (dict, list, tuple)):
+        return f"<{type(value).__name__} of {len(value)}>"
+    if isinstance(value, dict):
+        if len(value) == 1 and "$b64" in value and isinstance(value["$b64"], str):
+            return f"<base64 {len(value['$b64'])} chars>"
+        out = {}
+        for i, (key, item) in enumerate(value.items()):
+            if i == max_items:
+                out["..."] = f"<+{len(value) - max_items} keys>"
+                break
+            out[key] = summarize(item, max_string, max_items, depth - 1)
+        return out
+    if isinstance(value, (list, tuple)):
+        out = [summarize(item, max_string, max_items, depth - 1) for item in value[:max_items]]
+        if len(value) > max_items:
+            out.append(f"<+{len(value) - max_items} items>")
+        return out
+    return value
+
+
+class Payload:
+    """Lazily summarized message body for ``%s`` log arguments."""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __str__(self):
+        return str(summarize(self.value))
+
+
+class SamplingFilter(logging.Filter):
+    """Pass one in N records whose ``command`` extra is listed in ``sample_every``.
+
+    Warnings and errors are always kept.
+    """
+
+    def __init__(self, sample_every=None):
+        super().__init__()
+        self.sample_every = dict(DEFAULT_SAMPLE_EVERY if sample_every is None else sample_every)
+        self._counts = {}
+
+    def filter(self, record):
+        command = getattr(record, "command", None)
+        every = self.sample_every.get(command) if command else None
+        if not every or every <= 1 or record.levelno >= logging.WARNING:
+            return True
+        count = self._counts.get(command, 0)
+        self._counts[command] = count + 1
+        return count % every == 0
+
+
+def setup(name, path, level=DEFAULT_LEVEL, stream=None, max_bytes=DEFAULT_MAX_BYTES,
+          backup_count=DEFAULT_BACKUP_COUNT, sample_every=None):
+    """Route logger ``name`` through a queue to a rotating file at ``path``.
+
+    Calling it again for the same name returns the already configured logger.
+    """
+    logger = logging.getLogger(name)
+    with _setup_lock:
+        if name in _listeners:
+            return logger
+        file_handler = logging.handlers.RotatingFileHandler(
+            path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8", delay=True,
+        )
+        handlers = [file_handler]
+        if stream is not None:
+            handlers.append(logging.StreamHandler(stream))
+        formatter = logging.Formatter(FORMAT)
+        for handler in handlers:
+            handler.setFormatter(formatter)
+        records = queue.SimpleQueue()
+        queue_handler = logging.handlers.QueueHandler(records)
+        queue_handler.addFilter(SamplingFilter(sample_every))
+        listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+        listener.start()
+        _listeners[name] = listener
+        logger.addHandler(queue_handler)
+        logger.setLevel(level)
+        logger.propagate = False
+    atexit.register(shutdown, name)
+    return logger
+
+
+def shutdown(name):
+    """Flush queued records for logger ``name`` and stop its writer thread."""
+    with _setup_lock:
+        listener = _listeners.pop(name, None)
+    if listener is None:
+        return
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
+    logger = logging.getLogger(name)
+    for handler in list(logger.handlers):
+        if isinstance(handler, logging.handlers.QueueHandler):
+            logger.removeHandler(handler)
+
+
+def _sampling_filter(logger):
+    for handler in logger.handlers:
+        for f in handler.filters:
+            if isinstance(f, SamplingFilter):
+                return f
+    return None
+
+
+def configure(name, level=None, sample_every=None):
+    """Change the level and sampling rates of logger ``name`` at runtime.
+
+    ``sample_every`` maps command names to N; N of 1 or less logs every call.
+    Returns the resulting configuration.
+    """
+    logger = logging.getLogger(name)
+    if level is not None:
+        if logging.getLevelName(str(level).upper()) not in (logging.DEBUG, logging.INFO, logging.WARNING, logging.ERROR, logging.CRITICAL):
+            raise ValueError(f"Unknown log level: {level}")
+        logger.setLevel(str(level).upper())
+    sampler = _sampling_filter(logger)
+    if sample_every and sampler is not None:
+        for command, every in sample_every.items():
+            sampler.sample_every[command] = max(1, int(every))
+    return {
+        "level": logging.getLevelName(logger.getEffectiveLevel()),
+        "sample_every": dict(sampler.sample_every) if sampler is not None else {},
+    }
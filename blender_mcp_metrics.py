@@ -0,0 +1,102 @@
+"""Per-command latency, throughput and payload metrics for the relay and the addon.
+
+Each command keeps call and error counters, byte totals, and one latency
+histogram per phase (queue wait, execution, encode, transfer, ...). A
+histogram holds exact count, mean and max, and computes percentiles over a
+window of the most recent samples so recording stays O(1).
+"""
+import collections
+import threading
+import time
+
+WINDOW = 2048  # recent samples kept per histogram for percentiles
+PERCENTILES = (50, 95, 99)
+
+
+class Histogram:
+    __slots__ = ("count", "total", "max", "samples")
+
+    def __init__(self, window=WINDOW):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = collections.deque(maxlen=window)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.samples.append(seconds)
+
+    def summary(self):
+        """Return count and latencies in milliseconds."""
+        ordered = sorted(self.samples)
+        out = {"count": self.count, "mean_ms": round(self.total / self.count * 1000, 3) if self.count else 0.0}
+        for q in PERCENTILES:
+            value = ordered[min(len(ordered) - 1, round(q / 100 * (len(ordered) - 1)))] if ordered else 0.0
+            out[f"p{q}_ms"] = round(value * 1000, 3)
+        out["max_ms"] = round(self.max * 1000, 3)
+        return out
+
+
+class CommandMetrics:
+    """Thread-safe registry of per-command counters and phase histograms."""
+
+    def __init__(self, window=WINDOW):
+        self.window = window
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._commands = {}
+
+    def _entry(self, command):
+        entry = self._commands.get(command)
+        if entry is None:
+            entry = self._commands[command] = {"calls": 0, "errors": 0, "bytes_in": 0, "bytes_out": 0, "phases": {}}
+        return entry
+
+    def observe(self, command, phase, seconds):
+        with self._lock:
+            phases = self._entry(command)["phases"]
+            histogram = phases.get(phase)
+            if histogram is None:
+                histogram = phases[phase] = Histogram(self.window)
+            histogram.add(seconds)
+
+    def count(self, command, ok=True):
+        with self._lock:
+            entry = self._entry(command)
+            entry["calls"] += 1
+            if not ok:
+                entry["errors"] += 1
+
+    def add_bytes(self, command, received=0, sent=0):
+        with self._lock:
+            entry = self._entry(command)
+            entry["bytes_in"] += received
+            entry["bytes_out"] += sent
+
+    def snapshot(self, command=None):
+        uptime = time.time() - self.started_at
+        with self._lock:
+            names = [command] if command is not None else sorted(self._commands, key=str)
+            commands = {}
+            for name in names:
+                entry = self._commands.get(name)
+                if entry is None:
+                    continue
+                commands[name] = {
+                    "calls": entry["calls"],
+                    "errors": entry["errors"],
+                    "bytes_in": entry["bytes_in"],
+                    "bytes_out": entry["bytes_out"],
+                    "phases": {phase: h.summary() for phase, h in entry["phases"].items()},
+                }
+        for entry in commands.values():
+            entry["calls_per_s"] = round(entry["calls"] / uptime, 3) if uptime else 0.0
+        return {"uptime": round(uptime, 1), "commands": commands}
+
+    def reset(self):
+        with self._lock:
+            self._commands.clear()
+            self.started_at = time.time()
@@ -0,0 +1,377 @@
+"""Wire protocol shared by the Blender MCP relay and the socket server addon.
+
+Framed messages carry a fixed 12-byte header followed by the payload:
+
+    magic (2s) | version (B) | flags (B) | request_id (I) | length (I)
+
+The payload is one document in the connection's codec: compact JSON by
+default, or orjson / msgpack when both peers have them installed. When
+``FLAG_BLOBS`` is set, the payload instead starts with the document length
+(I), and raw binary attachments follow the document. ``bytes``-like values
+in a message are sent as attachments and referenced from the document as
+``{"$blob": [offset, length]}``; on receipt they come back as zero-copy
+``memoryview`` slices of the payload. msgpack carries binary natively and
+needs no attachments. ``FLAG_COMPRESSED`` marks a zlib-compressed payload;
+a peer asks for compression of messages above a size threshold.
+
+Framing, codec and compression are negotiated per connection with a
+bare-JSON ``hello`` command; peers that never send one keep talking bare
+JSON, which is still parsed incrementally by ``JsonStreamDecoder``. In bare
+JSON, binary values travel base64-encoded as ``{"$b64": "..."}``.
+"""
+import base64
+import json
+import re
+import struct
+import zlib
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+MAGIC = b"BM"
+PROTOCOL_VERSION = 1
+SUPPORTED_VERSIONS = (1,)
+HEADER = struct.Struct("!2sBBII")
+MAX_FRAME_SIZE = 0xFFFFFFFF
+HELLO_COMMAND = "hello"
+FLAG_BLOBS = 0x01
+FLAG_COMPRESSED = 0x02
+COMPRESSION_LEVEL = 1  # favour speed; payloads are mostly numbers and names
+MIN_COMPRESSION_GAIN = 0.9  # send uncompressed unless this ratio is reached
+BLOB_LENGTH = struct.Struct("!I")
+BLOB_KEY = "$blob"
+B64_KEY = "$b64"
+BINARY_TYPES = (bytes, bytearray, memoryview)
+
+
+class ProtocolError(Exception):
+    """Raised when a peer sends bytes that do not follow the wire protocol."""
+
+
+# --- Codecs ---
+class JsonCodec:
+    """Standard-library JSON without whitespace."""
+
+    name = "json"
+    native_binary = False
+
+    def dumps(self, message, default=None):
+        return json.dumps(message, separators=(",", ":"), default=default).encode("utf-8")
+
+    def loads(self, data, object_hook=None):
+        if isinstance(data, memoryview):
+            data = bytes(data)
+        return json.loads(data, object_hook=object_hook)
+
+
+class OrjsonCodec:
+    """orjson: same documents as JSON, encoded and parsed several times faster."""
+
+    name = "orjson"
+    native_binary = False
+
+    def dumps(self, message, default=None):
+        return orjson.dumps(message, default=default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+    def loads(self, data, object_hook=None):
+        message = orjson.loads(data)
+        return _apply_object_hook(message, object_hook) if object_hook else message
+
+
+class MsgpackCodec:
+    """msgpack: a compact binary document with native binary values."""
+
+    name = "msgpack"
+    native_binary = True
+
+    def dumps(self, message, default=None):
+        return msgpack.packb(message, default=default, use_bin_type=True)
+
+    def loads(self, data, object_hook=None):
+        return msgpack.unpackb(data, raw=False, object_hook=object_hook)
+
+
+def _apply_object_hook(value, object_hook):
+    """Apply ``object_hook`` bottom-up, as ``json.loads`` does, for parsers without one."""
+    if isinstance(value, dict):
+        return object_hook({k: _apply_object_hook(v, object_hook) for k, v in value.items()})
+    if isinstance(value, list):
+        return [_apply_object_hook(v, object_hook) for v in value]
+    return value
+
+
+JSON_CODEC = JsonCodec()
+CODEC_PREFERENCE = ("orjson", "msgpack", "json")
+CODECS = {"json": JSON_CODEC}
+if orjson is not None:
+    CODECS["orjson"] = OrjsonCodec()
+if msgpack is not None:
+    CODECS["msgpack"] = MsgpackCodec()
+TEXT_CODEC = CODECS.get("orjson", JSON_CODEC)  # fastest codec that produces JSON text
+
+
+def available_codecs():
+    """Installed codec names, most preferred first."""
+    return [name for name in CODEC_PREFERENCE if name in CODECS]
+
+
+def negotiate_codec(offered):
+    """Pick the first codec in the peer's preference list that is installed here."""
+    for name in offered or ():
+        if name in CODECS:
+            return name
+    return JSON_CODEC.name
+
+
+def get_codec(name):
+    return CODECS.get(name or JSON_CODEC.name, JSON_CODEC)
+
+
+def b64_default(obj):
+    """``json.dumps`` hook that base64-encodes binary values for bare-JSON peers."""
+    if isinstance(obj, BINARY_TYPES):
+        return {B64_KEY: base64.b64encode(obj).decode("ascii")}
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def binary_value(value):
+    """Return binary data received over either transport: an attachment or ``{"$b64": ...}``."""
+    if isinstance(value, dict) and B64_KEY in value:
+        return base64.b64decode(value[B64_KEY])
+    return value
+
+
+def encode_json(message):
+    """Compact JSON text (as UTF-8 bytes) with binary values base64-encoded."""
+    return TEXT_CODEC.dumps(message, default=b64_default)
+
+
+def encode_payload(message, codec=JSON_CODEC, compress_threshold=None):
+    """Serialize ``message`` into ``(payload_parts, flags)``.
+
+    Binary values are collected as attachments rather than encoded, so the
+    parts can be written out without copying them. Payloads of at least
+    ``compress_threshold`` bytes are zlib-compressed when that pays off.
+    """
+    if codec.native_binary:
+        parts, flags = [codec.dumps(message)], 0
+    else:
+        parts, flags = _encode_with_blobs(message, codec)
+    if compress_threshold is not None:
+        size = sum(memoryview(part).nbytes for part in parts)
+        if size >= compress_threshold:
+            compressor = zlib.compressobj(COMPRESSION_LEVEL)
+            compressed = b"".join([compressor.compress(part) for part in parts] + [compressor.flush()])
+            if len(compressed) < size * MIN_COMPRESSION_GAIN:
+                return [compressed], flags | FLAG_COMPRESSED
+    return parts, flags
+
+
+def _encode_with_blobs(message, codec):
+    blobs = []
+    offset = 0
+
+    def attach(obj):
+        nonlocal offset
+        if not isinstance(obj, BINARY_TYPES):
+            raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+        length = memoryview(obj).nbytes
+        blobs.append(obj)
+        marker = {BLOB_KEY: [offset, length]}
+        offset += length
+        return marker
+
+    body = codec.dumps(message, default=attach)
+    if not blobs:
+        return [body], 0
+    return [BLOB_LENGTH.pack(len(body)), body] + blobs, FLAG_BLOBS
+
+
+def decode_payload(payload, flags=0, codec=JSON_CODEC):
+    if flags & FLAG_COMPRESSED:
+        payload = zlib.decompress(payload)
+    if not flags & FLAG_BLOBS:
+        return codec.loads(payload)
+    view = memoryview(payload)
+    (json_length,) = BLOB_LENGTH.unpack_from(view)
+    base = BLOB_LENGTH.size + json_length
+
+    def restore(obj):
+        if len(obj) == 1 and BLOB_KEY in obj:
+            start, length = obj[BLOB_KEY]
+            return view[base + start:base + start + length]
+        return obj
+
+    return codec.loads(view[BLOB_LENGTH.size:base], object_hook=restore)
+
+
+def frame_header(request_id, length, flags=0):
+    if length > MAX_FRAME_SIZE:
+        raise ProtocolError(f"Frame of {length} bytes exceeds the {MAX_FRAME_SIZE} byte limit")
+    return HEADER.pack(MAGIC, PROTOCOL_VERSION, flags, request_id & 0xFFFFFFFF, length)
+
+
+def encode_frame_parts(request_id, message, codec=JSON_CODEC, compress_threshold=None):
+    """Serialize ``message`` into a list of buffers forming one frame."""
+    parts, flags = encode_payload(message, codec, compress_threshold)
+    length = sum(memoryview(part).nbytes for part in parts)
+    return [frame_header(request_id, length, flags)] + parts
+
+
+def encode_frame(request_id, message, codec=JSON_CODEC, compress_threshold=None):
+    """Serialize ``message`` into a complete frame (header + payload)."""
+    return b"".join(encode_frame_parts(request_id, message, codec, compress_threshold))
+
+
+def hello_request(versions=SUPPORTED_VERSIONS, codecs=None, compress_threshold=None):
+    """Build the handshake offering framing, codecs by preference, and response compression."""
+    params = {"protocol_versions": list(versions)}
+    if codecs:
+        params["codecs"] = list(codecs)
+    if compress_threshold is not None:
+        params["compress_threshold"] = compress_threshold
+    return {"type": HELLO_COMMAND, "params": params}
+
+
+def negotiate_version(offered):
+    """Pick the highest protocol version both peers support, or ``None``."""
+    common = set(offered or ()) & set(SUPPORTED_VERSIONS)
+    return max(common) if common else None
+
+
+class FrameDecoder:
+    """Incremental frame parser.
+
+    Bytes are appended to a single buffer and every frame is sliced out and
+    decoded exactly once, so the cost is linear in the size of the stream.
+    """
+
+    def __init__(self, max_frame_size=MAX_FRAME_SIZE, codec=JSON_CODEC):
+        self.max_frame_size = max_frame_size
+        self.codec = codec
+        self._buffer = bytearray()
+
+    def feed(self, data):
+        """Add received bytes and return a list of ``(request_id, flags, message)``."""
+        buf = self._buffer
+        buf += data
+        frames = []
+        offset = 0
+        size = len(buf)
+        while size - offset >= HEADER.size:
+            magic, version, flags, request_id, length = HEADER.unpack_from(buf, offset)
+            if magic != MAGIC:
+                raise ProtocolError(f"Bad frame magic {bytes(magic)!r}")
+            if version not in SUPPORTED_VERSIONS:
+                raise ProtocolError(f"Unsupported protocol version {version}")
+            if length > self.max_frame_size:
+                raise ProtocolError(f"Frame of {length} bytes exceeds the {self.max_frame_size} byte limit")
+            end = offset + HEADER.size + length
+            if end > size:
+                break
+            frames.append((request_id, flags, decode_payload(buf[offset + HEADER.size:end], flags, self.codec)))
+            offset = end
+        if offset:
+            del buf[:offset]
+        return frames
+
+    def pending(self):
+        return len(self._buffer)
+
+
+# Bytes that change the scanner's state outside and inside a JSON string
+_JSON_STRUCTURE = re.compile(rb'[{}\[\]"]')
+_JSON_STRING_END = re.compile(rb'["\\]')
+_NON_SPACE = re.compile(rb"\S")
+
+
+class JsonStreamDecoder:
+    """Incremental parser for the legacy bare-JSON stream.
+
+    A scanner keeps the bracket depth and string state between reads and
+    resumes where the previous read stopped, so every received byte is
+    scanned once and each message is decoded once, when its closing bracket
+    arrives. UTF-8 continuation bytes never match the ASCII bytes it looks
+    for, so the raw bytes can be scanned without decoding them first.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._reset()
+
+    def _reset(self):
+        self._pos = 0  # next byte to scan
+        self._start = None  # offset of the message being scanned
+        self._depth = 0
+        self._in_string = False
+
+    def feed(self, data):
+        """Add received bytes and return the list of complete JSON messages."""
+        buf = self._buffer
+        buf += data
+        pos, start, depth, in_string = self._pos, self._start, self._depth, self._in_string
+        end = len(buf)
+        messages = []
+        consumed = 0
+        while pos < end:
+            if in_string:
+                match = _JSON_STRING_END.search(buf, pos)
+                if match is None:
+                    pos = end
+                    break
+                pos = match.start()
+                if buf[pos] == 0x5C:  # backslash: skip the escaped byte
+                    if pos + 1 == end:
+                        break  # resume at the backslash once the next byte arrives
+                    pos += 2
+                    continue
+                in_string = False
+                pos += 1
+                continue
+            if start is None:
+                match = _NON_SPACE.search(buf, pos)
+                if match is None:
+                    pos = end
+                    break
+                start = pos = match.start()
+            match = _JSON_STRUCTURE.search(buf, pos)
+            if match is None:
+                pos = end
+                break
+            pos = match.end()
+            char = buf[pos - 1]
+            if char == 0x22:  # "
+                in_string = True
+            elif char in (0x7B, 0x5B):  # { [
+                depth += 1
+            else:
+                depth -= 1
+                if depth < 0:
+                    raise ProtocolError("Unbalanced closing bracket in JSON stream")
+                if depth == 0:
+                    try:
+                        messages.append(json.loads(buf[start:pos]))
+                    except ValueError as e:
+                        raise ProtocolError(f"Invalid JSON message: {e}") from None
+                    start = None
+                    consumed = pos
+        if consumed:
+            del buf[:consumed]
+            pos -= consumed
+            if start is not None:
+                start -= consumed
+        self._pos, self._start, self._depth, self._in_string = pos, start, depth, in_string
+        return messages
+
+    def take_remaining(self):
+        """Return and clear any bytes that were not part of a complete message."""
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        self._reset()
+        return data
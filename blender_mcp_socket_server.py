@@ -14,83 +14,408 @@ import threading
 import json
 import traceback
 import os
+import sys
 import time
 import bmesh
-import select
+import selectors
+import numpy as np
+import base64
+import hashlib
+import mmap
+import tempfile
+import uuid
+import zlib
+import itertools
+import collections
+import operator
+import re
+import shutil
+import argparse
+import cProfile
+import logging
+import pstats
+from concurrent.futures import CancelledError, Future
 
-PORT = 9877
+ADDON_DIR = os.path.dirname(os.path.abspath(__file__))
+if ADDON_DIR not in sys.path:
+    sys.path.append(ADDON_DIR)
+import blender_mcp_logging as mcp_logging
+import blender_mcp_metrics as mcp_metrics
+import blender_mcp_protocol as protocol
+import blender_mcp_spec as tool_spec
+from blender_mcp_spec import SpecValidationError
+
+PORT = int(os.environ.get("BLENDER_MCP_PORT", 9877))
 LOG_PATH = os.path.join(os.path.dirname(__file__), "mcp_blender.log")
-CHUNKED_UPLOADS = {}
-JOB_QUEUE = []
+UPLOAD_DIR = os.path.join(tempfile.gettempdir(), "blender_mcp_uploads")
+UPLOAD_TTL = 3600  # seconds an idle or unconsumed upload is kept
+JOB_QUEUE = collections.deque()
 JOB_STATUS = {}
+JOB_STATUS_LIMIT = 1000
+MAIN_THREAD_BUDGET = 0.02  # seconds of bpy work per timer tick
+EXECUTOR_IDLE_INTERVAL = 0.01  # seconds between timer ticks while the queue is empty
+HEADLESS_WAKE_INTERVAL = 0.5  # seconds an idle headless worker waits before rechecking whether to exit
 MAX_CHUNK_SIZE = 2 * 1024 * 1024  # 2MB
+RENDER_DIR = os.path.join(tempfile.gettempdir(), "blender_mcp_renders")
+RENDER_JOB_LIMIT = 20  # finished render jobs whose output is kept for render_fetch
+RENDER_POLL_INTERVAL = 0.1  # seconds between checks on a running render
 ALLOWED_IPS = {"127.0.0.1", "localhost"}
 
 # --- Load blendertool.json ---
-BLENDERTOOL_PATH = os.path.join(os.path.dirname(__file__), "blendertool.json")
-with open(BLENDERTOOL_PATH, "r", encoding="utf-8") as f:
-    BLENDER_TOOL_SPEC = json.load(f)
+BLENDERTOOL_PATH = tool_spec.BLENDERTOOL_PATH
+BLENDER_TOOL_SPEC = tool_spec.load_spec(BLENDERTOOL_PATH)
+TOOL_INDEX = tool_spec.build_index(BLENDER_TOOL_SPEC)
+CATALOG = tool_spec.ToolCatalog(BLENDER_TOOL_SPEC)
+READ_ONLY_COMMANDS = tool_spec.read_only_commands(BLENDER_TOOL_SPEC)
 
 # --- Logging ---
+# Records go through a queue to a writer thread (rotated file plus the
+# Blender terminal); payloads are logged as bounded summaries via
+# mcp_logging.Payload, and only rendered when the level is enabled.
+LOGGER = mcp_logging.setup("BlenderMCP", LOG_PATH, stream=sys.stdout)
+
 def log(msg, level="INFO"):
-    timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
-    log_msg = f"{timestamp} [{level}] {msg}\n"
-    with open(LOG_PATH, "a") as f:
-        f.write(log_msg)
-    print(log_msg, end="")  # Output to Blender terminal
+    LOGGER.log(getattr(logging, level), msg)
+
+# --- Chunked Upload Store ---
+class UploadStore:
+    """Streams chunked uploads to spill files instead of holding them in memory.
+
+    Chunks are appended at verified offsets while a running SHA-256 is kept,
+    so a client can resume from ``status()["size"]`` and have the whole
+    upload checked at ``finalize``. Uploads untouched for ``ttl`` seconds are
+    evicted. Finalized uploads are either mapped read-only for zero-copy
+    parsing or claimed by path for Blender to read directly.
+    """
+
+    def __init__(self, directory, ttl):
+        self.directory = directory
+        self.ttl = ttl
+        self._uploads = {}
+        self._lock = threading.Lock()
+
+    def _get(self, upload_id, state=None):
+        entry = self._uploads.get(upload_id)
+        if entry is None:
+            raise LookupError(f"Invalid upload_id: {upload_id}")
+        if state and entry["state"] != state:
+            raise ValueError(f"Upload {upload_id} is {entry['state']}, expected {state}")
+        entry["touched"] = time.time()
+        return entry
+
+    def _remove(self, upload_id):
+        entry = self._uploads.get(upload_id)
+        if entry is None:
+            return
+        if entry["file"]:
+            entry["file"].close()
+            entry["file"] = None
+        try:
+            os.remove(entry["path"])
+        except FileNotFoundError:
+            pass
+        except OSError:
+            # Still mapped (Windows); retry on the next eviction pass
+            return
+        del self._uploads[upload_id]
+
+    def evict_expired(self):
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            for upload_id in [k for k, v in self._uploads.items() if v["touched"] < cutoff]:
+                log(f"Evicting expired upload {upload_id}", "WARNING")
+                self._remove(upload_id)
+
+    def create(self, total_size=None, sha256=None, suffix=""):
+        self.evict_expired()
+        os.makedirs(self.directory, exist_ok=True)
+        upload_id = uuid.uuid4().hex
+        fd, path = tempfile.mkstemp(prefix=upload_id, suffix=suffix, dir=self.directory)
+        with self._lock:
+            self._uploads[upload_id] = {
+                "path": path,
+                "file": os.fdopen(fd, "wb"),
+                "size": 0,
+                "total_size": total_size,
+                "expected_sha256": sha256,
+                "hash": hashlib.sha256(),
+                "state": "open",
+                "touched": time.time(),
+            }
+        return upload_id
+
+    def write(self, upload_id, offset, data, crc32=None):
+        """Append ``data`` at ``offset`` and return the upload's size afterwards."""
+        if crc32 is not None and zlib.crc32(data) != crc32:
+            raise ValueError(f"Chunk at offset {offset} failed its CRC32 check")
+        with self._lock:
+            entry = self._get(upload_id, "open")
+            size = entry["size"]
+            if offset is None:
+                offset = size
+            if offset < size and offset + len(data) <= size:
+                return size  # chunk re-sent after a resume; already stored
+            if offset != size:
+                raise ValueError(f"Chunk offset {offset} does not match upload size {size}")
+            if entry["total_size"] is not None and size + len(data) > entry["total_size"]:
+                raise ValueError(f"Chunk overruns declared total size {entry['total_size']}")
+            entry["file"].write(data)
+            entry["hash"].update(data)
+            entry["size"] = size + len(data)
+            return entry["size"]
+
+    def status(self, upload_id):
+        with self._lock:
+            entry = self._get(upload_id)
+            return {"upload_id": upload_id, "state": entry["state"], "size": entry["size"], "total_size": entry["total_size"]}
+
+    def finalize(self, upload_id, sha256=None):
+        with self._lock:
+            entry = self._get(upload_id, "open")
+            digest = entry["hash"].hexdigest()
+            expected = sha256 or entry["expected_sha256"]
+            if entry["total_size"] is not None and entry["size"] != entry["total_size"]:
+                raise ValueError(f"Upload has {entry['size']} of {entry['total_size']} bytes")
+            if expected and expected.lower() != digest:
+                raise ValueError(f"SHA-256 mismatch: expected {expected}, got {digest}")
+            entry["file"].close()
+            entry["file"] = None
+            entry["state"] = "final"
+            return {"upload_id": upload_id, "size": entry["size"], "sha256": digest}
+
+    def open_buffer(self, upload_id):
+        """Map a finalized upload read-only; the upload is released afterwards."""
+        with self._lock:
+            entry = self._get(upload_id, "final")
+            if entry["size"] == 0:
+                buffer = b""
+            else:
+                with open(entry["path"], "rb") as f:
+                    buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._remove(upload_id)
+            return buffer
+
+    def claim_path(self, upload_id):
+        """Hand a finalized upload's file over to the caller, who then owns it.
+
+        The caller deletes it with ``release_path`` once Blender has read it.
+        """
+        with self._lock:
+            entry = self._get(upload_id, "final")
+            del self._uploads[upload_id]
+            return entry["path"]
+
+    @staticmethod
+    def release_path(path):
+        """Delete a file handed over by ``claim_path``."""
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            log(f"Could not remove upload file {path}: {e}", "WARNING")
+
+    def discard(self, upload_id):
+        with self._lock:
+            self._get(upload_id)
+            self._remove(upload_id)
+
+def _chunk_bytes(chunk):
+    if isinstance(chunk, (bytes, bytearray, memoryview)):
+        return chunk
+    if isinstance(chunk, dict) and protocol.B64_KEY in chunk:
+        return base64.b64decode(chunk[protocol.B64_KEY])
+    if isinstance(chunk, str):
+        return bytes.fromhex(chunk)  # legacy hex-encoded chunks
+    raise ValueError("chunk must be binary data")
+
+def cmd_chunked_upload_init(params):
+    upload_id = UPLOAD_STORE.create(params.get("total_size"), params.get("sha256"), params.get("suffix", ""))
+    return {"status": "ok", "upload_id": upload_id, "max_chunk_size": MAX_CHUNK_SIZE}
+
+def cmd_chunked_upload_chunk(params):
+    chunk = _chunk_bytes(params.get("chunk"))
+    if len(chunk) > MAX_CHUNK_SIZE:
+        return {"status": "error", "message": f"Chunk of {len(chunk)} bytes exceeds {MAX_CHUNK_SIZE}"}
+    size = UPLOAD_STORE.write(params.get("upload_id"), params.get("offset"), chunk, params.get("crc32"))
+    return {"status": "ok", "received": len(chunk), "size": size}
+
+def cmd_chunked_upload_status(params):
+    return {"status": "ok", **UPLOAD_STORE.status(params.get("upload_id"))}
+
+def cmd_chunked_upload_finalize(params):
+    return {"status": "ok", **UPLOAD_STORE.finalize(params.get("upload_id"), params.get("sha256"))}
+
+def cmd_chunked_upload_discard(params):
+    UPLOAD_STORE.discard(params.get("upload_id"))
+    return {"status": "ok", "result": "Upload discarded"}
+
+UPLOAD_STORE = UploadStore(UPLOAD_DIR, UPLOAD_TTL)
+UPLOAD_COMMANDS = {
+    "chunked_upload_init": cmd_chunked_upload_init,
+    "chunked_upload_chunk": cmd_chunked_upload_chunk,
+    "chunked_upload_status": cmd_chunked_upload_status,
+    "chunked_upload_finalize": cmd_chunked_upload_finalize,
+    "chunked_upload_discard": cmd_chunked_upload_discard,
+}
+
+# --- Primitive Mesh Cache ---
+# shape -> (parameter defaults, bmesh builder)
+PRIMITIVES = {
+    "cube": (
+        {"size": 2.0},
+        lambda bm, size: bmesh.ops.create_cube(bm, size=size),
+    ),
+    "uv_sphere": (
+        {"segments": 32, "rings": 16, "radius": 1.0},
+        lambda bm, segments, rings, radius: bmesh.ops.create_uvsphere(bm, u_segments=segments, v_segments=rings, radius=radius),
+    ),
+    "cylinder": (
+        {"segments": 32, "radius": 1.0, "depth": 2.0},
+        lambda bm, segments, radius, depth: bmesh.ops.create_cone(bm, segments=segments, radius1=radius, radius2=radius, depth=depth),
+    ),
+    "cone": (
+        {"segments": 32, "radius": 1.0, "depth": 2.0},
+        lambda bm, segments, radius, depth: bmesh.ops.create_cone(bm, segments=segments, radius1=radius, radius2=0.0, depth=depth),
+    ),
+}
+PRIMITIVE_KEY_PROP = "mcp_primitive"
+
+class PrimitiveMeshCache:
+    """Share one mesh datablock per primitive shape and parameter set.
+
+    Objects created from the same key are linked duplicates of a single mesh,
+    so the bmesh is built once per key. Blender's own user count is the
+    reference count: cached meshes left with no users are removed by
+    ``evict_orphans``. Commands that change mesh data call ``detach`` first,
+    so an edit never reaches the other objects sharing the mesh.
+    """
+
+    def __init__(self):
+        self._meshes = {}  # key -> mesh name
+
+    @staticmethod
+    def resolve(shape, params):
+        """Return ``(key, parameters)`` with defaults applied and types normalized."""
+        if shape not in PRIMITIVES:
+            raise ValueError(f"Unsupported shape: {shape}")
+        defaults, _build = PRIMITIVES[shape]
+        resolved = {name: type(default)(params.get(name, default)) for name, default in defaults.items()}
+        return (shape,) + tuple(sorted(resolved.items())), resolved
+
+    @staticmethod
+    def build(shape, resolved, name):
+        mesh = bpy.data.meshes.new(name)
+        bm = bmesh.new()
+        try:
+            PRIMITIVES[shape][1](bm, **resolved)
+            bm.to_mesh(mesh)
+        finally:
+            bm.free()
+        return mesh
+
+    def get(self, shape, params, name, unique=False):
+        """Return a mesh for the primitive, shared unless ``unique`` is set."""
+        key, resolved = self.resolve(shape, params)
+        if unique:
+            return self.build(shape, resolved, name)
+        tag = repr(key)
+        mesh = bpy.data.meshes.get(self._meshes.get(key, ""))
+        if mesh is None or mesh.get(PRIMITIVE_KEY_PROP) != tag:
+            mesh = self.build(shape, resolved, f"{shape}_shared")
+            mesh[PRIMITIVE_KEY_PROP] = tag
+            self._meshes[key] = mesh.name
+        return mesh
+
+    @staticmethod
+    def detach(obj):
+        """Give ``obj`` a mesh of its own before its mesh data is edited (copy-on-write).
+
+        A cached mesh used only by ``obj`` is handed over and leaves the
+        cache; one shared with other objects is copied.
+        """
+        mesh = obj.data
+        if mesh is None or PRIMITIVE_KEY_PROP not in mesh:
+            return mesh
+        if mesh.users > 1:
+            mesh = obj.data = mesh.copy()
+        del mesh[PRIMITIVE_KEY_PROP]
+        mesh.name = f"{obj.name}_mesh"
+        return mesh
+
+    def evict_orphans(self):
+        """Remove cached meshes no object uses any more; return how many were removed."""
+        removed = 0
+        for key, name in list(self._meshes.items()):
+            mesh = bpy.data.meshes.get(name)
+            if mesh is None or mesh.get(PRIMITIVE_KEY_PROP) != repr(key):
+                del self._meshes[key]
+            elif mesh.users == 0:
+                bpy.data.meshes.remove(mesh)
+                del self._meshes[key]
+                removed += 1
+        return removed
+
+    def stats(self):
+        meshes = {key: bpy.data.meshes.get(name) for key, name in self._meshes.items()}
+        return [
+            {"shape": key[0], "params": dict(key[1:]), "mesh": mesh.name, "users": mesh.users}
+            for key, mesh in meshes.items() if mesh is not None
+        ]
+
+PRIMITIVE_CACHE = PrimitiveMeshCache()
+
+def cmd_primitive_cache(params):
+    removed = PRIMITIVE_CACHE.evict_orphans() if params.get("evict") else 0
+    return {"status": "ok", "result": PRIMITIVE_CACHE.stats(), "evicted": removed}
 
 # --- Tool Dispatchers ---
 def handle_list_command(params):
-    return {"status": "ok", "result": BLENDER_TOOL_SPEC["commands"]}
+    """Return the tool catalog (filtered and paged on request) as ``result``."""
+    try:
+        catalog = CATALOG.query(**CATALOG.validate(params))
+    except SpecValidationError as e:
+        return {"status": "error", "message": str(e)}
+    if catalog.get("not_modified"):
+        return {"status": "ok", **catalog}
+    return {"status": "ok", "hash": catalog["hash"], "total": catalog["total"], "cursor": catalog["cursor"],
+            "next_cursor": catalog["next_cursor"], "result": catalog["tools"]}
 
 def handle_use_command(params):
     tool_name = params.get("tool_name")
     tool_params = params.get("params", {})
-    tool_def = next((cmd for cmd in BLENDER_TOOL_SPEC["commands"] if cmd["tool_name"] == tool_name), None)
-    if not tool_def:
-        return {"status": "error", "message": f"Tool '{tool_name}' not found in blendertool.json."}
-    if tool_name in COMMANDS:
-        return COMMANDS[tool_name](tool_params)
-    return {"status": "error", "message": f"Tool '{tool_name}' is defined in blendertool.json but not implemented in the addon."}
+    handler = SPEC_HANDLERS.get(tool_name) or COMMANDS.get(tool_name)
+    if handler:
+        return handler(tool_params)
+    if tool_name in TOOL_INDEX:
+        return {"status": "error", "message": f"Tool '{tool_name}' is defined in blendertool.json but not implemented in the addon."}
+    return {"status": "error", "message": f"Tool '{tool_name}' not found in blendertool.json."}
 
 # --- Command Implementations (keep only those needed for USE_COMMAND) ---
 def cmd_create_object(params):
+    """Create a primitive mesh object.
+
+    Objects with the same shape and parameters share one cached mesh; the
+    first material assigned to one of them gives it a copy of its own.
+
+    Args:
+        - shape (str): "cube" (default), "uv_sphere", "cylinder" or "cone".
+        - name (str): object name; defaults to the shape.
+        - location (list): x, y, z.
+        - unique (bool): build a mesh for this object alone instead of sharing.
+    """
     shape = params.get("shape", "cube")
     name = params.get("name", shape)
     location = params.get("location", [0, 0, 0])
-    mesh = None
-    obj = None
-    if shape == "cube":
-        mesh = bpy.data.meshes.new(name + "_mesh")
-        bm = bmesh.new()
-        bmesh.ops.create_cube(bm, size=2.0)
-        bm.to_mesh(mesh)
-        bm.free()
-    elif shape == "uv_sphere":
-        mesh = bpy.data.meshes.new(name + "_mesh")
-        bm = bmesh.new()
-        bmesh.ops.create_uvsphere(bm, u_segments=32, v_segments=16, radius=1.0)
-        bm.to_mesh(mesh)
-        bm.free()
-    elif shape == "cylinder":
-        mesh = bpy.data.meshes.new(name + "_mesh")
-        bm = bmesh.new()
-        bmesh.ops.create_cone(bm, segments=32, radius1=1.0, radius2=1.0, depth=2.0)
-        bm.to_mesh(mesh)
-        bm.free()
-    elif shape == "cone":
-        mesh = bpy.data.meshes.new(name + "_mesh")
-        bm = bmesh.new()
-        bmesh.ops.create_cone(bm, segments=32, radius1=1.0, radius2=0.0, depth=2.0)
-        bm.to_mesh(mesh)
-        bm.free()
-    else:
-        return {"status": "error", "message": f"Unsupported shape: {shape}"}
+    try:
+        mesh = PRIMITIVE_CACHE.get(shape, params, name + "_mesh", unique=params.get("unique", False))
+    except (TypeError, ValueError) as e:
+        return {"status": "error", "message": str(e)}
     obj = bpy.data.objects.new(name, mesh)
     bpy.context.scene.collection.objects.link(obj)
     obj.location = location
-    log(f"Created object {name} of type {shape}")
-    return {"status": "ok", "result": f"Object {name} created", "object_name": name}
+    log(f"Created object {obj.name} of type {shape}")
+    return {"status": "ok", "result": f"Object {obj.name} created", "object_name": obj.name, "mesh_name": mesh.name}
 
 def cmd_delete_object(params):
     name = params.get("name")
@@ -98,6 +423,7 @@ def cmd_delete_object(params):
     if not obj:
         return {"status": "error", "message": f"Object {name} not found"}
     bpy.data.objects.remove(obj, do_unlink=True)
+    PRIMITIVE_CACHE.evict_orphans()
     log(f"Deleted object {name}")
     return {"status": "ok", "result": f"Object {name} deleted"}
 
@@ -114,10 +440,11 @@ def cmd_assign_material(params):
         return {"status": "error", "message": "Object or material not found"}
     if obj.type != 'MESH':
         return {"status": "error", "message": "Object is not a mesh"}
-    if obj.data.materials:
-        obj.data.materials[0] = mat
+    materials = PRIMITIVE_CACHE.detach(obj).materials
+    if materials:
+        materials[0] = mat
     else:
-        obj.data.materials.append(mat)
+        materials.append(mat)
     log(f"Assigned material {mat_name} to {obj_name}")
     return {"status": "ok", "result": f"Material {mat_name} assigned to {obj_name}"}
 
@@ -216,13 +543,29 @@ def cmd_save_blend(params):
 
 def cmd_load_blend(params):
     filepath = params.get("filepath")
+    if params.get("upload_id"):
+        filepath = UPLOAD_STORE.claim_path(params["upload_id"])
+        try:
+            bpy.ops.wm.open_mainfile(filepath=filepath)
+        finally:
+            UPLOAD_STORE.release_path(filepath)
+        log(f"Loaded uploaded blend file {params['upload_id']}")
+        return {"status": "ok", "result": f"Loaded upload {params['upload_id']}"}
     if not filepath:
         return {"status": "error", "message": "No filepath provided"}
     bpy.ops.wm.open_mainfile(filepath=filepath)
     log(f"Loaded blend file {filepath}")
     return {"status": "ok", "result": f"Loaded {filepath}"}
 
+_COMMAND_DESCRIPTIONS = None  # built on first describe; COMMANDS never changes at runtime
+
 def cmd_describe(params):
+    global _COMMAND_DESCRIPTIONS
+    if _COMMAND_DESCRIPTIONS is None:
+        _COMMAND_DESCRIPTIONS = _describe_commands()
+    return {"status": "ok", "result": _COMMAND_DESCRIPTIONS}
+
+def _describe_commands():
     meta = {}
     for k, v in COMMANDS.items():
         doc = v.__doc__ or ""
@@ -239,25 +582,36 @@ def cmd_describe(params):
                     arg = line.split("(")[0].strip()
                     args.append(arg)
         meta[k] = {"doc": doc, "args": args}
-    return {"status": "ok", "result": meta}
+    return meta
 
 def cmd_test_connection(params):
-    return {"status": "ok", "result": "Server is running and responding"}
+    resp = {"status": "ok", "result": "Server is running and responding"}
+    if WORKER_TOKEN is not None:
+        resp["worker_token"] = WORKER_TOKEN
+    return resp
 
 def cmd_create_bmesh_cube(params):
-    import bmesh
+    """Create a cube object.
+
+    Cubes of the same size share one cached mesh; the first material
+    assigned to one of them gives it a copy of its own.
+
+    Args:
+        - size (float): edge length, default 2.0.
+        - location (list): x, y, z.
+        - unique (bool): build a mesh for this cube alone instead of sharing.
+    """
     size = params.get('size', 2.0)
     location = params.get('location', [0, 0, 0])
-    mesh = bpy.data.meshes.new("BMeshCube")
-    bm = bmesh.new()
-    bmesh.ops.create_cube(bm, size=size)
-    bm.to_mesh(mesh)
-    bm.free()
+    try:
+        mesh = PRIMITIVE_CACHE.get("cube", {"size": size}, "BMeshCube", unique=params.get("unique", False))
+    except (TypeError, ValueError) as e:
+        return {"status": "error", "message": str(e)}
     obj = bpy.data.objects.new("BMeshCube", mesh)
     bpy.context.scene.collection.objects.link(obj)
     obj.location = location
     log(f"Created BMesh cube at {location} with size {size}")
-    return {"status": "ok", "result": f"BMesh cube created", "object_name": obj.name}
+    return {"status": "ok", "result": f"BMesh cube created", "object_name": obj.name, "mesh_name": mesh.name}
 
 def cmd_draw_text(params):
     text = params.get('text', 'Hello Blender')
@@ -283,9 +637,1565 @@ COMMANDS = {
     "describe": cmd_describe,
     "test_connection": cmd_test_connection,
     "create_bmesh_cube": cmd_create_bmesh_cube,
+    "primitive_cache": cmd_primitive_cache,
     "draw_text": cmd_draw_text,
 }
 
+# --- Render Jobs ---
+# Renders are split into units (one frame, optionally one border tile of a
+# frame) that run one after another from a timer, so a submit returns at
+# once and cancellation takes effect at the next unit boundary. Progress is
+# written to JOB_STATUS by the render handlers.
+RENDER_JOBS = {}
+RENDER_QUEUE = collections.deque()
+_active_render = None
+_RENDER_SAMPLES_RE = re.compile(r"(?:Sample|Rendering)\s+(\d+)\s*/\s*(\d+)")
+_RENDER_STATE_ATTRS = ("filepath", "use_border", "use_crop_to_border", "border_min_x", "border_max_x", "border_min_y", "border_max_y")
+
+def _update_job(job_id, **fields):
+    with _job_lock:
+        status = JOB_STATUS.get(job_id)
+        if status is not None:
+            status.update(fields)
+
+def _tile_borders(tiles):
+    """Split the frame into ``tiles`` x ``tiles`` borders (min_x, max_x, min_y, max_y)."""
+    step = 1.0 / tiles
+    return [(x * step, (x + 1) * step, y * step, (y + 1) * step) for y in range(tiles) for x in range(tiles)]
+
+class RenderJob:
+    def __init__(self, job_id, frames, tiles=1, write_still=True, use_viewport=False):
+        borders = _tile_borders(tiles) if tiles > 1 else [None]
+        self.job_id = job_id
+        self.units = [(frame, index, border) for frame in frames for index, border in enumerate(borders)]
+        self.tiled = tiles > 1
+        self.write_still = write_still
+        self.use_viewport = use_viewport
+        self.directory = os.path.join(RENDER_DIR, job_id)
+        self.outputs = []
+        self.next_unit = 0
+        self.rendering = None  # output path of the unit being rendered
+        self.cancel_requested = False
+        self.finished = False
+        self._saved = None
+
+    def begin(self):
+        render = bpy.context.scene.render
+        self._saved = {attr: getattr(render, attr) for attr in _RENDER_STATE_ATTRS}
+        self._saved["frame_current"] = bpy.context.scene.frame_current
+        self._base_path = bpy.path.abspath(render.filepath)
+        os.makedirs(self.directory, exist_ok=True)
+        _set_job_state(self.job_id, "running")
+
+    def render_next(self):
+        frame, index, border = self.units[self.next_unit]
+        self.next_unit += 1
+        scene = bpy.context.scene
+        render = scene.render
+        scene.frame_set(frame)
+        if border is not None:
+            render.use_border = render.use_crop_to_border = True
+            render.border_min_x, render.border_max_x, render.border_min_y, render.border_max_y = border
+        if self.write_still and not self.tiled:
+            render.filepath = self._base_path
+        else:
+            render.filepath = os.path.join(self.directory, f"tile_{index:03d}_" if border else "frame_")
+        self.rendering = {"path": render.frame_path(frame=frame), "frame": frame, "tile": index if border else None}
+        _update_job(self.job_id, frame=frame, tile=self.rendering["tile"], samples=None)
+        # Without a window override (background mode, or Blender before 3.2)
+        # the render runs blocking.
+        override = None if bpy.app.background else _operator_context()
+        try:
+            if override is not None:
+                # INVOKE_DEFAULT starts Blender's render job and returns at once;
+                # render_complete marks the unit done.
+                with override:
+                    result = bpy.ops.render.render('INVOKE_DEFAULT', write_still=True, use_viewport=self.use_viewport)
+            else:
+                result = bpy.ops.render.render(write_still=True, use_viewport=self.use_viewport)
+            if "CANCELLED" in result:
+                raise RuntimeError("Render could not start (is another render running?)")
+        except Exception as e:
+            self.rendering = None
+            self.finish("failed", ok=False, error=str(e))
+            return
+        if override is None:
+            self.unit_done()
+
+    def unit_done(self):
+        if self.rendering is None:
+            return
+        output, self.rendering = self.rendering, None
+        output["size"] = os.path.getsize(output["path"]) if os.path.exists(output["path"]) else 0
+        self.outputs.append(output)
+        _update_job(self.job_id, units_done=len(self.outputs), progress=len(self.outputs) / len(self.units))
+
+    def finish(self, state, **extra):
+        if self._saved is not None:
+            scene = bpy.context.scene
+            scene.frame_set(self._saved.pop("frame_current"))
+            for attr, value in self._saved.items():
+                setattr(scene.render, attr, value)
+            self._saved = None
+        self.finished = True
+        _set_job_state(self.job_id, state, **extra)
+
+def _render_tick():
+    global _active_render
+    job = _active_render
+    if job is None:
+        if not RENDER_QUEUE:
+            return None
+        job = _active_render = RENDER_QUEUE.popleft()
+        if not job.cancel_requested:
+            job.begin()
+    if job.rendering is not None:
+        return RENDER_POLL_INTERVAL
+    if not job.finished:
+        if job.cancel_requested:
+            job.finish("cancelled")
+        elif job.next_unit == len(job.units):
+            job.finish("done", ok=True)
+        else:
+            job.render_next()
+            return RENDER_POLL_INTERVAL
+    _active_render = None
+    return 0.0
+
+def _prune_render_jobs():
+    finished = [job for job in RENDER_JOBS.values() if job.finished]
+    for job in finished[:max(0, len(finished) - RENDER_JOB_LIMIT)]:
+        del RENDER_JOBS[job.job_id]
+        shutil.rmtree(job.directory, ignore_errors=True)
+
+def submit_render(frames, tiles=1, write_still=True, use_viewport=False):
+    if not frames:
+        raise ValueError("Frame range is empty")
+    if tiles < 1:
+        raise ValueError("tiles must be at least 1")
+    job_id = str(next(_job_ids))
+    job = RenderJob(job_id, frames, tiles, write_still, use_viewport)
+    with _job_lock:
+        JOB_STATUS[job_id] = {"state": "queued", "type": "render", "queued_at": time.time(), "units_total": len(job.units), "units_done": 0, "progress": 0.0}
+        _prune_job_status()
+    _prune_render_jobs()
+    RENDER_JOBS[job_id] = job
+    RENDER_QUEUE.append(job)
+    _jobs_ready.set()
+    if not bpy.app.timers.is_registered(_render_tick):
+        # Persistent like the executor timer, so loading a file keeps queued renders going.
+        bpy.app.timers.register(_render_tick, first_interval=0.0, persistent=True)
+    return job
+
+def _get_render_job(job_id):
+    job = RENDER_JOBS.get(job_id)
+    if job is None:
+        raise LookupError(f"Unknown render job: {job_id}")
+    return job
+
+@bpy.app.handlers.persistent
+def _on_render_pre(scene, *args):
+    if _active_render is not None:
+        _update_job(_active_render.job_id, frame=scene.frame_current)
+
+@bpy.app.handlers.persistent
+def _on_render_stats(stats, *args):
+    if _active_render is not None:
+        match = _RENDER_SAMPLES_RE.search(stats)
+        _update_job(_active_render.job_id, stats=stats, samples=[int(match.group(1)), int(match.group(2))] if match else None)
+
+@bpy.app.handlers.persistent
+def _on_render_complete(scene, *args):
+    if _active_render is not None:
+        _active_render.unit_done()
+
+@bpy.app.handlers.persistent
+def _on_render_cancel(scene, *args):
+    # Cancelled from Blender's UI (Esc): drop the unit and the rest of the job.
+    if _active_render is not None:
+        _active_render.rendering = None
+        _active_render.cancel_requested = True
+
+_RENDER_HANDLERS = (
+    ("render_pre", _on_render_pre),
+    ("render_stats", _on_render_stats),
+    ("render_complete", _on_render_complete),
+    ("render_cancel", _on_render_cancel),
+)
+
+def start_render_handlers():
+    for name, handler in _RENDER_HANDLERS:
+        handlers = getattr(bpy.app.handlers, name)
+        if handler not in handlers:
+            handlers.append(handler)
+
+def stop_render_handlers():
+    for job in RENDER_JOBS.values():
+        job.cancel_requested = True
+    for name, handler in _RENDER_HANDLERS:
+        handlers = getattr(bpy.app.handlers, name)
+        if handler in handlers:
+            handlers.remove(handler)
+
+# --- Script Registry ---
+# exec_python and the script_* tools run compiled code objects cached by the
+# SHA-256 of their source, so a helper script is sent and compiled once and
+# then run by id. All of this runs on Blender's main thread.
+SCRIPT_CACHE_SIZE = 64  # compiled scripts kept; the least recently used go first
+SCRIPT_CACHE_BYTES = 16 * 1024 * 1024  # total source size of the cached scripts
+SCRIPT_NAMESPACE_LIMIT = 32
+SCRIPT_RESULT_NAME = "result"  # global a script assigns to return a value
+
+class ScriptRegistry:
+    """Compiled scripts by content hash, and named namespaces that persist.
+
+    A script runs with ``args`` bound in its globals and returns whatever it
+    assigned to ``result``. Without a namespace it gets fresh globals each
+    run; a named namespace keeps its imports, helpers and state across runs
+    until it is dropped.
+    """
+
+    def __init__(self, max_scripts=SCRIPT_CACHE_SIZE, max_bytes=SCRIPT_CACHE_BYTES, max_namespaces=SCRIPT_NAMESPACE_LIMIT):
+        self.max_scripts = max_scripts
+        self.max_bytes = max_bytes
+        self.max_namespaces = max_namespaces
+        self._scripts = collections.OrderedDict()  # script id -> (code, size, name)
+        self._bytes = 0
+        self._namespaces = {}
+        self.hits = 0  # registrations (and exec_python calls) served without compiling
+        self.misses = 0
+
+    def register(self, source, name=None):
+        """Compile ``source`` unless cached; return ``(script_id, newly_compiled)``."""
+        data = source.encode("utf-8")
+        script_id = hashlib.sha256(data).hexdigest()
+        if script_id in self._scripts:
+            self._scripts.move_to_end(script_id)
+            self.hits += 1
+            return script_id, False
+        if len(data) > self.max_bytes:
+            raise ValueError(f"Script of {len(data)} bytes exceeds the {self.max_bytes} byte cache")
+        code = compile(source, f"<mcp script {name or script_id[:12]}>", "exec")
+        self.misses += 1
+        self._scripts[script_id] = (code, len(data), name)
+        self._bytes += len(data)
+        while len(self._scripts) > self.max_scripts or self._bytes > self.max_bytes:
+            _code, size, _name = self._scripts.popitem(last=False)[1]
+            self._bytes -= size
+        return script_id, True
+
+    def get(self, script_id):
+        entry = self._scripts.get(script_id)
+        if entry is None:
+            raise LookupError(f"Unknown script_id {script_id}; register the script again")
+        self._scripts.move_to_end(script_id)
+        return entry[0]
+
+    def scope(self, namespace=None):
+        """Globals for a run: the named namespace (created on first use) or fresh ones."""
+        if not namespace:
+            return {"__name__": "mcp_script", "bpy": bpy}
+        scope = self._namespaces.get(namespace)
+        if scope is None:
+            if len(self._namespaces) >= self.max_namespaces:
+                raise ValueError(f"At most {self.max_namespaces} namespaces; drop one first")
+            scope = self._namespaces[namespace] = {"__name__": f"mcp_namespace_{namespace}", "bpy": bpy}
+        return scope
+
+    def drop_namespace(self, name):
+        return self._namespaces.pop(name, None) is not None
+
+    @staticmethod
+    def run(code, scope, args=None):
+        """Execute ``code`` in ``scope`` and return the value it assigned to ``result``."""
+        scope.pop(SCRIPT_RESULT_NAME, None)
+        scope["args"] = args or {}
+        exec(code, scope)
+        return scope.get(SCRIPT_RESULT_NAME)
+
+    def clear(self):
+        self._scripts.clear()
+        self._bytes = 0
+        self._namespaces.clear()
+
+    def stats(self):
+        return {
+            "scripts": [{"script_id": script_id, "name": name, "size": size} for script_id, (_code, size, name) in self._scripts.items()],
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "namespaces": {name: sorted(key for key in scope if not key.startswith("__")) for name, scope in self._namespaces.items()},
+        }
+
+SCRIPT_REGISTRY = ScriptRegistry()
+
+def _script_result(value):
+    """Make a script's ``result`` encodable: datablocks by name, unknown objects by repr."""
+    if isinstance(value, (list, tuple)):
+        return [_script_result(item) for item in value]
+    if isinstance(value, dict):
+        return {str(key): _script_result(item) for key, item in value.items()}
+    if isinstance(value, (np.ndarray, np.generic)):
+        return value.tolist()
+    value = _result_value(value)
+    if value is None or isinstance(value, (str, int, float, bool, bytes, bytearray, memoryview)):
+        return value
+    return repr(value)
+
+def run_script(source=None, script_id=None, args=None, namespace=None, name=None):
+    """Compile-or-fetch a script and run it; returns a response dict."""
+    try:
+        if source is not None:
+            script_id, _compiled = SCRIPT_REGISTRY.register(source, name)
+        code = SCRIPT_REGISTRY.get(script_id)
+        scope = SCRIPT_REGISTRY.scope(namespace)
+    except SyntaxError as e:
+        return {"status": "error", "message": f"SyntaxError: {e}"}
+    except (LookupError, ValueError) as e:
+        return {"status": "error", "message": str(e)}
+    try:
+        value = SCRIPT_REGISTRY.run(code, scope, args)
+    except Exception as e:
+        return {"status": "error", "message": f"{type(e).__name__}: {e}", "traceback": traceback.format_exc()}
+    return {"status": "ok", "script_id": script_id, "result": _script_result(value)}
+
+# --- blendertool.json Custom Handlers ---
+# Implementations for "custom_blender_function" entries. They receive the
+# validated parameters as keyword arguments and return the tool's result.
+_DATA_COLLECTIONS = {
+    "Scene": "scenes",
+    "Object": "objects",
+    "Mesh": "meshes",
+    "Material": "materials",
+    "Image": "images",
+    "Camera": "cameras",
+    "Light": "lights",
+    "Collection": "collections",
+    "World": "worlds",
+}
+DRAW_TEXTS = {}
+_draw_handle = None
+
+def _get_datablock(collection, name):
+    block = getattr(bpy.data, collection).get(name)
+    if block is None:
+        raise LookupError(f"{collection[:-1].capitalize()} '{name}' not found")
+    return block
+
+def _get_object(name):
+    return _get_datablock("objects", name)
+
+def _get_mesh_object(name):
+    obj = _get_object(name)
+    if obj.type != 'MESH':
+        raise ValueError(f"Object '{name}' is not a mesh")
+    return obj
+
+def _link_object(obj, location=None):
+    bpy.context.scene.collection.objects.link(obj)
+    if location is not None:
+        obj.location = location
+    return obj
+
+def _get_principled_bsdf(material):
+    if not material.use_nodes:
+        material.use_nodes = True
+    nodes = material.node_tree.nodes
+    bsdf = nodes.get("Principled BSDF") or next((n for n in nodes if n.type == 'BSDF_PRINCIPLED'), None)
+    if bsdf is None:
+        raise LookupError(f"Material '{material.name}' has no Principled BSDF node")
+    return bsdf
+
+def _load_image(name_or_filepath):
+    image = bpy.data.images.get(name_or_filepath)
+    if image is None:
+        image = bpy.data.images.load(name_or_filepath, check_existing=True)
+    return image
+
+def _add_image_texture(material, image_name_or_filepath, color_space, uv_map_name):
+    tree = material.node_tree
+    tex = tree.nodes.new("ShaderNodeTexImage")
+    tex.image = _load_image(image_name_or_filepath)
+    tex.image.colorspace_settings.name = color_space
+    if uv_map_name:
+        uv = tree.nodes.new("ShaderNodeUVMap")
+        uv.uv_map = uv_map_name
+        tree.links.new(uv.outputs["UV"], tex.inputs["Vector"])
+    return tex
+
+def _get_socket(sockets, name_or_index):
+    if isinstance(name_or_index, int) or (isinstance(name_or_index, str) and name_or_index.isdigit()):
+        return sockets[int(name_or_index)]
+    socket_ = sockets.get(name_or_index)
+    if socket_ is None:
+        raise LookupError(f"Socket '{name_or_index}' not found")
+    return socket_
+
+def _ensure_world(name=None):
+    scene = bpy.context.scene
+    if name:
+        world = bpy.data.worlds.get(name) or bpy.data.worlds.new(name)
+        scene.world = world
+    elif scene.world is None:
+        scene.world = bpy.data.worlds.new("World")
+    return scene.world
+
+def custom_scene_set_render_resolution(resolution_x, resolution_y, percentage=100):
+    render = bpy.context.scene.render
+    render.resolution_x = resolution_x
+    render.resolution_y = resolution_y
+    render.resolution_percentage = percentage
+
+def custom_object_delete(object_names):
+    objects = [_get_object(name) for name in object_names]
+    for obj in objects:
+        bpy.data.objects.remove(obj, do_unlink=True)
+    PRIMITIVE_CACHE.evict_orphans()
+
+def _detach_for_edit(obj):
+    """``PRIMITIVE_CACHE.detach`` for an object that may already be in Edit Mode."""
+    if obj is None or obj.type != 'MESH' or PRIMITIVE_KEY_PROP not in obj.data:
+        return
+    if obj.mode != 'EDIT':
+        PRIMITIVE_CACHE.detach(obj)
+        return
+    # The edit mesh lives on the shared data; leave Edit Mode to swap it.
+    bpy.ops.object.mode_set(mode='OBJECT')
+    PRIMITIVE_CACHE.detach(obj)
+    bpy.ops.object.mode_set(mode='EDIT')
+
+def custom_context_set_object_mode(mode, object_name=None):
+    if object_name:
+        obj = _get_object(object_name)
+        bpy.context.view_layer.objects.active = obj
+        obj.select_set(True)
+    active = bpy.context.view_layer.objects.active
+    if active is None:
+        raise ValueError("No active object to change mode on")
+    if mode != 'OBJECT':
+        # Edit, sculpt and paint modes write mesh data; Edit Mode also takes
+        # in the other selected meshes.
+        targets = [active] + (list(bpy.context.selected_objects) if mode == 'EDIT' else [])
+        for obj in targets:
+            _detach_for_edit(obj)
+    bpy.ops.object.mode_set(mode=mode)
+
+def _resolve_buffer(value, dtype, name):
+    """Return a flat NumPy view of a binary parameter without copying it."""
+    if isinstance(value, dict) and "upload_id" in value:
+        value = UPLOAD_STORE.open_buffer(value["upload_id"])
+    if isinstance(value, (list, tuple)):
+        return np.asarray(value, dtype=dtype).ravel()
+    itemsize = np.dtype(dtype).itemsize
+    if memoryview(value).nbytes % itemsize:
+        raise ValueError(f"'{name}' is not a whole number of {np.dtype(dtype).name} values")
+    return np.frombuffer(value, dtype=dtype)
+
+def _build_mesh(name, vertices, indices=None, face_sizes=None, edges=None, uvs=None, normals=None, uv_map_name="UVMap", validate=False):
+    """Create a mesh datablock from flat float32/int32 arrays via foreach_set.
+
+    Every input is checked before the datablock is created, and a failure
+    while filling it removes it again, so errors leave no orphan mesh.
+    """
+    if len(vertices) % 3:
+        raise ValueError("vertices must hold x,y,z triples")
+    num_verts = len(vertices) // 3
+    num_loops = 0 if indices is None else len(indices)
+    if num_loops:
+        if face_sizes.sum() != num_loops or (face_sizes < 3).any():
+            raise ValueError("face sizes must be >= 3 and add up to the number of indices")
+        if indices.min() < 0 or indices.max() >= num_verts:
+            raise ValueError("face indices out of range")
+    if edges is not None and len(edges):
+        if len(edges) % 2 or edges.min() < 0 or edges.max() >= num_verts:
+            raise ValueError("edges must be in-range vertex index pairs")
+    if uvs is not None and len(uvs) and len(uvs) != num_loops * 2:
+        raise ValueError("uvs must hold one u,v pair per face corner")
+    if normals is not None and len(normals):
+        if len(normals) % 3 or len(normals) // 3 not in (num_verts, num_loops):
+            raise ValueError("normals must hold one x,y,z per vertex or per face corner")
+        normals = normals.reshape(-1, 3)
+    mesh = bpy.data.meshes.new(name)
+    try:
+        mesh.vertices.add(num_verts)
+        mesh.vertices.foreach_set("co", vertices)
+        if edges is not None and len(edges):
+            mesh.edges.add(len(edges) // 2)
+            mesh.edges.foreach_set("vertices", edges)
+        if num_loops:
+            loop_starts = np.zeros(len(face_sizes), dtype=np.int32)
+            np.cumsum(face_sizes[:-1], out=loop_starts[1:])
+            mesh.loops.add(num_loops)
+            mesh.loops.foreach_set("vertex_index", indices)
+            mesh.polygons.add(len(face_sizes))
+            mesh.polygons.foreach_set("loop_start", loop_starts)
+            if bpy.app.version < (4, 0, 0):
+                mesh.polygons.foreach_set("loop_total", face_sizes)
+        mesh.update(calc_edges=True)
+        if uvs is not None and len(uvs):
+            mesh.uv_layers.new(name=uv_map_name).data.foreach_set("uv", uvs)
+        if normals is not None and len(normals):
+            if hasattr(mesh, "use_auto_smooth"):
+                mesh.use_auto_smooth = True
+            if len(normals) == num_verts:
+                mesh.normals_split_custom_set_from_vertices(normals)
+            else:
+                mesh.normals_split_custom_set(normals)
+        if validate:
+            mesh.validate()
+    except Exception:
+        bpy.data.meshes.remove(mesh)
+        raise
+    return mesh
+
+def custom_bmesh_create_custom_mesh_from_verts_edges_faces(object_name, verts, edges=(), faces=(), location=(0, 0, 0)):
+    face_sizes = np.fromiter(map(len, faces), dtype=np.int32, count=len(faces))
+    indices = np.fromiter(itertools.chain.from_iterable(faces), dtype=np.int32, count=int(face_sizes.sum()))
+    mesh = _build_mesh(
+        object_name + "_mesh",
+        np.asarray(verts, dtype=np.float32).reshape(-1),
+        indices,
+        face_sizes,
+        np.asarray(edges, dtype=np.int32).reshape(-1),
+    )
+    obj = _link_object(bpy.data.objects.new(object_name, mesh), location)
+    return obj.name
+
+def custom_mesh_create_from_buffers(object_name, vertices, indices=None, face_sizes=None, face_size=3, edges=None, uvs=None, normals=None, uv_map_name="UVMap", location=(0, 0, 0), validate=False):
+    vertices = _resolve_buffer(vertices, "<f4", "vertices")
+    if indices is not None:
+        indices = _resolve_buffer(indices, "<i4", "indices")
+        if face_sizes is not None:
+            face_sizes = _resolve_buffer(face_sizes, "<i4", "face_sizes")
+        else:
+            if face_size < 3 or len(indices) % face_size:
+                raise ValueError(f"indices do not split into faces of {face_size} corners")
+            face_sizes = np.full(len(indices) // face_size, face_size, dtype=np.int32)
+    mesh = _build_mesh(
+        object_name + "_mesh",
+        vertices,
+        indices,
+        face_sizes,
+        None if edges is None else _resolve_buffer(edges, "<i4", "edges"),
+        None if uvs is None else _resolve_buffer(uvs, "<f4", "uvs"),
+        None if normals is None else _resolve_buffer(normals, "<f4", "normals"),
+        uv_map_name,
+        validate,
+    )
+    obj = _link_object(bpy.data.objects.new(object_name, mesh), location)
+    return {"object_name": obj.name, "vertices": len(mesh.vertices), "loops": len(mesh.loops), "faces": len(mesh.polygons)}
+
+# Numeric fields gathered with one foreach_get per field: attribute and values per object.
+SCENE_QUERY_FIELDS = {
+    "location": ("location", 3),
+    "rotation": ("rotation_euler", 3),
+    "scale": ("scale", 3),
+    "dimensions": ("dimensions", 3),
+    "matrix_world": ("matrix_world", 16),
+}
+SCENE_QUERY_MAX_LIMIT = 10000  # for nested lists; packed pages have no upper bound
+_scene_query_index = (None, [], None, None)  # (scope, objects, names, types) for the current scene version
+
+def _packed_array(array, packed):
+    """Describe an array as a binary attachment (or nested lists when not packed)."""
+    array = np.ascontiguousarray(array)
+    data = memoryview(array.reshape(-1)).cast("B") if packed else array.tolist()
+    return {"dtype": array.dtype.str, "shape": list(array.shape), "data": data}
+
+def _scene_query_rows(collection, objects):
+    """``objects`` as a list plus name and type arrays, rebuilt only when the scene version changes.
+
+    Later pages of a query then cost one slice instead of a pass over every object.
+    """
+    global _scene_query_index
+    scope = (collection, *scene_version())
+    if _scene_query_index[0] != scope or len(_scene_query_index[1]) != len(objects):
+        items = list(objects)
+        names = np.array([obj.name for obj in items], dtype=object)
+        kinds = np.array([obj.type for obj in items], dtype=object)
+        _scene_query_index = (scope, items, names, kinds)
+    return _scene_query_index[1:]
+
+def custom_scene_query(cursor=0, limit=1000, types=None, collection=None, fields=("location",), packed=True):
+    unknown = set(fields) - SCENE_QUERY_FIELDS.keys() - {"material_slots"}
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(sorted(unknown))}. Available: {', '.join(sorted(SCENE_QUERY_FIELDS))}, material_slots")
+    if cursor < 0 or limit < 1 or (not packed and limit > SCENE_QUERY_MAX_LIMIT):
+        raise ValueError(f"cursor must be >= 0 and limit at least 1 (at most {SCENE_QUERY_MAX_LIMIT} when not packed)")
+    objects = _get_datablock("collections", collection).all_objects if collection else bpy.context.scene.objects
+    items, names, kinds = _scene_query_rows(collection, objects)
+    count = len(names)
+    rows = np.flatnonzero(np.isin(kinds, list(types))) if types else np.arange(count)
+    page = rows[cursor:cursor + limit]
+    end = cursor + len(page)
+    result = {
+        "total": len(rows),
+        "cursor": cursor,
+        "next_cursor": end if end < len(rows) else None,
+        "names": names[page].tolist(),
+        "fields": {},
+    }
+    for field in fields:
+        if field == "material_slots":
+            result["material_slots"] = [
+                [slot.material.name if slot.material else None for slot in items[i].material_slots]
+                for i in page
+            ]
+            continue
+        attr, width = SCENE_QUERY_FIELDS[field]
+        values = np.empty(count * width, dtype=np.float32)
+        objects.foreach_get(attr, values)
+        values = values.reshape(count, width)
+        if len(page) < count:
+            values = values[page]
+        if width == 16:
+            # foreach_get yields Blender's column-major storage; send rows.
+            values = values.reshape(-1, 4, 4).transpose(0, 2, 1).reshape(-1, 16)
+        result["fields"][field] = _packed_array(values, packed)
+    return result
+
+# Bulk transform parameters: object attribute and values per object (per frame for keyframes).
+BULK_TRANSFORM_FIELDS = {
+    "locations": ("location", 3),
+    "rotations": ("rotation_euler", 3),
+    "scales": ("scale", 3),
+}
+KEYFRAME_GROUP = "Object Transforms"
+
+def _editable_objects(object_names):
+    """The named objects, refusing any linked from a library (edits to them are not saved)."""
+    missing = [name for name in object_names if name not in bpy.data.objects]
+    if missing:
+        raise LookupError(f"{len(missing)} object(s) not found: {', '.join(missing[:10])}")
+    objects = [bpy.data.objects[name] for name in object_names]
+    linked = [obj.name for obj in objects if obj.library is not None]
+    if linked:
+        raise ValueError(f"{len(linked)} object(s) are linked from a library and cannot be edited: {', '.join(linked[:10])}")
+    return objects
+
+def _bulk_values(values, field, rows, frames=1):
+    """Resolve a packed float32 parameter and shape it (objects, frames, width)."""
+    width = BULK_TRANSFORM_FIELDS[field][1]
+    values = _resolve_buffer(values, "<f4", field)
+    expected = rows * frames * width
+    if len(values) != expected:
+        raise ValueError(f"'{field}' has {len(values)} values, expected {expected} ({width} per object{' per frame' if frames > 1 else ''})")
+    return values.reshape(rows, frames, width)
+
+def custom_object_transform_bulk(object_names, locations=None, rotations=None, scales=None):
+    objects = _editable_objects(object_names)
+    given = {field: value for field, value in (("locations", locations), ("rotations", rotations), ("scales", scales)) if value is not None}
+    if not given:
+        raise ValueError("Pass at least one of locations, rotations or scales")
+    # Validate every buffer before writing any, so a bad one leaves the scene untouched.
+    arrays = {field: _bulk_values(value, field, len(objects)).reshape(len(objects), -1).tolist() for field, value in given.items()}
+    # Only the named objects are written; a whole-collection foreach_set
+    # would also write objects linked from libraries.
+    for field, rows in arrays.items():
+        attr = BULK_TRANSFORM_FIELDS[field][0]
+        for obj, row in zip(objects, rows):
+            setattr(obj, attr, row)
+    bpy.context.view_layer.update()
+    return {"objects": len(objects), "fields": sorted(BULK_TRANSFORM_FIELDS[field][0] for field in given)}
+
+def _insert_keyframes(fcurve, frames, values, replace):
+    """Key ``values`` at ``frames`` on ``fcurve`` with a single foreach_set.
+
+    Keys already on one of the frames take the new value instead of gaining
+    a duplicate; ``frames`` must not repeat.
+    """
+    points = fcurve.keyframe_points
+    if replace:
+        points.clear()
+    existing = len(points)
+    old = np.empty((existing, 2), dtype=np.float32)
+    if existing:
+        points.foreach_get("co", old.reshape(-1))
+        order = np.argsort(frames)
+        pos = np.minimum(np.searchsorted(frames, old[:, 0], sorter=order), len(frames) - 1)
+        matched = frames[order[pos]] == old[:, 0]
+        old[matched, 1] = values[order[pos[matched]]]
+        fresh = np.ones(len(frames), dtype=bool)
+        fresh[order[pos[matched]]] = False
+        frames, values = frames[fresh], values[fresh]
+    co = np.empty((existing + len(frames), 2), dtype=np.float32)
+    co[:existing] = old
+    co[existing:, 0] = frames
+    co[existing:, 1] = values
+    points.add(len(frames))
+    points.foreach_set("co", co.reshape(-1))
+    fcurve.update()  # sort keys and recalculate auto handles
+
+def custom_object_keyframes_bulk(object_names, frames, locations=None, rotations=None, scales=None, replace=False):
+    frames = _resolve_buffer(frames, "<f4", "frames")
+    if not len(frames):
+        raise ValueError("frames is empty")
+    if len(np.unique(frames)) != len(frames):
+        raise ValueError("frames has repeated values")
+    given = {field: value for field, value in (("locations", locations), ("rotations", rotations), ("scales", scales)) if value is not None}
+    if not given:
+        raise ValueError("Pass at least one of locations, rotations or scales")
+    objects = _editable_objects(object_names)
+    arrays = {field: _bulk_values(value, field, len(objects), len(frames)) for field, value in given.items()}
+    fcurves = 0
+    for row, obj in enumerate(objects):
+        if obj.animation_data is None:
+            obj.animation_data_create()
+        action = obj.animation_data.action
+        if action is None:
+            action = obj.animation_data.action = bpy.data.actions.new(f"{obj.name}Action")
+        for field, values in arrays.items():
+            attr, width = BULK_TRANSFORM_FIELDS[field]
+            for index in range(width):
+                fcurve = action.fcurves.find(attr, index=index) or action.fcurves.new(attr, index=index, action_group=KEYFRAME_GROUP)
+                _insert_keyframes(fcurve, frames, values[row, :, index], replace)
+                fcurves += 1
+    return {"objects": len(objects), "frames": len(frames), "fcurves": fcurves, "keyframes": fcurves * len(frames)}
+
+# Scatter: one point mesh whose vertices carry rotation and scale attributes,
+# instanced by a shared geometry-nodes group, so N instances cost one object.
+SCATTER_NODE_GROUP = "MCP Scatter"
+SCATTER_SOURCE_PROP = "mcp_scatter_source"
+SCATTER_KIND_PROP = "mcp_scatter_kind"  # "OBJECT" or "COLLECTION"
+SCATTER_ATTRIBUTES = (("rotation", "Rotation", 0.0), ("scale", "Scale", 1.0))  # attribute, node input, default
+SCATTER_MIN_VERSION = (3, 2, 0)  # first release with the Named Attribute node
+
+def _vector_buffer(value, name, count=None):
+    """Resolve a packed float32 x,y,z parameter, optionally checking it holds ``count`` vectors."""
+    values = _resolve_buffer(value, "<f4", name)
+    if len(values) % 3 or (count is not None and len(values) != count * 3):
+        expected = "a multiple of 3" if count is None else str(count * 3)
+        raise ValueError(f"'{name}' has {len(values)} values, expected {expected} (x,y,z per point)")
+    return values
+
+def _new_group_socket(group, in_out, socket_type, name):
+    if bpy.app.version >= (4, 0, 0):
+        return group.interface.new_socket(name, in_out=in_out, socket_type=socket_type)
+    sockets = group.inputs if in_out == "INPUT" else group.outputs
+    return sockets.new(socket_type, name)
+
+def _group_input_identifier(group, name):
+    """Key of a group input on a node modifier ("Input_N" before Blender 4.0)."""
+    if bpy.app.version >= (4, 0, 0):
+        return group.interface.items_tree[name].identifier
+    return group.inputs[name].identifier
+
+def _scatter_node_group(kind):
+    """Get or build the node group instancing the Source object or collection on every point."""
+    name = f"{SCATTER_NODE_GROUP} {kind.title()}"
+    group = bpy.data.node_groups.get(name)
+    if group is not None:
+        return group
+    group = bpy.data.node_groups.new(name, "GeometryNodeTree")
+    _new_group_socket(group, "INPUT", "NodeSocketGeometry", "Geometry")
+    _new_group_socket(group, "INPUT", "NodeSocketObject" if kind == "OBJECT" else "NodeSocketCollection", "Source")
+    _new_group_socket(group, "OUTPUT", "NodeSocketGeometry", "Geometry")
+    nodes, links = group.nodes, group.links
+    group_input = nodes.new("NodeGroupInput")
+    group_output = nodes.new("NodeGroupOutput")
+    instance = nodes.new("GeometryNodeInstanceOnPoints")
+    if kind == "OBJECT":
+        info = nodes.new("GeometryNodeObjectInfo")
+        info.inputs["As Instance"].default_value = True
+        links.new(group_input.outputs["Source"], info.inputs["Object"])
+        links.new(info.outputs["Geometry"], instance.inputs["Instance"])
+    else:
+        info = nodes.new("GeometryNodeCollectionInfo")
+        links.new(group_input.outputs["Source"], info.inputs["Collection"])
+        links.new(info.outputs[0], instance.inputs["Instance"])  # "Geometry" before 3.3, then "Instances"
+    info.transform_space = "ORIGINAL"
+    links.new(group_input.outputs["Geometry"], instance.inputs["Points"])
+    for attribute, input_name, _default in SCATTER_ATTRIBUTES:
+        named = nodes.new("GeometryNodeInputNamedAttribute")
+        named.data_type = "FLOAT_VECTOR"
+        named.inputs["Name"].default_value = attribute
+        links.new(named.outputs["Attribute"], instance.inputs[input_name])
+    links.new(instance.outputs["Instances"], group_output.inputs["Geometry"])
+    return group
+
+def _set_scatter_points(mesh, points, attributes):
+    """Replace the mesh's geometry with loose vertices plus vector point attributes."""
+    mesh.clear_geometry()
+    mesh.vertices.add(len(points) // 3)
+    mesh.vertices.foreach_set("co", points)
+    for attribute, values in attributes.items():
+        layer = mesh.attributes.get(attribute) or mesh.attributes.new(attribute, "FLOAT_VECTOR", "POINT")
+        layer.data.foreach_set("vector", values)
+    mesh.update()
+
+def _scatter_source(obj):
+    kind = obj.get(SCATTER_KIND_PROP)
+    if kind not in ("OBJECT", "COLLECTION"):
+        raise ValueError(f"Object '{obj.name}' was not created by scatter_instances")
+    return kind, _get_datablock("objects" if kind == "OBJECT" else "collections", obj[SCATTER_SOURCE_PROP])
+
+def custom_scatter_instances(object_name, points, source_object=None, source_collection=None, rotations=None, scales=None, location=(0, 0, 0), hide_source=False):
+    if bpy.app.version < SCATTER_MIN_VERSION:
+        raise RuntimeError(f"requires Blender {'.'.join(map(str, SCATTER_MIN_VERSION))} or later")
+    if (source_object is None) == (source_collection is None):
+        raise ValueError("Pass exactly one of source_object or source_collection")
+    kind = "OBJECT" if source_object is not None else "COLLECTION"
+    source = _get_object(source_object) if kind == "OBJECT" else _get_datablock("collections", source_collection)
+    points = _vector_buffer(points, "points")
+    count = len(points) // 3
+    attributes = {}
+    for (attribute, _socket, default), value in zip(SCATTER_ATTRIBUTES, (rotations, scales)):
+        attributes[attribute] = np.full(count * 3, default, dtype=np.float32) if value is None else _vector_buffer(value, f"{attribute}s", count)
+    mesh = bpy.data.meshes.new(object_name + "_points")
+    _set_scatter_points(mesh, points, attributes)
+    obj = _link_object(bpy.data.objects.new(object_name, mesh), location)
+    group = _scatter_node_group(kind)
+    modifier = obj.modifiers.new("Scatter", "NODES")
+    modifier.node_group = group
+    modifier[_group_input_identifier(group, "Source")] = source
+    obj[SCATTER_KIND_PROP] = kind
+    obj[SCATTER_SOURCE_PROP] = source.name
+    if hide_source and kind == "OBJECT":
+        source.hide_viewport = source.hide_render = True
+    return {"object_name": obj.name, "instances": count, "node_group": group.name}
+
+def custom_scatter_realize(object_name, indices, remove=True):
+    scatter = _get_object(object_name)
+    kind, source = _scatter_source(scatter)
+    mesh = scatter.data
+    count = len(mesh.vertices)
+    indices = np.unique(_resolve_buffer(indices, "<i4", "indices"))
+    if len(indices) and (indices[0] < 0 or indices[-1] >= count):
+        raise ValueError(f"indices must be between 0 and {count - 1}")
+    points = np.empty(count * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", points)
+    attributes = {}
+    for attribute, _socket, default in SCATTER_ATTRIBUTES:
+        values = np.full(count * 3, default, dtype=np.float32)
+        layer = mesh.attributes.get(attribute)
+        if layer is not None:
+            layer.data.foreach_get("vector", values)
+        attributes[attribute] = values
+    target = scatter.users_collection[0] if scatter.users_collection else bpy.context.scene.collection
+    location, rotation, scale = (array.reshape(-1, 3)[indices].tolist() for array in (points, attributes["rotation"], attributes["scale"]))
+    names = []
+    for i, loc, rot, size in zip(indices.tolist(), location, rotation, scale):
+        if kind == "OBJECT":
+            obj = source.copy()  # shares the source's data, keeps its modifiers and materials
+            obj.hide_viewport = obj.hide_render = False  # hide_source may have hidden the source
+        else:
+            obj = bpy.data.objects.new(source.name, None)
+            obj.instance_type = "COLLECTION"
+            obj.instance_collection = source
+        obj.name = f"{scatter.name}.{i}"
+        # Parented to the scatter object, the point's local transform is kept as is.
+        obj.parent = scatter
+        obj.matrix_parent_inverse.identity()
+        obj.location, obj.rotation_euler, obj.scale = loc, rot, size
+        target.objects.link(obj)
+        names.append(obj.name)
+    remaining = count
+    if remove and len(indices):
+        keep = np.setdiff1d(np.arange(count), indices)
+        _set_scatter_points(mesh, points.reshape(-1, 3)[keep].ravel(), {name: values.reshape(-1, 3)[keep].ravel() for name, values in attributes.items()})
+        remaining = len(keep)
+    return {"objects": names, "instances": remaining}
+
+def custom_object_add_subdivision_surface_modifier(object_name, levels=1, render_levels=2, quality=3, uv_smooth="PRESERVE_CORNERS"):
+    mod = _get_mesh_object(object_name).modifiers.new(name="Subdivision", type='SUBSURF')
+    mod.levels = levels
+    mod.render_levels = render_levels
+    mod.quality = quality
+    mod.uv_smooth = uv_smooth
+    return mod.name
+
+def _set_smooth(object_name, smooth):
+    mesh = PRIMITIVE_CACHE.detach(_get_mesh_object(object_name))
+    if hasattr(mesh, "shade_smooth"):
+        mesh.shade_smooth() if smooth else mesh.shade_flat()
+    else:
+        mesh.polygons.foreach_set("use_smooth", [smooth] * len(mesh.polygons))
+    mesh.update()
+
+def custom_object_shade_smooth_operator(object_name):
+    _set_smooth(object_name, True)
+
+def custom_object_shade_flat_operator(object_name):
+    _set_smooth(object_name, False)
+
+def custom_sculpt_set_brush_settings(brush_name=None, size=None, strength=None, auto_smooth_factor=None):
+    sculpt = bpy.context.tool_settings.sculpt
+    if brush_name:
+        sculpt.brush = _get_datablock("brushes", brush_name)
+    brush = sculpt.brush
+    if brush is None:
+        raise ValueError("No active sculpt brush")
+    for attr, value in (("size", size), ("strength", strength), ("auto_smooth_factor", auto_smooth_factor)):
+        if value is not None:
+            setattr(brush, attr, value)
+
+def custom_mesh_uv_layers_new(object_name, uv_map_name="UVMap"):
+    return PRIMITIVE_CACHE.detach(_get_mesh_object(object_name)).uv_layers.new(name=uv_map_name).name
+
+def custom_mesh_uv_layer_set_active(object_name, uv_map_name):
+    uv_layers = PRIMITIVE_CACHE.detach(_get_mesh_object(object_name)).uv_layers
+    index = uv_layers.find(uv_map_name)
+    if index < 0:
+        raise LookupError(f"UV map '{uv_map_name}' not found")
+    uv_layers.active_index = index
+
+def custom_data_materials_new_principled_bsdf(material_name):
+    mat = bpy.data.materials.new(material_name)
+    mat.use_nodes = True
+    nodes = mat.node_tree.nodes
+    if not any(n.type == 'BSDF_PRINCIPLED' for n in nodes):
+        bsdf = nodes.new("ShaderNodeBsdfPrincipled")
+        output = next((n for n in nodes if n.type == 'OUTPUT_MATERIAL'), None) or nodes.new("ShaderNodeOutputMaterial")
+        mat.node_tree.links.new(bsdf.outputs["BSDF"], output.inputs["Surface"])
+    return mat.name
+
+def custom_object_assign_material(object_name, material_name, slot_index=0):
+    obj = _get_object(object_name)
+    mat = _get_datablock("materials", material_name)
+    materials = PRIMITIVE_CACHE.detach(obj).materials
+    while len(materials) <= slot_index:
+        materials.append(None)
+    materials[slot_index] = mat
+
+def custom_data_images_load(filepath=None, check_existing=False, upload_id=None):
+    if upload_id:
+        # The upload's file is temporary, so the image is packed into the .blend.
+        filepath = UPLOAD_STORE.claim_path(upload_id)
+        try:
+            image = bpy.data.images.load(filepath)
+            try:
+                image.pack()
+            except Exception:
+                bpy.data.images.remove(image)
+                raise
+        finally:
+            UPLOAD_STORE.release_path(filepath)
+        return image.name
+    if not filepath:
+        raise ValueError("Either filepath or upload_id is required")
+    return bpy.data.images.load(filepath, check_existing=check_existing).name
+
+def custom_material_principled_bsdf_set_base_color_texture(material_name, image_name_or_filepath, uv_map_name=None):
+    mat = _get_datablock("materials", material_name)
+    bsdf = _get_principled_bsdf(mat)
+    tex = _add_image_texture(mat, image_name_or_filepath, "sRGB", uv_map_name)
+    mat.node_tree.links.new(tex.outputs["Color"], bsdf.inputs["Base Color"])
+
+def custom_material_principled_bsdf_set_value(material_name, input_name, value):
+    bsdf = _get_principled_bsdf(_get_datablock("materials", material_name))
+    _get_socket(bsdf.inputs, input_name).default_value = value
+
+def custom_material_principled_bsdf_set_texture_input(material_name, bsdf_input_name, image_name_or_filepath, image_color_space="Non-Color", uv_map_name=None, use_alpha_for_texture_output=False, needs_normal_map_node=False):
+    mat = _get_datablock("materials", material_name)
+    bsdf = _get_principled_bsdf(mat)
+    target = _get_socket(bsdf.inputs, bsdf_input_name)
+    tex = _add_image_texture(mat, image_name_or_filepath, image_color_space, uv_map_name)
+    output = tex.outputs["Alpha" if use_alpha_for_texture_output else "Color"]
+    links = mat.node_tree.links
+    if needs_normal_map_node:
+        normal_map = mat.node_tree.nodes.new("ShaderNodeNormalMap")
+        links.new(output, normal_map.inputs["Color"])
+        output = normal_map.outputs["Normal"]
+    links.new(output, target)
+
+def custom_light_add_point(name, location=(0, 0, 0), energy=100.0, color=(1, 1, 1), radius=0.05):
+    light = bpy.data.lights.new(name, type='POINT')
+    light.energy = energy
+    light.color = color
+    light.shadow_soft_size = radius
+    return _link_object(bpy.data.objects.new(name, light), location).name
+
+def custom_light_set_property(light_object_name, property_name, value):
+    obj = _get_object(light_object_name)
+    if obj.type != 'LIGHT':
+        raise ValueError(f"Object '{light_object_name}' is not a light")
+    if not hasattr(obj.data, property_name):
+        raise AttributeError(f"Light has no property '{property_name}'")
+    setattr(obj.data, property_name, value)
+
+def custom_camera_add(name, location=(0, -7, 2), rotation_euler=(1.309, 0, 0), lens=50.0, type="PERSP"):
+    cam = bpy.data.cameras.new(name)
+    cam.lens = lens
+    cam.type = type
+    obj = _link_object(bpy.data.objects.new(name, cam), location)
+    obj.rotation_euler = rotation_euler
+    return obj.name
+
+def custom_world_set_hdri_environment(hdri_image_filepath, strength=1.0, world_name="EnvironmentWorld"):
+    world = _ensure_world(world_name)
+    world.use_nodes = True
+    tree = world.node_tree
+    background = next((n for n in tree.nodes if n.type == 'BACKGROUND'), None) or tree.nodes.new("ShaderNodeBackground")
+    env = next((n for n in tree.nodes if n.type == 'TEX_ENVIRONMENT'), None) or tree.nodes.new("ShaderNodeTexEnvironment")
+    env.image = bpy.data.images.load(hdri_image_filepath, check_existing=True)
+    tree.links.new(env.outputs["Color"], background.inputs["Color"])
+    background.inputs["Strength"].default_value = strength
+    output = next((n for n in tree.nodes if n.type == 'OUTPUT_WORLD'), None) or tree.nodes.new("ShaderNodeOutputWorld")
+    tree.links.new(background.outputs["Background"], output.inputs["Surface"])
+
+def custom_world_set_background_color(color):
+    world = _ensure_world()
+    world.use_nodes = False
+    world.color = color
+
+def custom_compositor_add_node(node_type, node_name=None):
+    scene = bpy.context.scene
+    scene.use_nodes = True
+    node = scene.node_tree.nodes.new(type=node_type)
+    if node_name:
+        node.name = node_name
+    return node.name
+
+def custom_compositor_link_nodes(from_node_name, from_socket_name_or_index, to_node_name, to_socket_name_or_index):
+    tree = bpy.context.scene.node_tree
+    if tree is None:
+        raise ValueError("Compositor nodes are not enabled")
+    from_node = tree.nodes.get(from_node_name)
+    to_node = tree.nodes.get(to_node_name)
+    if from_node is None or to_node is None:
+        raise LookupError("Compositor node not found")
+    tree.links.new(_get_socket(from_node.outputs, from_socket_name_or_index), _get_socket(to_node.inputs, to_socket_name_or_index))
+
+def _draw_texts_callback():
+    import blf
+    from bpy_extras.view3d_utils import location_3d_to_region_2d
+    region = bpy.context.region
+    rv3d = bpy.context.region_data
+    for item in DRAW_TEXTS.values():
+        pos = location_3d_to_region_2d(region, rv3d, item["location"])
+        if pos is None:
+            continue
+        blf.position(0, pos[0], pos[1], 0)
+        blf.size(0, item["font_size"])
+        blf.color(0, *item["color"])
+        blf.draw(0, item["text"])
+
+def _enable_text_drawing():
+    global _draw_handle
+    if _draw_handle is None and not bpy.app.background:
+        _draw_handle = bpy.types.SpaceView3D.draw_handler_add(_draw_texts_callback, (), 'WINDOW', 'POST_PIXEL')
+
+def _disable_text_drawing():
+    global _draw_handle
+    if _draw_handle is not None:
+        bpy.types.SpaceView3D.draw_handler_remove(_draw_handle, 'WINDOW')
+        _draw_handle = None
+
+def custom_drawing_add_3d_text(text_id, text_content, world_location, color_rgba=(1, 1, 1, 1), font_size=16):
+    DRAW_TEXTS[text_id] = {"text": text_content, "location": world_location, "color": color_rgba, "font_size": font_size}
+    _enable_text_drawing()
+    for area in getattr(bpy.context.screen, "areas", ()):
+        if area.type == 'VIEW_3D':
+            area.tag_redraw()
+
+def custom_op_render_image(write_still=True, use_viewport=False, animation=False, frame_start=None, frame_end=None, frame_step=1, tiles=1):
+    scene = bpy.context.scene
+    if animation or frame_start is not None or frame_end is not None:
+        start = scene.frame_start if frame_start is None else frame_start
+        end = scene.frame_end if frame_end is None else frame_end
+        frames = list(range(start, end + 1, max(1, frame_step)))
+    else:
+        frames = [scene.frame_current]
+    job = submit_render(frames, tiles, write_still, use_viewport)
+    return {"job_id": job.job_id, "frames": len(frames), "units": len(job.units)}
+
+def custom_render_job_status(job_id):
+    job = _get_render_job(job_id)
+    with _job_lock:
+        status = dict(JOB_STATUS.get(job_id, {}))
+    status["outputs"] = [{key: output[key] for key in ("frame", "tile", "size")} for output in job.outputs]
+    return status
+
+def custom_render_cancel(job_id):
+    job = _get_render_job(job_id)
+    job.cancel_requested = not job.finished
+    _update_job(job_id, cancel_requested=job.cancel_requested)
+    return {"cancel_requested": job.cancel_requested}
+
+def custom_render_fetch(job_id, index=0, offset=0, length=MAX_CHUNK_SIZE):
+    job = _get_render_job(job_id)
+    if not 0 <= index < len(job.outputs):
+        raise LookupError(f"Render job {job_id} has no finished output {index} ({len(job.outputs)} available)")
+    output = job.outputs[index]
+    try:
+        with open(output["path"], "rb") as f:
+            f.seek(offset)
+            data = f.read(max(0, min(length, MAX_CHUNK_SIZE)))
+    except FileNotFoundError:
+        raise LookupError(f"Output {index} of render job {job_id} is not available: {output['path']} no longer exists")
+    return {
+        "filename": os.path.basename(output["path"]),
+        "frame": output["frame"],
+        "tile": output["tile"],
+        "offset": offset,
+        "total_size": output["size"],
+        "eof": offset + len(data) >= output["size"],
+        "data": data,
+    }
+
+def custom_script_register(source, name=None):
+    try:
+        script_id, compiled = SCRIPT_REGISTRY.register(source, name)
+    except SyntaxError as e:
+        raise ValueError(f"SyntaxError: {e}")
+    return {"script_id": script_id, "compiled": compiled}
+
+def custom_script_run(script_id, args=None, namespace=None):
+    return run_script(script_id=script_id, args=args, namespace=namespace)
+
+def custom_script_namespace_drop(namespace):
+    return {"dropped": SCRIPT_REGISTRY.drop_namespace(namespace)}
+
+def custom_script_registry_status(clear=False):
+    stats = SCRIPT_REGISTRY.stats()
+    if clear:
+        SCRIPT_REGISTRY.clear()
+    return stats
+
+# Legacy read-only commands, declared in blendertool.json so the relay can
+# call and cache them like any other spec tool.
+def custom_list_objects():
+    return cmd_list_objects({})["result"]
+
+def custom_describe():
+    # Kept under "result": compile_tool would spread a bare dict into the reply.
+    return {"result": cmd_describe({})["result"]}
+
+def custom_test_connection():
+    return {key: value for key, value in cmd_test_connection({}).items() if key != "status"}
+
+CUSTOM_HANDLERS = {
+    "list_objects": custom_list_objects,
+    "describe": custom_describe,
+    "test_connection": custom_test_connection,
+    "scene_set_render_resolution": custom_scene_set_render_resolution,
+    "object_delete": custom_object_delete,
+    "context_set_object_mode": custom_context_set_object_mode,
+    "bmesh_create_custom_mesh_from_verts_edges_faces": custom_bmesh_create_custom_mesh_from_verts_edges_faces,
+    "mesh_create_from_buffers": custom_mesh_create_from_buffers,
+    "scene_query": custom_scene_query,
+    "object_transform_bulk": custom_object_transform_bulk,
+    "object_keyframes_bulk": custom_object_keyframes_bulk,
+    "scatter_instances": custom_scatter_instances,
+    "scatter_realize": custom_scatter_realize,
+    "op_render_image": custom_op_render_image,
+    "render_job_status": custom_render_job_status,
+    "render_cancel": custom_render_cancel,
+    "render_fetch": custom_render_fetch,
+    "object_add_subdivision_surface_modifier": custom_object_add_subdivision_surface_modifier,
+    "object_shade_smooth_operator": custom_object_shade_smooth_operator,
+    "object_shade_flat_operator": custom_object_shade_flat_operator,
+    "sculpt_set_brush_settings": custom_sculpt_set_brush_settings,
+    "mesh_uv_layers_new": custom_mesh_uv_layers_new,
+    "mesh_uv_layer_set_active": custom_mesh_uv_layer_set_active,
+    "data_materials_new_principled_bsdf": custom_data_materials_new_principled_bsdf,
+    "object_assign_material": custom_object_assign_material,
+    "data_images_load": custom_data_images_load,
+    "material_principled_bsdf_set_base_color_texture": custom_material_principled_bsdf_set_base_color_texture,
+    "material_principled_bsdf_set_value": custom_material_principled_bsdf_set_value,
+    "material_principled_bsdf_set_texture_input": custom_material_principled_bsdf_set_texture_input,
+    "light_add_point": custom_light_add_point,
+    "light_set_property": custom_light_set_property,
+    "camera_add": custom_camera_add,
+    "world_set_hdri_environment": custom_world_set_hdri_environment,
+    "world_set_background_color": custom_world_set_background_color,
+    "compositor_add_node": custom_compositor_add_node,
+    "compositor_link_nodes": custom_compositor_link_nodes,
+    "drawing_add_3d_text": custom_drawing_add_3d_text,
+    "script_register": custom_script_register,
+    "script_run": custom_script_run,
+    "script_namespace_drop": custom_script_namespace_drop,
+    "script_registry_status": custom_script_registry_status,
+}
+
+# --- Spec-Driven Dispatcher ---
+# Each blendertool.json entry is compiled once into a handler that validates
+# its parameters and calls a pre-resolved attribute path, so dispatching a
+# tool is a dict lookup plus the Blender call itself.
+_OPERATOR_ARG_RENAMES = {"transform_kwargs": "TRANSFORM_OT_translate"}
+
+def _bpy_getter(path):
+    """Compile a dotted ``bpy.*`` path into a getter evaluated against bpy."""
+    if not path.startswith("bpy."):
+        raise SpecValidationError(f"Unsupported Blender path '{path}'")
+    return operator.attrgetter(path[len("bpy."):])
+
+def _datablock_param_collection(param):
+    match = re.match(r"bpy\.types\.(\w+) \(name\)", param.get("blender_type", ""))
+    if match:
+        return _DATA_COLLECTIONS.get(match.group(1))
+    if param["name"].endswith("object_name"):
+        return "objects"
+    return None
+
+def _result_value(value):
+    if isinstance(value, bpy.types.ID):
+        return value.name
+    return value
+
+def _get_window():
+    # Timer callbacks run without a window in context
+    window = bpy.context.window or next(iter(bpy.context.window_manager.windows), None)
+    if window is None:
+        raise ValueError("No Blender window available")
+    return window
+
+def _compile_property_set(tool):
+    target_path = tool["blender_object_type"]
+    prop = tool["blender_property_name"]
+    params = tool.get("parameters", [])
+    if target_path.startswith("bpy.types."):
+        # e.g. bpy.types.Object: the first parameter names the datablock to edit
+        selector = params[0]["name"]
+        collection = _DATA_COLLECTIONS[target_path[len("bpy.types."):]]
+        get_target = lambda p: _get_datablock(collection, p[selector])
+        value_param = params[1]
+    elif target_path == "bpy.context.window":
+        get_target = lambda p: _get_window()
+        value_param = params[0]
+    else:
+        getter = _bpy_getter(target_path)
+        get_target = lambda p: getter(bpy)
+        value_param = params[0]
+    value_name = value_param["name"]
+    value_collection = _datablock_param_collection(value_param)
+
+    def handler(p):
+        value = p[value_name]
+        if value_collection:
+            value = _get_datablock(value_collection, value)
+        setattr(get_target(p), prop, value)
+        return None
+    return handler
+
+def _compile_function_call(tool):
+    getter = _bpy_getter(tool["blender_path"])
+    return lambda p: _result_value(getter(bpy)(**p))
+
+def _operator_context():
+    if not hasattr(bpy.context, "temp_override"):
+        return None
+    try:
+        window = _get_window()
+    except ValueError:
+        return None
+    area = next((a for a in window.screen.areas if a.type == 'VIEW_3D'), None)
+    if area is None:
+        return bpy.context.temp_override(window=window)
+    region = next((r for r in area.regions if r.type == 'WINDOW'), None)
+    return bpy.context.temp_override(window=window, area=area, region=region)
+
+def _compile_operator_call(tool):
+    getter = _bpy_getter(tool["blender_operator_path"])
+    reports_object = ".primitive_" in tool["blender_operator_path"]
+    edits_mesh = not reports_object and tool["blender_operator_path"].startswith(("bpy.ops.mesh.", "bpy.ops.uv."))
+
+    def handler(p):
+        kwargs = {_OPERATOR_ARG_RENAMES.get(k, k): v for k, v in p.items()}
+        if edits_mesh:
+            _detach_for_edit(bpy.context.active_object)
+        override = _operator_context()
+        if override is None:
+            result = getter(bpy)(**kwargs)
+        else:
+            with override:
+                result = getter(bpy)(**kwargs)
+        if "FINISHED" not in result:
+            raise RuntimeError(f"Operator {tool['blender_operator_path']} returned {sorted(result)}")
+        if reports_object and bpy.context.active_object is not None:
+            return {"result": sorted(result), "object_name": bpy.context.active_object.name}
+        return {"result": sorted(result)}
+    return handler
+
+def _compile_custom(tool):
+    fn = CUSTOM_HANDLERS.get(tool["tool_name"])
+    if fn is None:
+        return None
+    return lambda p: fn(**p)
+
+_HANDLER_COMPILERS = {
+    "property_set": _compile_property_set,
+    "function_call": _compile_function_call,
+    "operator_call": _compile_operator_call,
+    "custom_blender_function": _compile_custom,
+}
+
+def compile_tool(tool):
+    """Build ``handler(params) -> response`` for a blendertool.json entry."""
+    compiler = _HANDLER_COMPILERS.get(tool.get("handler_type"))
+    call = compiler(tool) if compiler else None
+    if call is None:
+        return None
+    validate = tool_spec.compile_parameters(tool)
+    tool_name = tool["tool_name"]
+
+    def handler(params):
+        try:
+            result = call(validate(params))
+        except SpecValidationError as e:
+            return {"status": "error", "message": str(e)}
+        except (LookupError, ValueError, TypeError, AttributeError, RuntimeError) as e:
+            return {"status": "error", "message": f"{tool_name}: {str(e)}"}
+        if isinstance(result, dict):
+            return {"status": "ok", **result}
+        return {"status": "ok", "result": result}
+    handler.__doc__ = tool.get("description")
+    return handler
+
+def build_spec_handlers(index):
+    handlers = {}
+    for tool_name, tool in index.items():
+        handler = compile_tool(tool)
+        if handler is None:
+            log(f"No handler for blendertool.json entry '{tool_name}'", "WARNING")
+            continue
+        handlers[tool_name] = handler
+    return handlers
+
+SPEC_HANDLERS = build_spec_handlers(TOOL_INDEX)
+
+# --- Batch Execution ---
+BATCH_MODES = ("stop_on_error", "continue_on_error")
+
+def _lookup_ref(ref, outputs):
+    key, _, path = str(ref).partition(".")
+    if key not in outputs:
+        raise KeyError(f"Unknown batch reference '{ref}'")
+    value = outputs[key]
+    for part in path.split(".") if path else ():
+        value = value[int(part)] if isinstance(value, list) else value[part]
+    return value
+
+def _resolve_refs(value, outputs):
+    """Replace ``{"$ref": "<step>.<field>"}`` placeholders with earlier step outputs."""
+    if isinstance(value, dict):
+        if len(value) == 1 and "$ref" in value:
+            return _lookup_ref(value["$ref"], outputs)
+        return {k: _resolve_refs(v, outputs) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_resolve_refs(v, outputs) for v in value]
+    return value
+
+def cmd_batch(params):
+    """Run an ordered list of commands in one main-thread pass.
+
+    Args:
+        - commands (list): entries of {"type", "params", "id"}; params may hold
+          {"$ref": "<id or index>.<field>"} to reuse an earlier step's response.
+          A step with "error" (one the relay could not build) fails with it.
+        - mode (str): "stop_on_error" (default) or "continue_on_error".
+    """
+    commands = params.get("commands") or []
+    mode = params.get("mode", "stop_on_error")
+    if mode not in BATCH_MODES:
+        return {"status": "error", "message": f"Unsupported batch mode: {mode}"}
+    if not isinstance(commands, list):
+        return {"status": "error", "message": "commands must be a list"}
+    outputs = {}
+    results = []
+    failed = 0
+    for index, item in enumerate(commands):
+        t = item.get("type") if isinstance(item, dict) else None
+        if isinstance(item, dict) and item.get("error"):
+            resp = {"status": "error", "message": str(item["error"])}
+        elif not isinstance(t, str) or not isinstance(item.get("params", {}), dict):
+            # Reported as this step's failure, so the batch mode decides what happens next.
+            item = {}
+            resp = {"status": "error", "message": f"Step {index} must be an object with a string 'type' and object 'params'"}
+        elif t == "batch":
+            resp = {"status": "error", "message": "Nested batches are not supported"}
+        else:
+            try:
+                resp = handle_command({"type": t, "params": _resolve_refs(item.get("params", {}), outputs)})
+            except (KeyError, IndexError, ValueError, TypeError) as e:
+                resp = {"status": "error", "message": f"Could not resolve parameters: {str(e)}"}
+        outputs[str(index)] = resp
+        if item.get("id") is not None:
+            outputs[str(item["id"])] = resp
+        results.append(resp)
+        if resp.get("status") == "error":
+            failed += 1
+            if mode == "stop_on_error":
+                break
+    log(f"Batch ran {len(results)}/{len(commands)} commands, {failed} failed")
+    return {
+        "status": "ok",
+        "succeeded": failed == 0 and len(results) == len(commands),
+        "completed": len(results),
+        "failed": failed,
+        "results": results,
+    }
+
+# --- Scene Change Feed ---
+CHANGE_FEED_SIZE = 10000  # changes kept for changes_since before clients must resync
+CHANGE_FEED_COLLECTIONS = ("objects", "meshes", "materials", "collections", "cameras", "lights", "images", "worlds", "node_groups")
+_ID_TYPE_COLLECTIONS = {
+    "OBJECT": "objects",
+    "MESH": "meshes",
+    "MATERIAL": "materials",
+    "COLLECTION": "collections",
+    "CAMERA": "cameras",
+    "LIGHT": "lights",
+    "IMAGE": "images",
+    "WORLD": "worlds",
+    "NODETREE": "node_groups",
+    "SCENE": "scenes",
+}
+
+class ChangeFeed:
+    """Monotonic scene version plus a bounded log of datablock changes.
+
+    Fed from depsgraph_update_post on the main thread and read by
+    changes_since from socket threads. Additions, removals and renames are
+    found by diffing a ``{(collection, session_uid): name}`` snapshot, which
+    is only rebuilt when the depsgraph reports a structural change or the
+    datablock counts move, so transform edits cost O(updated ids).
+    """
+
+    def __init__(self, size=CHANGE_FEED_SIZE, tracked=CHANGE_FEED_COLLECTIONS):
+        self.feed_id = uuid.uuid4().hex
+        self.tracked = tracked
+        self.version = 0
+        self._log = collections.deque(maxlen=size)
+        self._floor = 0  # clients behind this version have missed evicted changes
+        self._names = {}
+        self._lock = threading.Lock()
+
+    def _scan(self):
+        return {
+            (coll, block.session_uid): block.name
+            for coll in self.tracked
+            for block in getattr(bpy.data, coll)
+        }
+
+    def _diff(self):
+        current = self._scan()
+        previous = self._names
+        changes = []
+        for key, name in previous.items():
+            new_name = current.get(key)
+            if new_name is None:
+                changes.append({"change": "removed", "collection": key[0], "name": name})
+            elif new_name != name:
+                changes.append({"change": "renamed", "collection": key[0], "name": new_name, "old_name": name})
+        for key in current.keys() - previous.keys():
+            changes.append({"change": "added", "collection": key[0], "name": current[key]})
+        self._names = current
+        return changes
+
+    def reset(self):
+        """Rebuild the snapshot and force every client to resync (e.g. after a file load)."""
+        names = self._scan()
+        with self._lock:
+            self._names = names
+            self._log.clear()
+            self.version += 1
+            self._floor = self.version
+
+    def record(self, depsgraph):
+        changes = []
+        structural = False
+        for update in depsgraph.updates:
+            block = update.id.original
+            coll = _ID_TYPE_COLLECTIONS.get(block.id_type)
+            if coll not in self.tracked:
+                structural = structural or coll == "scenes"
+                continue
+            if self._names.get((coll, block.session_uid)) != block.name:
+                structural = True
+            if update.is_updated_transform:
+                changes.append({"change": "transformed", "collection": coll, "name": block.name})
+            if update.is_updated_geometry:
+                changes.append({"change": "geometry", "collection": coll, "name": block.name})
+        if structural or sum(len(getattr(bpy.data, coll)) for coll in self.tracked) != len(self._names):
+            changes[:0] = self._diff()
+        if not changes:
+            return
+        with self._lock:
+            self.version += 1
+            for change in changes:
+                if len(self._log) == self._log.maxlen:
+                    self._floor = self._log[0]["version"]
+                change["version"] = self.version
+                self._log.append(change)
+
+    def changes_since(self, version):
+        with self._lock:
+            if version < self._floor or version > self.version:
+                snapshot = {coll: [] for coll in self.tracked}
+                for (coll, _uid), name in self._names.items():
+                    snapshot[coll].append(name)
+                return {"resync_required": True, "feed_id": self.feed_id, "version": self.version, "snapshot": snapshot}
+            changes = []
+            for change in reversed(self._log):
+                if change["version"] <= version:
+                    break
+                changes.append(change)
+            changes.reverse()
+            return {"resync_required": False, "feed_id": self.feed_id, "version": self.version, "changes": changes}
+
+CHANGE_FEED = ChangeFeed()
+
+@bpy.app.handlers.persistent
+def _on_depsgraph_update(scene, depsgraph):
+    try:
+        CHANGE_FEED.record(depsgraph)
+    except Exception as e:
+        log(f"Change feed update failed: {e}", "ERROR")
+
+@bpy.app.handlers.persistent
+def _on_load_post(*args):
+    CHANGE_FEED.reset()
+
+def start_change_feed():
+    CHANGE_FEED.reset()
+    if _on_depsgraph_update not in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.append(_on_depsgraph_update)
+    if _on_load_post not in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.append(_on_load_post)
+
+def stop_change_feed():
+    if _on_depsgraph_update in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.remove(_on_depsgraph_update)
+    if _on_load_post in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.remove(_on_load_post)
+
+def cmd_changes_since(params):
+    try:
+        version = int(params.get("version", -1))
+    except (TypeError, ValueError):
+        return {"status": "error", "message": "version must be an integer"}
+    return {"status": "ok", **CHANGE_FEED.changes_since(version)}
+
+# --- Scene Version ---
+# Responses to main-thread commands carry scene_version = [epoch, n]. n grows
+# after every command that may modify the scene and with every change-feed
+# record (edits made in the UI), so a client may reuse a read-only result for
+# as long as n stays put. The epoch changes when the addon restarts.
+_scene_mutations = 0
+
+def _is_read_only(cmd):
+    kind = cmd.get("type")
+    params = cmd.get("params") or {}
+    if kind == "USE_COMMAND":
+        return params.get("tool_name") in READ_ONLY_COMMANDS
+    if kind == "batch":
+        return all(_is_read_only(step) for step in params.get("commands", []))
+    return kind in READ_ONLY_COMMANDS
+
+def scene_version():
+    return [CHANGE_FEED.feed_id, CHANGE_FEED.version + _scene_mutations]
+
+def stamp_scene_version(cmd, result):
+    """Count ``cmd`` as a mutation unless it is read-only and add scene_version to its response."""
+    global _scene_mutations
+    if not _is_read_only(cmd):
+        _scene_mutations += 1
+    return {**result, "scene_version": scene_version()}
+
+def cmd_scene_version(params):
+    return {"status": "ok", "scene_version": scene_version()}
+
 # --- Command Dispatcher ---
 def handle_command(cmd):
     try:
@@ -295,141 +2205,644 @@ def handle_command(cmd):
             return handle_list_command(p)
         if t == "USE_COMMAND":
             return handle_use_command(p)
+        if t == "batch":
+            return cmd_batch(p)
         if t == "exec_python":
-            code = p.get("code", "")
-            try:
-                exec(code, {"bpy": bpy})
-                return {"status": "ok", "result": "Code executed"}
-            except Exception as e:
-                return {"status": "error", "message": str(e), "traceback": traceback.format_exc()}
-        if t == "chunked_upload_init":
-            upload_id = str(time.time())
-            CHUNKED_UPLOADS[upload_id] = {"chunks": [], "start": time.time()}
-            return {"status": "ok", "upload_id": upload_id}
-        if t == "chunked_upload_chunk":
-            upload_id = p.get("upload_id")
-            chunk = p.get("chunk")
-            if upload_id not in CHUNKED_UPLOADS:
-                return {"status": "error", "message": "Invalid upload_id"}
-            CHUNKED_UPLOADS[upload_id]["chunks"].append(chunk)
-            return {"status": "ok", "received": len(chunk)}
-        if t == "chunked_upload_finalize":
-            upload_id = p.get("upload_id")
-            if upload_id not in CHUNKED_UPLOADS:
-                return {"status": "error", "message": "Invalid upload_id"}
-            data = b"".join([bytes.fromhex(c) for c in CHUNKED_UPLOADS[upload_id]["chunks"]])
-            del CHUNKED_UPLOADS[upload_id]
-            return {"status": "ok", "size": len(data)}
+            response = run_script(p.get("code", ""), args=p.get("args"), namespace=p.get("namespace"))
+            if response["status"] == "ok" and response["result"] is None:
+                response["result"] = "Code executed"
+            return response
+        if t in UPLOAD_COMMANDS:
+            return UPLOAD_COMMANDS[t](p)
+        if t == "job_status":
+            return cmd_job_status(p)
+        if t == "executor_config":
+            return cmd_executor_config(p)
+        if t == "log_config":
+            return cmd_log_config(p)
+        if t == "stats":
+            return cmd_stats(p)
+        if t == "changes_since":
+            return cmd_changes_since(p)
+        if t == "scene_version":
+            return cmd_scene_version(p)
+        handler = SPEC_HANDLERS.get(t) or COMMANDS.get(t)
+        if handler:
+            return handler(p)
         return {"status": "error", "message": f"Unknown command: {t}"}
     except Exception as e:
         return {"status": "error", "message": str(e), "traceback": traceback.format_exc()}
 
+# --- Command Metrics ---
+# Every command is timed per phase: queue_wait and execute here, decode,
+# encode, send (response queued until written to the socket) and total
+# (received until written) in the socket server. A command named with
+# stats(profile=...) runs under cProfile for its next profile_runs calls.
+METRICS = mcp_metrics.CommandMetrics()
+PROFILE_TOP = 25
+PROFILE_RESULTS_LIMIT = 20
+_profile_lock = threading.Lock()
+_profile_requests = {}  # command type -> (remaining runs, top n)
+PROFILE_RESULTS = collections.deque(maxlen=PROFILE_RESULTS_LIMIT)
+
+def _profile_rows(profiler, top):
+    stats = pstats.Stats(profiler)
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:top]
+    return [
+        {
+            "function": f"{filename}:{line}({name})",
+            "calls": calls,
+            "tottime": round(tottime, 6),
+            "cumtime": round(cumtime, 6),
+        }
+        for (filename, line, name), (_prim, calls, tottime, cumtime, _callers) in rows
+    ]
+
+def _take_profile_request(kind):
+    with _profile_lock:
+        request = _profile_requests.get(kind)
+        if request is None:
+            return None
+        remaining, top = request
+        if remaining <= 1:
+            del _profile_requests[kind]
+        else:
+            _profile_requests[kind] = (remaining - 1, top)
+        return top
+
+def execute_command(cmd):
+    """Run ``handle_command`` and record its execution time, under cProfile when requested."""
+    kind = cmd.get("type")
+    top = _take_profile_request(kind)
+    profiler = None
+    if top is not None:
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:  # another profiler is already active on this interpreter
+            profiler = None
+    start = time.perf_counter()
+    try:
+        result = handle_command(cmd)
+    finally:
+        elapsed = time.perf_counter() - start
+        if profiler is not None:
+            profiler.disable()
+    METRICS.observe(kind, "execute", elapsed)
+    METRICS.count(kind, isinstance(result, dict) and result.get("status") != "error")
+    if profiler is not None:
+        profile = {"command": kind, "seconds": round(elapsed, 6), "at": time.time(), "top": _profile_rows(profiler, top)}
+        PROFILE_RESULTS.append(profile)
+        if isinstance(result, dict):
+            result = {**result, "profile": profile}
+    return result
+
+def cmd_stats(params):
+    """Report command metrics; optionally reset them or arm profiling for one command."""
+    profile = params.get("profile")
+    if profile:
+        runs = max(1, int(params.get("profile_runs", 1)))
+        top = max(1, int(params.get("profile_top", PROFILE_TOP)))
+        with _profile_lock:
+            _profile_requests[profile] = (runs, top)
+    elif profile is not None:
+        with _profile_lock:
+            _profile_requests.clear()
+    result = METRICS.snapshot(params.get("command"))
+    result["queued"] = len(JOB_QUEUE)
+    with _profile_lock:
+        result["profiling"] = {kind: {"remaining": remaining, "top": top} for kind, (remaining, top) in _profile_requests.items()}
+    result["profiles"] = list(PROFILE_RESULTS)
+    if params.get("reset"):
+        METRICS.reset()
+        PROFILE_RESULTS.clear()
+    return {"status": "ok", "result": result}
+
+# --- Main-Thread Executor ---
+# bpy is not thread-safe, so socket threads only enqueue commands and wait on
+# futures; a bpy.app.timers callback drains JOB_QUEUE on Blender's main thread.
+INLINE_COMMANDS = {
+    "LIST_COMMAND",
+    "test_connection",
+    "chunked_upload_init",
+    "chunked_upload_chunk",
+    "chunked_upload_status",
+    "chunked_upload_finalize",
+    "chunked_upload_discard",
+    "job_status",
+    "executor_config",
+    "log_config",
+    "stats",
+    "changes_since",
+    "scene_version",
+    "render_job_status",
+    "render_cancel",
+    "render_fetch",
+}
+_job_ids = itertools.count(1)
+_job_lock = threading.Lock()
+_jobs_ready = threading.Event()  # set when work is queued; run_headless waits on it
+
+def _set_job_state(job_id, state, **extra):
+    with _job_lock:
+        status = JOB_STATUS.get(job_id)
+        if status is None:
+            return
+        status["state"] = state
+        status[state + "_at"] = time.time()
+        status.update(extra)
+
+def _prune_job_status():
+    excess = len(JOB_STATUS) - JOB_STATUS_LIMIT
+    if excess <= 0:
+        return
+    for job_id in [k for k, v in JOB_STATUS.items() if v["state"] in ("done", "cancelled", "failed")][:excess]:
+        del JOB_STATUS[job_id]
+
+def submit_job(cmd):
+    """Queue a command for the main thread and return ``(job_id, future)``."""
+    job_id = str(next(_job_ids))
+    future = Future()
+    with _job_lock:
+        JOB_STATUS[job_id] = {"state": "queued", "type": cmd.get("type"), "queued_at": time.time()}
+        _prune_job_status()
+    JOB_QUEUE.append((job_id, cmd, future, time.perf_counter()))
+    _jobs_ready.set()
+    return job_id, future
+
+def run_pending_jobs(budget=None):
+    """Run queued jobs until the queue is empty or ``budget`` seconds have passed."""
+    budget = MAIN_THREAD_BUDGET if budget is None else budget
+    deadline = time.perf_counter() + budget
+    ran = 0
+    while JOB_QUEUE:
+        job_id, cmd, future, queued_at = JOB_QUEUE.popleft()
+        if not future.set_running_or_notify_cancel():
+            _set_job_state(job_id, "cancelled")
+            continue
+        METRICS.observe(cmd.get("type"), "queue_wait", time.perf_counter() - queued_at)
+        _set_job_state(job_id, "running")
+        try:
+            result = execute_command(cmd)
+        except BaseException as e:
+            _set_job_state(job_id, "done", ok=False)
+            future.set_exception(e)
+        else:
+            _set_job_state(job_id, "done", ok=result.get("status") != "error")
+            future.set_result(stamp_scene_version(cmd, result))
+        ran += 1
+        if time.perf_counter() >= deadline:
+            break
+    return ran
+
+def _executor_tick():
+    run_pending_jobs()
+    return 0.0 if JOB_QUEUE else EXECUTOR_IDLE_INTERVAL
+
+def start_executor():
+    if not bpy.app.timers.is_registered(_executor_tick):
+        bpy.app.timers.register(_executor_tick, first_interval=0.0, persistent=True)
+
+def stop_executor():
+    if bpy.app.timers.is_registered(_executor_tick):
+        bpy.app.timers.unregister(_executor_tick)
+    while JOB_QUEUE:
+        job_id, _cmd, future, _queued_at = JOB_QUEUE.popleft()
+        future.cancel()
+        _set_job_state(job_id, "cancelled")
+    _jobs_ready.set()  # let run_headless see the server has stopped
+
+def cmd_job_status(params):
+    job_id = params.get("job_id")
+    with _job_lock:
+        if job_id is None:
+            return {"status": "ok", "result": {k: dict(v) for k, v in JOB_STATUS.items()}, "queued": len(JOB_QUEUE)}
+        if job_id not in JOB_STATUS:
+            return {"status": "error", "message": f"Unknown job_id: {job_id}"}
+        return {"status": "ok", "result": dict(JOB_STATUS[job_id])}
+
+def cmd_executor_config(params):
+    global MAIN_THREAD_BUDGET, EXECUTOR_IDLE_INTERVAL
+    if "budget" in params:
+        MAIN_THREAD_BUDGET = max(0.001, float(params["budget"]))
+    if "idle_interval" in params:
+        EXECUTOR_IDLE_INTERVAL = max(0.001, float(params["idle_interval"]))
+    return {"status": "ok", "result": {"budget": MAIN_THREAD_BUDGET, "idle_interval": EXECUTOR_IDLE_INTERVAL}}
+
+def cmd_log_config(params):
+    try:
+        config = mcp_logging.configure(LOGGER.name, params.get("level"), params.get("sample_every"))
+    except (TypeError, ValueError) as e:
+        return {"status": "error", "message": str(e)}
+    return {"status": "ok", "result": config}
+
 # --- Socket Server ---
+# A single I/O thread multiplexes every client with a selector. Commands are
+# queued for the main thread, and their futures hand responses back through
+# a wakeup socket, so idle or slow clients never hold a thread.
+MAX_CONNECTIONS = 32
+MAX_QUEUED_REQUESTS = 256  # requests waiting on the main thread before reads pause
+MAX_SEND_BUFFER = 16 * 1024 * 1024  # unsent response bytes per client before its reads pause
+LISTEN_BACKLOG = 64
+SHUTDOWN_DRAIN_TIMEOUT = 5.0  # seconds to flush pending responses when stopping
+RECV_SIZE = 65536
+INVALID_COMMAND = "<invalid>"  # metrics name for messages that are not commands
+_SENDMSG_PARTS = 64
+_HAS_SENDMSG = hasattr(socket.socket, "sendmsg")
+
+class _Client:
+    def __init__(self, sock, addr):
+        self.sock = sock
+        self.addr = addr
+        self.decoder = protocol.JsonStreamDecoder()
+        self.framed = False
+        self.codec = protocol.JSON_CODEC
+        self.compress_threshold = None  # compress framed responses of at least this many bytes
+        self.out = collections.deque()
+        self.out_bytes = 0
+        self.ordered = collections.deque()  # bare-JSON replies go out in request order
+        self.events = 0
+        self.closed = False
+        self.bytes_received = 0
+        self.bytes_attributed = 0  # received bytes already counted against a command
+        self.bytes_queued = 0
+        self.bytes_sent = 0
+        self.sends = collections.deque()  # (stream offset, command, received_at, queued_at)
+
+    def queue(self, parts, meta=None):
+        for part in parts:
+            size = memoryview(part).nbytes
+            if size:
+                self.out.append(part)
+                self.out_bytes += size
+                self.bytes_queued += size
+        if meta is not None:
+            self.sends.append((self.bytes_queued, meta[0], meta[1], time.perf_counter()))
+
+    def take_received_bytes(self):
+        size = self.bytes_received - self.bytes_attributed
+        self.bytes_attributed = self.bytes_received
+        return size
+
 class MCPSocketServer:
-    def __init__(self):
+    def __init__(self, port=None, max_connections=None, max_queued_requests=None):
+        self.port = port or PORT
+        self.max_connections = max_connections or MAX_CONNECTIONS
+        self.max_queued_requests = max_queued_requests or MAX_QUEUED_REQUESTS
         self.server = None
         self.thread = None
         self.running = False
+        self._selector = None
+        self._clients = {}
+        self._completions = collections.deque()
+        self._in_flight = 0
+        self._wake_r = self._wake_w = None
 
     def start(self):
         if self.running:
             log("Server already running.", "WARNING")
             return
+        # Bind before registering timers and handlers, so a port in use
+        # leaves nothing behind.
+        try:
+            self._listen()
+        except Exception as e:
+            log(f"Failed to bind to 0.0.0.0:{self.port}: {str(e)}", "ERROR")
+            self._close_all()
+            return
         self.running = True
+        start_executor()
+        start_change_feed()
+        start_render_handlers()
         self.thread = threading.Thread(target=self._run_server)
         self.thread.daemon = True
         self.thread.start()
-        log("MCP Socket Server started on 0.0.0.0:9877", "INFO")
+        log(f"MCP Socket Server started on 0.0.0.0:{self.port}", "INFO")
 
     def stop(self):
         if not self.running:
             log("Server not running.", "WARNING")
             return
         self.running = False
-        if self.server:
-            self.server.close()
+        # Cancel queued commands first so their clients get an answer while
+        # the I/O thread drains outstanding responses.
+        stop_executor()
+        self._wake()
         if self.thread:
             self.thread.join()
+        stop_change_feed()
+        stop_render_handlers()
         log("MCP Socket Server stopped.", "INFO")
 
+    def _wake(self):
+        try:
+            self._wake_w.send(b"\0")
+        except (AttributeError, OSError):
+            pass
+
+    def _listen(self):
+        log(f"Attempting to bind to 0.0.0.0:{self.port}", "INFO")
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind(("0.0.0.0", self.port))
+        self.server.listen(LISTEN_BACKLOG)
+        self.server.setblocking(False)
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._wake_w.setblocking(False)
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(self.server, selectors.EVENT_READ)
+        self._selector.register(self._wake_r, selectors.EVENT_READ)
+        log(f"Server successfully listening on 0.0.0.0:{self.port}", "INFO")
+
     def _run_server(self):
         try:
-            log("Creating server socket...", "INFO")
-            self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            log("Setting socket options...", "INFO")
-            self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-            log(f"Attempting to bind to 0.0.0.0:{PORT}", "INFO")
-            try:
-                self.server.bind(("0.0.0.0", PORT))
-                log("Successfully bound to port", "INFO")
-            except Exception as e:
-                log(f"Failed to bind: {str(e)}", "ERROR")
-                raise
-            log("Starting to listen...", "INFO")
-            self.server.listen(5)
-            log(f"Server successfully listening on 0.0.0.0:{PORT}", "INFO")
-            log("Setting socket to non-blocking mode...", "INFO")
-            self.server.setblocking(False)
-            log("Server is ready to accept connections", "INFO")
-            while self.running:
-                try:
-                    readable, _, _ = select.select([self.server], [], [], 0.1)
-                    if self.server in readable:
-                        conn, addr = self.server.accept()
-                        conn.setblocking(True)
-                        log(f"New connection from {addr[0]}:{addr[1]}", "INFO")
-                        if ALLOWED_IPS and addr[0] not in ALLOWED_IPS:
-                            log(f"Connection from {addr[0]} denied - not in allowed IPs", "WARNING")
-                            conn.close()
-                            continue
-                        client_thread = threading.Thread(
-                            target=self._handle_client,
-                            args=(conn, addr)
-                        )
-                        client_thread.daemon = True
-                        client_thread.start()
-                        log(f"Started client thread for {addr[0]}:{addr[1]}", "INFO")
-                except Exception as e:
-                    if self.running:
-                        log(f"Error in main server loop: {str(e)}", "ERROR")
-                        log(f"Error details: {traceback.format_exc()}", "ERROR")
+            self._serve()
         except Exception as e:
             if self.running:
                 log(f"Error starting server: {str(e)}", "ERROR")
                 log(f"Error details: {traceback.format_exc()}", "ERROR")
-    def _handle_client(self, conn, addr):
-        try:
-            buffer = b""
-            while True:
-                chunk = conn.recv(65536)
-                if not chunk:
-                    break
-                buffer += chunk
-                while True:
+                self.running = False
+        finally:
+            self._close_all()
+
+    def _serve(self):
+        deadline = None
+        while True:
+            if not self.running:
+                if deadline is None:
+                    deadline = time.monotonic() + SHUTDOWN_DRAIN_TIMEOUT
+                    self._selector.unregister(self.server)
+                    self.server.close()
+                    log(f"Draining {self._in_flight} pending request(s) before shutdown", "INFO")
+                idle = not self._in_flight and not any(c.out for c in self._clients.values())
+                if idle or time.monotonic() >= deadline:
+                    return
+            for key, events in self._selector.select(0.5 if self.running else 0.05):
+                if key.fileobj is self.server:
+                    self._accept()
+                elif key.fileobj is self._wake_r:
                     try:
-                        decoded = buffer.decode(errors='ignore')
-                        obj, idx = json.JSONDecoder().raw_decode(decoded)
-                        buffer = decoded[idx:].lstrip().encode()
-                    except Exception:
-                        break
+                        while self._wake_r.recv(4096):
+                            pass
+                    except (BlockingIOError, InterruptedError):
+                        pass
+                else:
+                    client = key.data
                     try:
-                        cmd = obj
-                        log(f"Received from {addr[0]}:{addr[1]}: {cmd}", "INFO")
-                        resp = handle_command(cmd)
-                        log(f"Sending to {addr[0]}:{addr[1]}: {resp}", "INFO")
-                        conn.sendall(json.dumps(resp).encode())
+                        if events & selectors.EVENT_READ:
+                            self._read(client)
+                        if events & selectors.EVENT_WRITE and not client.closed:
+                            self._write(client)
                     except Exception as e:
-                        error_resp = {
-                            "error": {
-                                "code": -32000,
-                                "message": str(e)
-                            }
-                        }
-                        log(f"Error handling command from {addr[0]}:{addr[1]}: {str(e)}", "ERROR")
-                        conn.sendall(json.dumps(error_resp).encode())
-        finally:
+                        # One misbehaving client must not take the server down.
+                        log(f"Closing {client.addr[0]}:{client.addr[1]} after unexpected error: {str(e)}", "ERROR")
+                        log(f"Error details: {traceback.format_exc()}", "ERROR")
+                        self._close(client)
+            self._process_completions()
+            self._update_interest()
+
+    def _accept(self):
+        try:
+            conn, addr = self.server.accept()
+        except (BlockingIOError, InterruptedError):
+            return
+        log(f"New connection from {addr[0]}:{addr[1]}", "INFO")
+        if ALLOWED_IPS and addr[0] not in ALLOWED_IPS:
+            log(f"Connection from {addr[0]} denied - not in allowed IPs", "WARNING")
+            conn.close()
+            return
+        if len(self._clients) >= self.max_connections:
+            log(f"Connection from {addr[0]}:{addr[1]} refused - {self.max_connections} connections already open", "WARNING")
+            try:
+                conn.send(json.dumps({"status": "error", "message": "Too many connections"}).encode())
+            except OSError:
+                pass
             conn.close()
-            log(f"Connection closed for {addr[0]}:{addr[1]}", "INFO")
+            return
+        conn.setblocking(False)
+        self._clients[conn] = _Client(conn, addr)
+
+    def _update_interest(self):
+        reading = self.running and self._in_flight < self.max_queued_requests
+        for client in list(self._clients.values()):
+            events = 0
+            if reading and client.out_bytes < MAX_SEND_BUFFER:
+                events |= selectors.EVENT_READ
+            if client.out:
+                events |= selectors.EVENT_WRITE
+            if events == client.events:
+                continue
+            if not client.events:
+                self._selector.register(client.sock, events, client)
+            elif not events:
+                self._selector.unregister(client.sock)
+            else:
+                self._selector.modify(client.sock, events, client)
+            client.events = events
+
+    def _close(self, client):
+        if client.closed:
+            return
+        client.closed = True
+        if client.events:
+            self._selector.unregister(client.sock)
+            client.events = 0
+        self._clients.pop(client.sock, None)
+        client.sock.close()
+        log(f"Connection closed for {client.addr[0]}:{client.addr[1]}", "INFO")
+
+    def _close_all(self):
+        for client in list(self._clients.values()):
+            self._close(client)
+        for sock in (self.server, self._wake_r, self._wake_w):
+            if sock is not None:
+                sock.close()
+        if self._selector is not None:
+            self._selector.close()
+        self._wake_r = self._wake_w = self._selector = None
+
+    def _read(self, client):
+        try:
+            data = client.sock.recv(RECV_SIZE)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError as e:
+            log(f"Error reading from {client.addr[0]}:{client.addr[1]}: {str(e)}", "ERROR")
+            self._close(client)
+            return
+        if not data:
+            self._close(client)
+            return
+        client.bytes_received += len(data)
+        received_at = time.perf_counter()
+        try:
+            if client.framed:
+                frames = client.decoder.feed(data)
+                decode_time = (time.perf_counter() - received_at) / max(1, len(frames))
+                for request_id, _flags, cmd in frames:
+                    self._dispatch(client, cmd, received_at, decode_time, request_id)
+                return
+            messages = client.decoder.feed(data)
+            decode_time = (time.perf_counter() - received_at) / max(1, len(messages))
+            for cmd in messages:
+                if not isinstance(cmd, dict) or cmd.get("type") != protocol.HELLO_COMMAND:
+                    self._dispatch(client, cmd, received_at, decode_time)
+                    continue
+                self._log_received(client, cmd)
+                client.take_received_bytes()
+                resp = self._handle_hello(cmd.get("params", {}))
+                client.ordered.append([resp, None])
+                self._flush_ordered(client)
+                if resp.get("protocol_version"):
+                    # The client waits for the hello reply before framing, so any
+                    # bytes already buffered belong to the framed stream.
+                    leftover = client.decoder.take_remaining()
+                    client.codec = protocol.get_codec(resp["codec"])
+                    client.compress_threshold = resp.get("compress_threshold")
+                    client.decoder = protocol.FrameDecoder(codec=client.codec)
+                    client.framed = True
+                    start = time.perf_counter()
+                    frames = client.decoder.feed(leftover)
+                    decode_time = (time.perf_counter() - start) / max(1, len(frames))
+                    for request_id, _flags, framed_cmd in frames:
+                        self._dispatch(client, framed_cmd, received_at, decode_time, request_id)
+                    break
+        except protocol.ProtocolError as e:
+            log(f"Protocol error from {client.addr[0]}:{client.addr[1]}: {str(e)}", "ERROR")
+            self._close(client)
+
+    def _log_received(self, client, cmd):
+        if LOGGER.isEnabledFor(logging.DEBUG):
+            kind = cmd.get("type") if isinstance(cmd, dict) else None
+            LOGGER.debug("Received from %s:%s: %s", client.addr[0], client.addr[1], mcp_logging.Payload(cmd), extra={"command": kind if isinstance(kind, str) else None})
+
+    def _dispatch(self, client, cmd, received_at, decode_time, request_id=None):
+        # meta is (command type, time its bytes were read), carried to the
+        # response so encode, send and total time are recorded against it.
+        self._log_received(client, cmd)
+        kind = cmd.get("type") if isinstance(cmd, dict) else None
+        if not isinstance(kind, str):
+            kind = INVALID_COMMAND
+            cmd = None
+        METRICS.observe(kind, "decode", decode_time)
+        METRICS.add_bytes(kind, received=client.take_received_bytes())
+        meta = (kind, received_at)
+        slot = None
+        if request_id is None:
+            slot = [None, meta]
+            client.ordered.append(slot)
+        if cmd is None:
+            self._deliver(client, request_id, slot, meta, {"status": "error", "message": "A command must be a JSON object with a string 'type'"})
+            return
+        if kind in INLINE_COMMANDS:
+            resp = execute_command(cmd)
+            if kind in READ_ONLY_COMMANDS and isinstance(resp, dict):
+                # Stamped like main-thread replies, so the relay can cache them.
+                resp = {**resp, "scene_version": scene_version()}
+            self._deliver(client, request_id, slot, meta, resp)
+            return
+        _job_id, future = submit_job(cmd)
+        self._in_flight += 1
+        future.add_done_callback(lambda f: self._on_done(client, request_id, slot, meta, f))
+
+    def _on_done(self, client, request_id, slot, meta, future):
+        # Runs on whichever thread completed the future.
+        self._completions.append((client, request_id, slot, meta, future))
+        self._wake()
+
+    def _process_completions(self):
+        while self._completions:
+            client, request_id, slot, meta, future = self._completions.popleft()
+            self._in_flight -= 1
+            if not client.closed:
+                self._deliver(client, request_id, slot, meta, self._resolve(future, client.addr))
+
+    def _deliver(self, client, request_id, slot, meta, resp):
+        if slot is None:
+            client.queue(self._encode(resp, lambda r: protocol.encode_frame_parts(request_id, r, client.codec, client.compress_threshold), meta), meta)
+        else:
+            slot[0] = resp
+            self._flush_ordered(client)
+        self._write(client)
+
+    def _flush_ordered(self, client):
+        while client.ordered and client.ordered[0][0] is not None:
+            resp, meta = client.ordered.popleft()
+            client.queue(self._encode(resp, lambda r: [protocol.encode_json(r)], meta), meta)
+
+    def _encode(self, resp, encoder, meta=None):
+        start = time.perf_counter()
+        try:
+            parts = encoder(resp)
+        except (TypeError, ValueError) as e:
+            log(f"Could not encode response: {str(e)}", "ERROR")
+            parts = encoder({"status": "error", "message": f"Response could not be encoded: {str(e)}"})
+        if meta is not None:
+            METRICS.observe(meta[0], "encode", time.perf_counter() - start)
+            METRICS.add_bytes(meta[0], sent=sum(memoryview(part).nbytes for part in parts))
+        return parts
+
+    def _write(self, client):
+        out = client.out
+        while out:
+            try:
+                if _HAS_SENDMSG:
+                    sent = client.sock.sendmsg(list(itertools.islice(out, _SENDMSG_PARTS)))
+                else:
+                    sent = client.sock.send(out[0])
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as e:
+                log(f"Error sending to {client.addr[0]}:{client.addr[1]}: {str(e)}", "ERROR")
+                self._close(client)
+                return
+            client.out_bytes -= sent
+            client.bytes_sent += sent
+            if client.sends:
+                self._record_sent(client)
+            while out:
+                head = memoryview(out[0]).cast("B")
+                if sent < head.nbytes:
+                    if sent:
+                        out[0] = head[sent:]
+                    break
+                sent -= head.nbytes
+                out.popleft()
+
+    def _record_sent(self, client):
+        now = time.perf_counter()
+        sends = client.sends
+        while sends and sends[0][0] <= client.bytes_sent:
+            _offset, kind, received_at, queued_at = sends.popleft()
+            METRICS.observe(kind, "send", now - queued_at)
+            METRICS.observe(kind, "total", now - received_at)
+
+    def _resolve(self, future, addr):
+        try:
+            resp = future.result()
+            LOGGER.debug("Sending to %s:%s: %s", addr[0], addr[1], mcp_logging.Payload(resp))
+        except CancelledError:
+            resp = {"status": "error", "message": "Request cancelled: the server is shutting down"}
+        except Exception as e:
+            resp = {
+                "error": {
+                    "code": -32000,
+                    "message": str(e)
+                }
+            }
+            log(f"Error handling command from {addr[0]}:{addr[1]}: {str(e)}", "ERROR")
+        return resp
+
+    def _handle_hello(self, params):
+        version = protocol.negotiate_version(params.get("protocol_versions"))
+        if version is None:
+            return {"status": "error", "message": "No common protocol version", "supported_versions": list(protocol.SUPPORTED_VERSIONS)}
+        resp = {"status": "ok", "protocol_version": version, "codec": protocol.negotiate_codec(params.get("codecs"))}
+        threshold = params.get("compress_threshold")
+        if isinstance(threshold, int) and not isinstance(threshold, bool) and threshold >= 0:
+            resp["compress_threshold"] = threshold
+        return resp
 
 # --- UI Panel ---
 class MCP_PT_Panel(bpy.types.Panel):
@@ -473,11 +2886,52 @@ def register():
     log("MCP server addon registered")
 
 def unregister():
+    _disable_text_drawing()
     for cls in reversed(classes):
         bpy.utils.unregister_class(cls)
     if hasattr(bpy.types.Scene, "mcp_server"):
         bpy.types.Scene.mcp_server.stop()
     log("MCP server addon unregistered")
 
+# --- Headless Worker ---
+WORKER_TOKEN = None  # echoed by test_connection, so a relay knows it reached its own worker
+
+def run_headless(port=None, exit_with_parent=False, worker_token=None):
+    """Serve until the server stops when Blender runs with --background.
+
+    Background Blender has no event loop to fire timers, so this loop drives
+    the job queue and render jobs itself. With ``exit_with_parent`` the
+    worker also stops once the process that launched it has gone away.
+    """
+    global WORKER_TOKEN
+    WORKER_TOKEN = worker_token
+    parent = os.getppid()
+    server = MCPSocketServer(port)
+    server.start()
+    try:
+        while server.running and not (exit_with_parent and os.getppid() != parent):
+            # Cleared before draining, so a job queued meanwhile is not missed.
+            _jobs_ready.clear()
+            ran = run_pending_jobs()
+            rendering = _active_render is not None or RENDER_QUEUE
+            if rendering:
+                _render_tick()
+            if not ran:
+                _jobs_ready.wait(EXECUTOR_IDLE_INTERVAL if rendering else HEADLESS_WAKE_INTERVAL)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if server.running:
+            server.stop()
+
 if __name__ == "__main__":
-    register() 
\ No newline at end of file
+    if bpy.app.background:
+        # blender --background --python blender_mcp_socket_server.py -- --port 9880
+        parser = argparse.ArgumentParser(prog="blender --background --python blender_mcp_socket_server.py --")
+        parser.add_argument("--port", type=int, default=PORT)
+        parser.add_argument("--exit-with-parent", action="store_true", help="Stop when the launching process exits.")
+        parser.add_argument("--worker-token", help="Value test_connection returns as worker_token.")
+        args = parser.parse_args(sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else [])
+        run_headless(args.port, args.exit_with_parent, args.worker_token)
+    else:
+        register() 
\ No newline at end of file
@@ -0,0 +1,387 @@
+"""blendertool.json loading and parameter compilation shared by the relay and the addon.
+
+Every tool's parameter list is compiled once into a validator that applies
+defaults, checks required parameters and enums, and coerces values to the
+declared types, so callers never re-parse type strings per request. The
+same declarations are turned into JSON Schemas for the relay's MCP tools.
+"""
+import base64
+import binascii
+import collections
+import copy
+import hashlib
+import json
+import marshal
+import os
+import sys
+
+BLENDERTOOL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "blendertool.json")
+
+
+class SpecValidationError(ValueError):
+    """Raised when tool parameters do not match their blendertool.json declaration."""
+
+
+def load_spec(path=BLENDERTOOL_PATH):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def build_index(spec):
+    """Map tool_name to its definition for O(1) lookups."""
+    return {tool["tool_name"]: tool for tool in spec["commands"]}
+
+
+# Addon commands outside blendertool.json that only read the scene
+def read_only_commands(spec):
+    """Names of commands whose results depend only on the scene.
+
+    These are the tools marked ``"read_only": true`` in blendertool.json.
+    """
+    return frozenset(tool["tool_name"] for tool in spec["commands"] if tool.get("read_only"))
+
+
+# --- Tool catalog ---
+CATALOG_CACHE_SIZE = 128  # distinct filter/page combinations kept serialized
+CATALOG_PARAMETERS = [
+    {"name": "if_none_match", "type": "str", "description": "Catalog hash from an earlier reply; an unchanged catalog returns only not_modified."},
+    {"name": "category", "type": "str", "description": "Only tools in this category or below it, e.g. 'bpy.ops' or 'bpy.ops.mesh'."},
+    {"name": "prefix", "type": "str", "description": "Only tools whose name starts with this."},
+    {"name": "summary", "type": "bool", "default": False, "description": "List names, categories and descriptions without parameter schemas."},
+    {"name": "cursor", "type": "int", "default": 0, "description": "Index of the first tool to return."},
+    {"name": "limit", "type": "int", "description": "Maximum number of tools to return."},
+]
+
+
+def compute_catalog_hash(commands):
+    canonical = json.dumps(commands, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return hashlib.sha256(canonical).hexdigest()[:16]
+
+
+class ToolCatalog:
+    """Filtered, paginated views of the tool list, keyed by a content hash.
+
+    The hash changes only when blendertool.json does, so a client that
+    passes the hash it last saw gets a small "not modified" reply instead
+    of the catalog. Each distinct query is built and serialized once.
+    """
+
+    def __init__(self, spec, catalog_hash=None):
+        self.commands = spec["commands"]
+        self.hash = catalog_hash or compute_catalog_hash(self.commands)
+        self._cache = collections.OrderedDict()
+        self.validate = compile_parameters({"tool_name": "LIST_COMMAND", "parameters": CATALOG_PARAMETERS})
+
+    def query(self, if_none_match=None, category=None, prefix=None, summary=False, cursor=0, limit=None):
+        """Return ``{hash, total, cursor, next_cursor, tools}`` or ``{hash, not_modified}``.
+
+        ``category`` matches a tool's category or any dotted parent of it
+        (``bpy.ops`` matches ``bpy.ops.mesh``); ``prefix`` matches the start
+        of tool names. ``summary`` drops parameter schemas.
+        """
+        if if_none_match is not None and if_none_match == self.hash:
+            return {"hash": self.hash, "not_modified": True}
+        return self._lookup(category, prefix, summary, cursor, limit)[0]
+
+    def serialized(self, if_none_match=None, category=None, prefix=None, summary=False, cursor=0, limit=None):
+        """Like ``query`` but return compact JSON text, serialized once per distinct query."""
+        if if_none_match is not None and if_none_match == self.hash:
+            return json.dumps({"hash": self.hash, "not_modified": True})
+        return self._lookup(category, prefix, summary, cursor, limit)[1]
+
+    def _lookup(self, category, prefix, summary, cursor, limit):
+        summary = bool(summary)
+        cursor = int(cursor or 0)
+        limit = None if limit is None else int(limit)
+        if cursor < 0 or (limit is not None and limit < 1):
+            raise SpecValidationError("cursor must be >= 0 and limit >= 1")
+        key = (category, prefix, summary, cursor, limit)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            return cached
+        tools = [
+            tool for tool in self.commands
+            if (not category or tool.get("category") == category or tool.get("category", "").startswith(category + "."))
+            and (not prefix or tool["tool_name"].startswith(prefix))
+        ]
+        end = len(tools) if limit is None else min(len(tools), cursor + limit)
+        page = tools[cursor:end]
+        if summary:
+            page = [{"tool_name": t["tool_name"], "category": t.get("category"), "description": t.get("description")} for t in page]
+        result = {
+            "hash": self.hash,
+            "total": len(tools),
+            "cursor": cursor,
+            "next_cursor": end if end < len(tools) else None,
+            "tools": page,
+        }
+        cached = (result, json.dumps(result, separators=(",", ":")))
+        self._cache[key] = cached
+        if len(self._cache) > CATALOG_CACHE_SIZE:
+            self._cache.popitem(last=False)
+        return cached
+
+
+# --- Type coercers ---
+def _coerce_str(value):
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    raise SpecValidationError(f"expected a string, got {type(value).__name__}")
+
+
+def _coerce_int(value):
+    if isinstance(value, bool):
+        raise SpecValidationError("expected an integer, got bool")
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str):
+        try:
+            return int(value.strip())
+        except ValueError:
+            pass
+    raise SpecValidationError(f"expected an integer, got {value!r}")
+
+
+def _coerce_float(value):
+    if isinstance(value, bool):
+        raise SpecValidationError("expected a number, got bool")
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value.strip())
+        except ValueError:
+            pass
+    raise SpecValidationError(f"expected a number, got {value!r}")
+
+
+def _coerce_bool(value):
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, int) and value in (0, 1):
+        return bool(value)
+    if isinstance(value, str) and value.strip().lower() in ("true", "false", "1", "0"):
+        return value.strip().lower() in ("true", "1")
+    raise SpecValidationError(f"expected a boolean, got {value!r}")
+
+
+def _coerce_dict(value):
+    if isinstance(value, dict):
+        return value
+    raise SpecValidationError(f"expected an object, got {type(value).__name__}")
+
+
+def _coerce_bytes(value):
+    """Accept raw binary, base64 text, or a reference resolved by the addon."""
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return value
+    if isinstance(value, str):
+        try:
+            return base64.b64decode(value, validate=True)
+        except binascii.Error:
+            raise SpecValidationError("expected base64-encoded binary data") from None
+    if isinstance(value, dict):
+        if "$b64" in value:
+            return _coerce_bytes(value["$b64"])
+        if "upload_id" in value:
+            return value
+    if isinstance(value, list):
+        return value
+    raise SpecValidationError(f"expected binary data, got {type(value).__name__}")
+
+
+def _coerce_any(value):
+    return value
+
+
+_SCALAR_COERCERS = {
+    "str": _coerce_str,
+    "int": _coerce_int,
+    "float": _coerce_float,
+    "bool": _coerce_bool,
+    "dict": _coerce_dict,
+    "bytes": _coerce_bytes,
+    "any": _coerce_any,
+}
+
+
+def compile_type(type_name, length=None):
+    """Return a coercer for a blendertool.json type string such as ``list[list[float]]``."""
+    type_name = (type_name or "any").replace(" ", "")
+    if type_name.startswith("list[") and type_name.endswith("]"):
+        item = compile_type(type_name[5:-1])
+
+        def coerce_list(value):
+            if not isinstance(value, (list, tuple)):
+                raise SpecValidationError(f"expected a list, got {type(value).__name__}")
+            if length is not None and len(value) != length:
+                raise SpecValidationError(f"expected {length} items, got {len(value)}")
+            try:
+                return [item(v) for v in value]
+            except SpecValidationError as e:
+                raise SpecValidationError(f"list item {e}") from None
+        return coerce_list
+    try:
+        return _SCALAR_COERCERS[type_name]
+    except KeyError:
+        raise SpecValidationError(f"unsupported parameter type '{type_name}'") from None
+
+
+# --- JSON Schema ---
+_JSON_SCHEMA_TYPES = {
+    "str": {"type": "string"},
+    "int": {"type": "integer"},
+    "float": {"type": "number"},
+    "bool": {"type": "boolean"},
+    "dict": {"type": "object"},
+    "bytes": {"type": "string", "contentEncoding": "base64"},
+    "any": {},
+}
+
+
+def type_schema(type_name, length=None):
+    """Return the JSON Schema for a blendertool.json type string."""
+    type_name = (type_name or "any").replace(" ", "")
+    if type_name.startswith("list[") and type_name.endswith("]"):
+        schema = {"type": "array", "items": type_schema(type_name[5:-1])}
+        if length is not None:
+            schema["minItems"] = schema["maxItems"] = length
+        return schema
+    try:
+        return dict(_JSON_SCHEMA_TYPES[type_name])
+    except KeyError:
+        raise SpecValidationError(f"unsupported parameter type '{type_name}'") from None
+
+
+def json_schema(tool_def):
+    """Build an MCP ``inputSchema`` from a tool's parameter list."""
+    properties = {}
+    required = []
+    for p in tool_def.get("parameters", []):
+        schema = type_schema(p.get("type"), p.get("length"))
+        if p.get("enum"):
+            schema["enum"] = list(p["enum"])
+        if "default" in p:
+            schema["default"] = p["default"]
+        if p.get("description"):
+            schema["description"] = p["description"]
+        properties[p["name"]] = schema
+        if p.get("required", False):
+            required.append(p["name"])
+    schema = {"type": "object", "properties": properties, "additionalProperties": False}
+    if required:
+        schema["required"] = required
+    return schema
+
+
+def compile_parameters(tool_def):
+    """Compile a tool's parameter list into ``validate(params) -> dict``.
+
+    The returned dict holds every declared parameter that was supplied or
+    has a default, coerced to its declared type. Optional parameters without
+    a default are left out when not supplied.
+    """
+    tool_name = tool_def["tool_name"]
+    fields = []
+    for p in tool_def.get("parameters", []):
+        enum = frozenset(p["enum"]) if p.get("enum") else None
+        fields.append((
+            p["name"],
+            p.get("required", False),
+            "default" in p,
+            p.get("default"),
+            compile_type(p.get("type"), p.get("length")),
+            enum,
+        ))
+    known = frozenset(f[0] for f in fields)
+
+    def validate(params):
+        params = params or {}
+        unknown = params.keys() - known
+        if unknown:
+            raise SpecValidationError(f"Unknown parameter(s) for '{tool_name}': {', '.join(sorted(unknown))}")
+        out = {}
+        for name, required, has_default, default, coerce, enum in fields:
+            value = params.get(name)
+            if value is None:
+                if required:
+                    raise SpecValidationError(f"Missing required parameter '{name}' for '{tool_name}'")
+                if has_default:
+                    out[name] = copy.deepcopy(default) if isinstance(default, (list, dict)) else default
+                continue
+            try:
+                value = coerce(value)
+            except SpecValidationError as e:
+                raise SpecValidationError(f"Parameter '{name}' of '{tool_name}': {e}") from None
+            if enum is not None and value not in enum:
+                raise SpecValidationError(f"Parameter '{name}' of '{tool_name}' must be one of {sorted(enum)}, got {value!r}")
+            out[name] = value
+        return out
+    return validate
+
+
+# --- Spec cache ---
+# The parsed spec plus what is derived from it at startup, stored with marshal
+# (fast to load, tied to the interpreter version like a .pyc).
+SPEC_CACHE_FORMAT = 1
+SPEC_CACHE_PATH = os.path.join(os.path.dirname(BLENDERTOOL_PATH), "__pycache__", f"blendertool.{sys.implementation.cache_tag}.spec")
+
+
+def _read_spec_cache(cache_path):
+    try:
+        with open(cache_path, "rb") as f:
+            cached = marshal.loads(f.read())
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if not isinstance(cached, dict) or cached.get("format") != SPEC_CACHE_FORMAT:
+        return None
+    return cached
+
+
+def _write_spec_cache(cache_path, cached):
+    """Write the cache atomically; a read-only install just goes without it."""
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with open(tmp_path, "wb") as f:
+            f.write(marshal.dumps(cached))
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+
+def load_spec_cached(path=BLENDERTOOL_PATH, cache_path=SPEC_CACHE_PATH):
+    """Return ``(spec, derived)``, from the spec cache when it is still valid.
+
+    ``derived`` holds the catalog hash and every tool's JSON Schema. The
+    cache is used as is while the file's mtime and size are unchanged;
+    otherwise the file is hashed and the cache is reused only if the SHA-256
+    matches, so a touched but unedited spec is not parsed again.
+    """
+    stat = os.stat(path)
+    stamp = [stat.st_mtime_ns, stat.st_size]
+    cached = _read_spec_cache(cache_path) if cache_path else None
+    if cached is not None and cached["stamp"] == stamp:
+        return cached["spec"], cached["derived"]
+    with open(path, "rb") as f:
+        data = f.read()
+    digest = hashlib.sha256(data).hexdigest()
+    if cached is not None and cached["sha256"] == digest:
+        spec, derived = cached["spec"], cached["derived"]
+    else:
+        spec = json.loads(data)
+        derived = {
+            "catalog_hash": compute_catalog_hash(spec["commands"]),
+            "schemas": {tool["tool_name"]: json_schema(tool) for tool in spec["commands"]},
+        }
+    if cache_path:
+        _write_spec_cache(cache_path, {"format": SPEC_CACHE_FORMAT, "stamp": stamp, "sha256": digest, "spec": spec, "derived": derived})
+    return spec, derived
@@ -1,190 +1,991 @@
 import sys
-import socket
+import asyncio
+import collections
+import hashlib
 import json
 import os
-import time
 import logging
-from dataclasses import dataclass
-from typing import Optional, Dict, Any, List, Union
+import socket
+import time
+import zlib
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Optional, Dict, Any, List, Union
 from mcp.server import Server
 from mcp.server.stdio import stdio_server
 from mcp.types import (
     ErrorData,
-    GetPromptResult,
-    Prompt,
-    PromptArgument,
-    PromptMessage,
     TextContent,
     Tool,
     INVALID_PARAMS,
     INTERNAL_ERROR,
 )
-from pydantic import BaseModel, Field
 from mcp.shared.exceptions import McpError
+import blender_mcp_logging as mcp_logging
+import blender_mcp_metrics as mcp_metrics
+import blender_mcp_protocol as protocol
+import blender_mcp_spec as tool_spec
+
+if TYPE_CHECKING:
+    from blender_mcp_workers import WorkerPool  # imported when the worker pool starts
 
 # --- Load blendertool.json ---
-BLENDERTOOL_PATH = os.path.join(os.path.dirname(__file__), "blendertool.json")
-with open(BLENDERTOOL_PATH, "r", encoding="utf-8") as f:
-    BLENDER_TOOL_SPEC = json.load(f)
+# MCP clients start a relay per session, so startup only loads the spec (from
+# its marshal cache when unchanged); validators are compiled on first use.
+# Set BLENDER_MCP_SPEC_CACHE to another path, or to nothing to disable the cache.
+BLENDERTOOL_PATH = tool_spec.BLENDERTOOL_PATH
+SPEC_CACHE_PATH = os.environ.get("BLENDER_MCP_SPEC_CACHE", tool_spec.SPEC_CACHE_PATH)
+BLENDER_TOOL_SPEC, SPEC_DERIVED = tool_spec.load_spec_cached(BLENDERTOOL_PATH, SPEC_CACHE_PATH)
+TOOL_INDEX = tool_spec.build_index(BLENDER_TOOL_SPEC)
+CATALOG = tool_spec.ToolCatalog(BLENDER_TOOL_SPEC, SPEC_DERIVED["catalog_hash"])
+READ_ONLY_COMMANDS = tool_spec.read_only_commands(BLENDER_TOOL_SPEC)
+# One validator per blendertool.json entry, so bad arguments are rejected
+# here without a round trip to Blender.
+TOOL_VALIDATORS = {}
+
+def tool_validator(tool_name: str):
+    validator = TOOL_VALIDATORS.get(tool_name)
+    if validator is None:
+        validator = TOOL_VALIDATORS[tool_name] = tool_spec.compile_parameters(TOOL_INDEX[tool_name])
+    return validator
+
+BLENDER_PORT = int(os.environ.get("BLENDER_MCP_PORT", 9877))
+
+# Wire codecs offered to the addon, most preferred first, and the size from
+# which the addon compresses framed responses (unset: never compress)
+RELAY_CODECS = [name for name in os.environ.get("BLENDER_MCP_CODECS", ",".join(protocol.available_codecs())).split(",") if name]
+COMPRESS_THRESHOLD = int(os.environ["BLENDER_MCP_COMPRESS_THRESHOLD"]) if os.environ.get("BLENDER_MCP_COMPRESS_THRESHOLD") else None
+
+# Pretty-print tool results for humans reading the MCP traffic
+DEBUG = os.environ.get("BLENDER_MCP_DEBUG", "") not in ("", "0")
 
-# Configure logging
+# Read-only responses kept by the relay (0 disables the cache), and how long a
+# known scene version is trusted before it is re-read from the addon
+RESPONSE_CACHE_SIZE = int(os.environ.get("BLENDER_MCP_CACHE_SIZE", 256))
+RESPONSE_CACHE_BYTES = 32 * 1024 * 1024
+RESPONSE_CACHE_VERSION_TTL = float(os.environ.get("BLENDER_MCP_CACHE_VERSION_TTL", 0.5))
+
+# Optional pool of headless Blender workers (0 disables the WORKER_* tools)
+WORKER_COUNT = int(os.environ.get("BLENDER_MCP_WORKERS", "0"))
+WORKER_BASE_PORT = int(os.environ["BLENDER_MCP_WORKER_BASE_PORT"]) if os.environ.get("BLENDER_MCP_WORKER_BASE_PORT") else None
+
+# Configure logging (queued, rotated; set the level with BLENDER_MCP_LOG_LEVEL)
 LOG_DIR = os.path.dirname(os.path.abspath(__file__))
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(os.path.join(LOG_DIR, "blender_mcp_relay.log")),
-        logging.StreamHandler(sys.stderr)
-    ]
-)
-logger = logging.getLogger("BlenderMCPRelay")
+logger = mcp_logging.setup("BlenderMCPRelay", os.path.join(LOG_DIR, "blender_mcp_relay.log"), stream=sys.stderr)
+
+# Relay-side metrics: per MCP tool (total time in call_tool) and per Blender
+# command (encode, round_trip to the addon and decode of the reply)
+TOOL_METRICS = mcp_metrics.CommandMetrics()
+COMMAND_METRICS = mcp_metrics.CommandMetrics()
+
+def enable_keepalive(sock, idle: int = 10, interval: int = 5, count: int = 3):
+    """Turn on TCP keepalive so a vanished peer is noticed within idle + interval * count seconds."""
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    for option, value in (("TCP_KEEPIDLE", idle), ("TCP_KEEPINTVL", interval), ("TCP_KEEPCNT", count)):
+        if hasattr(socket, option):
+            sock.setsockopt(socket.IPPROTO_TCP, getattr(socket, option), value)
+
+class CommandHelpers:
+    """Multi-request operations built on ``send_command``."""
+
+    async def upload(self, data, suffix: str = "", chunk_size: int = 2 * 1024 * 1024, window: int = 8) -> str:
+        """Stream binary ``data`` into the addon's upload store and return the finalized upload id.
+
+        Up to ``window`` chunks are in flight at once; each carries its offset
+        and CRC32, and the addon verifies the whole upload's SHA-256.
+        """
+        view = memoryview(data).cast("B")
+        init = await self.send_command({"type": "chunked_upload_init", "params": {
+            "total_size": view.nbytes,
+            "sha256": hashlib.sha256(view).hexdigest(),
+            "suffix": suffix,
+        }})
+        upload_id = init["upload_id"]
+        chunk_size = min(chunk_size, init.get("max_chunk_size", chunk_size))
+        offsets = list(range(0, view.nbytes, chunk_size))
+        try:
+            for start in range(0, len(offsets), window):
+                await asyncio.gather(*(
+                    self.send_command({"type": "chunked_upload_chunk", "params": {
+                        "upload_id": upload_id,
+                        "offset": offset,
+                        "chunk": view[offset:offset + chunk_size],
+                        "crc32": zlib.crc32(view[offset:offset + chunk_size]),
+                    }})
+                    for offset in offsets[start:start + window]
+                ))
+            await self.send_command({"type": "chunked_upload_finalize", "params": {"upload_id": upload_id}})
+        except Exception:
+            try:
+                await self.send_command({"type": "chunked_upload_discard", "params": {"upload_id": upload_id}})
+            except Exception:
+                pass
+            raise
+        return upload_id
+
+    async def fetch_render(self, job_id: str, index: int = 0, chunk_size: int = 2 * 1024 * 1024, window: int = 8) -> bytes:
+        """Download one finished output of a render job, keeping up to ``window`` chunk requests in flight."""
+        def fetch(offset):
+            return self.send_command({"type": "render_fetch", "params": {
+                "job_id": job_id, "index": index, "offset": offset, "length": chunk_size,
+            }})
+        first = await fetch(0)
+        head = protocol.binary_value(first["data"])
+        data = bytearray(first["total_size"])
+        data[:len(head)] = head
+        chunk_size = len(head) or chunk_size
+        offsets = list(range(len(head), len(data), chunk_size))
+        for start in range(0, len(offsets), window):
+            for chunk in await asyncio.gather(*(fetch(offset) for offset in offsets[start:start + window])):
+                body = protocol.binary_value(chunk["data"])
+                data[chunk["offset"]:chunk["offset"] + len(body)] = body
+        return bytes(data)
 
 @dataclass
-class BlenderConnection:
+class BlenderConnection(CommandHelpers):
+    """Asyncio connection to the Blender addon.
+
+    With framing negotiated, every request is tagged with an id and a single
+    reader task routes responses back to the waiting caller, so several
+    commands can be in flight at once. Against an addon that only speaks
+    bare JSON, requests are serialized over the stream instead.
+    """
     host: str = "127.0.0.1"
-    port: int = 9877
-    sock: Optional[socket.socket] = None
+    port: int = BLENDER_PORT
     timeout: float = 60.0
+    connect_timeout: float = 5.0
     max_reconnect_attempts: int = 3
     base_reconnect_delay: float = 1.0
+    use_framing: bool = True
+    codecs: List[str] = field(default_factory=lambda: list(RELAY_CODECS))
+    compress_threshold: Optional[int] = COMPRESS_THRESHOLD
+    protocol_version: Optional[int] = None
+    codec: Any = protocol.JSON_CODEC
+    next_request_id: int = 0
+    reader: Optional[asyncio.StreamReader] = None
+    writer: Optional[asyncio.StreamWriter] = None
+    pending: Dict[int, asyncio.Future] = field(default_factory=dict)
+    _reader_task: Optional[asyncio.Task] = None
+    _connect_lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    _legacy_lock: asyncio.Lock = field(default_factory=asyncio.Lock)
 
-    def connect(self) -> bool:
+    @property
+    def connected(self) -> bool:
+        return self.writer is not None and not self.writer.is_closing()
+
+    async def connect(self) -> bool:
         """Establish a connection to the Blender addon."""
-        if self.sock:
-            try:
-                self.sock.sendall(b'')  # Test if socket is still valid
+        async with self._connect_lock:
+            if self.connected:
                 return True
-            except:
-                self.disconnect()
+            for attempt in range(self.max_reconnect_attempts):
+                try:
+                    self.reader, self.writer = await asyncio.wait_for(
+                        asyncio.open_connection(self.host, self.port), self.connect_timeout
+                    )
+                    sock = self.writer.get_extra_info("socket")
+                    if sock is not None:
+                        enable_keepalive(sock)
+                    logger.info(f"Connected to Blender at {self.host}:{self.port}")
+                    await asyncio.wait_for(self.negotiate_protocol(), self.connect_timeout)
+                    if self.protocol_version:
+                        self._reader_task = asyncio.create_task(self._read_frames())
+                    return True
+                except Exception as e:
+                    await self.disconnect()
+                    delay = self.base_reconnect_delay * (2 ** attempt)
+                    logger.error(f"Failed to connect (attempt {attempt + 1}/{self.max_reconnect_attempts}): {str(e)}")
+                    if attempt < self.max_reconnect_attempts - 1:
+                        logger.info(f"Retrying in {delay} seconds...")
+                        await asyncio.sleep(delay)
+                    else:
+                        logger.error("Max reconnect attempts reached")
+            return False
 
-        for attempt in range(self.max_reconnect_attempts):
-            try:
-                self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                self.sock.settimeout(self.timeout)
-                self.sock.connect((self.host, self.port))
-                logger.info(f"Connected to Blender at {self.host}:{self.port}")
-                return True
-            except Exception as e:
-                delay = self.base_reconnect_delay * (2 ** attempt)
-                logger.error(f"Failed to connect (attempt {attempt + 1}/{self.max_reconnect_attempts}): {str(e)}")
-                if attempt < self.max_reconnect_attempts - 1:
-                    logger.info(f"Retrying in {delay} seconds...")
-                    time.sleep(delay)
-                else:
-                    logger.error("Max reconnect attempts reached")
-                    self.disconnect()
-                    return False
-        return False
-
-    def disconnect(self):
-        """Close the connection to Blender."""
-        if self.sock:
+    async def negotiate_protocol(self):
+        """Offer framed messages to the addon, falling back to bare JSON."""
+        self.protocol_version = None
+        self.codec = protocol.JSON_CODEC
+        if not self.use_framing:
+            return
+        self.writer.write(protocol.encode_json(protocol.hello_request(codecs=self.codecs, compress_threshold=self.compress_threshold)))
+        await self.writer.drain()
+        response = await self.receive_full_response()
+        version = response.get("protocol_version")
+        if response.get("status") == "ok" and version in protocol.SUPPORTED_VERSIONS:
+            self.protocol_version = version
+            self.codec = protocol.get_codec(response.get("codec"))
+            logger.info(f"Negotiated framed protocol v{version} with the {self.codec.name} codec")
+        else:
+            logger.info("Addon does not support framing, using bare JSON")
+
+    async def disconnect(self):
+        """Close the connection to Blender and fail any in-flight requests."""
+        task, self._reader_task = self._reader_task, None
+        if task and task is not asyncio.current_task():
+            task.cancel()
+        writer, self.writer, self.reader = self.writer, None, None
+        self.protocol_version = None
+        self._fail_pending(ConnectionError("Connection to Blender closed"))
+        if writer:
             try:
-                self.sock.close()
+                writer.close()
+                await writer.wait_closed()
             except Exception as e:
                 logger.error(f"Error disconnecting from Blender: {str(e)}")
-            finally:
-                self.sock = None
 
-    def receive_full_response(self) -> bytes:
-        """Receive a complete JSON response from Blender."""
-        chunks = []
-        start_time = time.time()
+    def _fail_pending(self, exc: Exception):
+        pending, self.pending = self.pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(exc)
+
+    async def receive_full_response(self) -> Dict[str, Any]:
+        """Receive and decode a complete bare-JSON response from Blender."""
+        return (await self._receive_legacy())[0]
+
+    async def _receive_legacy(self):
+        """Return ``(response, bytes received, seconds spent decoding)``."""
+        decoder = protocol.JsonStreamDecoder()
+        received = 0
+        decode_time = 0.0
         while True:
-            try:
-                chunk = self.sock.recv(8192)
-                if not chunk:
-                    if not chunks:
-                        raise Exception("Connection closed before receiving data")
-                    break
-                chunks.append(chunk)
-                try:
-                    data = b''.join(chunks)
-                    json.loads(data.decode('utf-8'))
-                    logger.info(f"Received complete response ({len(data)} bytes)")
-                    return data
-                except json.JSONDecodeError:
+            chunk = await self.reader.read(65536)
+            if not chunk:
+                if not received:
+                    raise ConnectionError("Connection closed before receiving data")
+                raise ConnectionError("Incomplete JSON response received")
+            received += len(chunk)
+            start = time.perf_counter()
+            messages = decoder.feed(chunk)
+            decode_time += time.perf_counter() - start
+            if messages:
+                logger.debug("Received complete response (%d bytes)", received)
+                return messages[0], received, decode_time
+
+    async def _read_frames(self):
+        """Route framed responses to the futures waiting on their request ids."""
+        try:
+            while True:
+                header = await self.reader.readexactly(protocol.HEADER.size)
+                magic, version, flags, request_id, length = protocol.HEADER.unpack(header)
+                if magic != protocol.MAGIC or version != self.protocol_version:
+                    raise protocol.ProtocolError(f"Unexpected frame header {header!r}")
+                payload = await self.reader.readexactly(length)
+                future = self.pending.pop(request_id, None)
+                if future is None or future.done():
+                    logger.warning(f"Discarding response for abandoned request {request_id}")
                     continue
-            except socket.timeout:
-                elapsed = time.time() - start_time
-                logger.warning(f"Socket timeout after {elapsed:.2f} seconds")
-                if chunks:
-                    data = b''.join(chunks)
-                    try:
-                        json.loads(data.decode('utf-8'))
-                        logger.info(f"Recovered partial response ({len(data)} bytes)")
-                        return data
-                    except json.JSONDecodeError:
-                        raise Exception("Incomplete JSON response received")
-                raise Exception("No data received within timeout")
-            except Exception as e:
-                logger.error(f"Error during receive: {str(e)}")
-                raise
+                start = time.perf_counter()
+                response = protocol.decode_payload(payload, flags, self.codec)
+                future.set_result((response, length, time.perf_counter() - start))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if not isinstance(e, asyncio.IncompleteReadError):
+                logger.error(f"Error reading from Blender: {str(e)}")
+            await self.disconnect()
+
+    async def send_command(self, command: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Send a command to Blender and return the response.
 
-    def send_command(self, command: Dict[str, Any]) -> Dict[str, Any]:
-        """Send a command to Blender and return the response."""
-        if not self.sock and not self.connect():
+        ``timeout`` overrides the default per-request deadline. A request that
+        times out or is cancelled is abandoned without affecting other
+        requests sharing the connection.
+        """
+        # A connection still negotiating its protocol waits for the handshake.
+        if (not self.connected or self._connect_lock.locked()) and not await self.connect():
             raise ConnectionError("Not connected to Blender")
+        timeout = self.timeout if timeout is None else timeout
+        kind = command.get("type")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Sending command: %s", mcp_logging.Payload(command), extra={"command": kind})
+        try:
+            if self.protocol_version:
+                response, received, decode_time = await self._send_framed(command, timeout)
+            else:
+                response, received, decode_time = await self._send_legacy(command, timeout)
+        except asyncio.TimeoutError:
+            COMMAND_METRICS.count(kind, ok=False)
+            raise TimeoutError(f"Blender did not answer '{command.get('type')}' within {timeout} seconds")
+        except (ConnectionError, OSError, protocol.ProtocolError) as e:
+            COMMAND_METRICS.count(kind, ok=False)
+            logger.error(f"Error communicating with Blender: {str(e)}")
+            await self.disconnect()
+            raise ConnectionError(f"Connection to Blender lost: {str(e)}")
+        COMMAND_METRICS.observe(kind, "decode", decode_time)
+        COMMAND_METRICS.add_bytes(kind, received=received)
+        COMMAND_METRICS.count(kind, ok=response.get("status") != "error")
+        if response.get("status") == "error":
+            logger.error(f"Blender error: {response.get('message')}")
+            raise Exception(response.get("message", "Unknown error"))
+        return response
+
+    # Both senders return (response, bytes received, seconds spent decoding).
+    async def _send_framed(self, command: Dict[str, Any], timeout: float) -> tuple:
+        self.next_request_id = (self.next_request_id + 1) & 0xFFFFFFFF
+        request_id = self.next_request_id
+        future = asyncio.get_running_loop().create_future()
+        self.pending[request_id] = future
+        kind = command.get("type")
+        try:
+            start = time.perf_counter()
+            parts = protocol.encode_frame_parts(request_id, command, self.codec)
+            sent_at = time.perf_counter()
+            COMMAND_METRICS.observe(kind, "encode", sent_at - start)
+            COMMAND_METRICS.add_bytes(kind, sent=sum(memoryview(part).nbytes for part in parts))
+            self.writer.writelines(parts)
+            await self.writer.drain()
+            result = await asyncio.wait_for(future, timeout)
+            COMMAND_METRICS.observe(kind, "round_trip", time.perf_counter() - sent_at - result[2])
+            return result
+        finally:
+            self.pending.pop(request_id, None)
+
+    async def _send_legacy(self, command: Dict[str, Any], timeout: float) -> tuple:
+        kind = command.get("type")
+        async with self._legacy_lock:
+            start = time.perf_counter()
+            data = protocol.encode_json(command)
+            sent_at = time.perf_counter()
+            COMMAND_METRICS.observe(kind, "encode", sent_at - start)
+            COMMAND_METRICS.add_bytes(kind, sent=len(data))
+            self.writer.write(data)
+            await self.writer.drain()
+            try:
+                result = await asyncio.wait_for(self._receive_legacy(), timeout)
+                COMMAND_METRICS.observe(kind, "round_trip", time.perf_counter() - sent_at - result[2])
+                return result
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                # A bare-JSON stream cannot skip the late reply, so start over.
+                await self.disconnect()
+                raise
+
+@dataclass
+class CircuitBreaker:
+    """Fail fast after repeated connection failures.
+
+    Closed until ``failure_threshold`` consecutive failures, then open for
+    ``reset_timeout`` seconds, then half-open: the next attempt decides
+    whether it closes again or re-opens.
+    """
+    failure_threshold: int = 3
+    reset_timeout: float = 10.0
+    failures: int = 0
+    opened_at: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if self.retry_in() == 0 else "open"
+
+    def retry_in(self) -> float:
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+@dataclass
+class BlenderConnectionPool(CommandHelpers):
+    """Pooled connections to the Blender addon with health checks.
+
+    Requests go to the open connection with the fewest requests in flight.
+    Idle connections are pinged with ``test_connection``; dead ones are
+    reconnected by background tasks with capped exponential backoff, so
+    callers never sleep through a reconnect. While the circuit breaker is
+    open, requests fail immediately instead of waiting on a Blender that is
+    down.
+    """
+    host: str = "127.0.0.1"
+    port: int = BLENDER_PORT
+    size: int = 2
+    timeout: float = 60.0
+    connect_timeout: float = 5.0
+    ping_interval: float = 15.0
+    ping_timeout: float = 5.0
+    base_reconnect_delay: float = 0.5
+    max_reconnect_delay: float = 30.0
+    breaker: CircuitBreaker = field(default_factory=CircuitBreaker)
+    connections: List[BlenderConnection] = field(default_factory=list)
+    in_use: List[int] = field(default_factory=list)
+    reconnects: int = 0
+    pings: int = 0
+    ping_failures: int = 0
+    _reconnect_tasks: Dict[int, asyncio.Task] = field(default_factory=dict)
+    _ping_task: Optional[asyncio.Task] = None
+    _warm_up_task: Optional[asyncio.Task] = None
+
+    def __post_init__(self):
+        self.connections = [
+            BlenderConnection(host=self.host, port=self.port, timeout=self.timeout, connect_timeout=self.connect_timeout, max_reconnect_attempts=1)
+            for _ in range(self.size)
+        ]
+        self.in_use = [0] * self.size
+
+    def _pick(self) -> Optional[int]:
+        open_ = [i for i, conn in enumerate(self.connections) if conn.connected]
+        for i, conn in enumerate(self.connections):
+            if not conn.connected and open_:
+                self._schedule_reconnect(i)
+        return min(open_, key=self.in_use.__getitem__) if open_ else None
+
+    def _schedule_reconnect(self, index: int):
+        task = self._reconnect_tasks.get(index)
+        if task is None or task.done():
+            self._reconnect_tasks[index] = asyncio.create_task(self._reconnect(index))
+
+    async def _reconnect(self, index: int):
+        conn = self.connections[index]
+        delay = self.base_reconnect_delay
+        while not conn.connected:
+            if await conn.connect():
+                self.reconnects += 1
+                self.breaker.record_success()
+                return
+            self.breaker.record_failure()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    async def _ping_loop(self):
+        while True:
+            await asyncio.sleep(self.ping_interval)
+            for i, conn in enumerate(self.connections):
+                if not conn.connected or self.in_use[i]:
+                    continue
+                try:
+                    await conn.send_command({"type": "test_connection"}, timeout=self.ping_timeout)
+                    self.pings += 1
+                except Exception as e:
+                    self.ping_failures += 1
+                    logger.warning(f"Ping to Blender failed: {str(e)}")
+                    await conn.disconnect()
+                    self._schedule_reconnect(i)
+
+    async def _acquire(self) -> int:
+        if self._ping_task is None or self._ping_task.done():
+            self._ping_task = asyncio.create_task(self._ping_loop())
+        index = self._pick()
+        if index is not None:
+            return index
+        if self.breaker.state == "open":
+            raise ConnectionError(f"Blender is unavailable (circuit open, retrying in {self.breaker.retry_in():.1f}s)")
+        # Closed or half-open: this caller makes one bounded attempt itself.
+        index = 0
+        if await self.connections[index].connect():
+            self.breaker.record_success()
+            for i in range(1, self.size):
+                self._schedule_reconnect(i)
+            return index
+        self.breaker.record_failure()
+        self._schedule_reconnect(index)
+        raise ConnectionError("Not connected to Blender")
+
+    async def send_command(self, command: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        index = await self._acquire()
+        self.in_use[index] += 1
+        try:
+            return await self.connections[index].send_command(command, timeout)
+        except ConnectionError:
+            self.breaker.record_failure()
+            self._schedule_reconnect(index)
+            raise
+        finally:
+            self.in_use[index] -= 1
+
+    async def upload(self, data, suffix: str = "", chunk_size: int = 2 * 1024 * 1024, window: int = 8) -> str:
+        """Upload over a single connection, since the addon appends chunks in arrival order."""
+        index = await self._acquire()
+        self.in_use[index] += 1
         try:
-            logger.info(f"Sending command: {command}")
-            self.sock.sendall(json.dumps(command).encode('utf-8'))
-            response_data = self.receive_full_response()
-            response = json.loads(response_data.decode('utf-8'))
-            if response.get("status") == "error":
-                logger.error(f"Blender error: {response.get('message')}")
-                raise Exception(response.get("message", "Unknown error"))
+            return await self.connections[index].upload(data, suffix, chunk_size, window)
+        finally:
+            self.in_use[index] -= 1
+
+    def warm_up(self):
+        """Start connecting in the background so the first request finds a connection open.
+
+        A failed attempt is not held against the circuit breaker; the first
+        request then makes its own attempt as usual.
+        """
+        if self._warm_up_task is None:
+            self._warm_up_task = asyncio.create_task(self._warm_up())
+
+    async def _warm_up(self):
+        if await self.connections[0].connect():
+            self.breaker.record_success()
+            for i in range(1, self.size):
+                self._schedule_reconnect(i)
+
+    async def close(self):
+        tasks = list(self._reconnect_tasks.values()) + [task for task in (self._ping_task, self._warm_up_task) if task]
+        for task in tasks:
+            task.cancel()
+        self._reconnect_tasks.clear()
+        self._ping_task = None
+        self._warm_up_task = None
+        await asyncio.gather(*(conn.disconnect() for conn in self.connections))
+
+    def metrics(self) -> Dict[str, Any]:
+        open_ = sum(conn.connected for conn in self.connections)
+        in_use = sum(1 for conn, n in zip(self.connections, self.in_use) if conn.connected and n)
+        return {
+            "size": self.size,
+            "open": open_,
+            "idle": open_ - in_use,
+            "in_use": in_use,
+            "in_flight": sum(self.in_use),
+            "reconnects": self.reconnects,
+            "pings": self.pings,
+            "ping_failures": self.ping_failures,
+            "circuit": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+        }
+
+@dataclass
+class SceneMirror:
+    """Relay-side copy of the addon's datablock names, kept current from its change feed.
+
+    Each ``sync`` fetches only the changes since the mirrored version; the
+    full snapshot is transferred only when the addon reports that the
+    mirror fell behind its change log or the addon was restarted.
+    """
+    connection: Union[BlenderConnection, BlenderConnectionPool]
+    version: int = -1
+    feed_id: Optional[str] = None
+    datablocks: Dict[str, set] = field(default_factory=dict)
+    _sync_lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+    async def sync(self) -> Dict[str, Any]:
+        """Bring the mirror up to date and return what changed since the last sync."""
+        async with self._sync_lock:
+            response = await self.connection.send_command({"type": "changes_since", "params": {"version": self.version}})
+            if response["resync_required"] or response["feed_id"] != self.feed_id:
+                if response["feed_id"] != self.feed_id and not response["resync_required"]:
+                    response = await self.connection.send_command({"type": "changes_since", "params": {"version": -1}})
+                self.datablocks = {coll: set(names) for coll, names in response["snapshot"].items()}
+                self.feed_id = response["feed_id"]
+                self.version = response["version"]
+                logger.info(f"Scene mirror resynced at version {self.version}")
+                return {"version": self.version, "resync": True, "snapshot": response["snapshot"]}
+            for change in response["changes"]:
+                self._apply(change)
+            self.version = response["version"]
+            return {"version": self.version, "resync": False, "changes": response["changes"]}
+
+    def _apply(self, change: Dict[str, Any]):
+        names = self.datablocks.setdefault(change["collection"], set())
+        kind = change["change"]
+        if kind == "added":
+            names.add(change["name"])
+        elif kind == "removed":
+            names.discard(change["name"])
+        elif kind == "renamed":
+            names.discard(change["old_name"])
+            names.add(change["name"])
+
+def approx_size(value: Any) -> int:
+    """Rough in-memory size of a decoded response, for cache accounting."""
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return memoryview(value).nbytes
+    if isinstance(value, str):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(len(str(key)) + approx_size(item) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return sum(approx_size(item) for item in value) + 8 * len(value)
+    return 8
+
+@dataclass
+class ResponseCache:
+    """Relay-side memo of read-only command responses, valid for one scene version.
+
+    The addon stamps main-thread responses with ``scene_version``, which
+    moves on every command that may modify the scene and on edits seen by
+    its change feed. A read-only command with the same type and parameters
+    as one answered at the current version is served from memory; a newer
+    version clears the cache. The version is re-read with the addon's inline
+    ``scene_version`` command at most every ``version_ttl`` seconds, so
+    changes made in Blender's UI show up within that window.
+    """
+    connection: Union[BlenderConnection, BlenderConnectionPool]
+    read_only: frozenset = READ_ONLY_COMMANDS
+    max_entries: int = RESPONSE_CACHE_SIZE
+    max_bytes: int = RESPONSE_CACHE_BYTES
+    version_ttl: float = RESPONSE_CACHE_VERSION_TTL
+    version: Optional[tuple] = None
+    checked_at: float = 0.0
+    hits: int = 0
+    misses: int = 0
+    _entries: collections.OrderedDict = field(default_factory=collections.OrderedDict)  # key -> (version, response, size)
+    _bytes: int = 0
+
+    async def send_command(self, command: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        kind = command.get("type")
+        if kind not in self.read_only or self.max_entries < 1:
+            response = await self.connection.send_command(command, timeout)
+            self._observe(response)
             return response
-        except Exception as e:
-            logger.error(f"Error communicating with Blender: {str(e)}", exc_info=True)
-            self.disconnect()
-            raise Exception(f"Connection to Blender lost: {str(e)}")
+        if time.monotonic() - self.checked_at >= self.version_ttl:
+            self._observe(await self.connection.send_command({"type": "scene_version"}, timeout))
+        key = (kind, json.dumps(command.get("params") or {}, sort_keys=True, separators=(",", ":"), default=protocol.b64_default))
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == self.version:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        response = await self.connection.send_command(command, timeout)
+        if self._observe(response):
+            self._store(key, response)
+        return response
+
+    def _observe(self, response: Dict[str, Any]) -> bool:
+        """Track the scene version in ``response``; return whether it is the current one."""
+        version = response.get("scene_version")
+        if not isinstance(version, list) or len(version) != 2:
+            return False
+        epoch, n = version
+        if self.version is None or epoch != self.version[0] or n > self.version[1]:
+            self.clear()
+            self.version = (epoch, n)
+        elif n < self.version[1]:
+            return False  # answered before a change this cache has already seen
+        self.checked_at = time.monotonic()
+        return True
+
+    def _store(self, key: tuple, response: Dict[str, Any]):
+        size = approx_size(response)
+        if size > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= old[2]
+        self._entries[key] = (self.version, response, size)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            self._bytes -= self._entries.popitem(last=False)[1][2]
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "scene_version": list(self.version) if self.version else None,
+        }
+
+def has_batch_refs(value: Any) -> bool:
+    if isinstance(value, dict):
+        return "$ref" in value or any(has_batch_refs(v) for v in value.values())
+    if isinstance(value, list):
+        return any(has_batch_refs(v) for v in value)
+    return False
+
+def build_command(tool_name: str, params: Optional[Dict[str, Any]], validate: bool = True) -> Dict[str, Any]:
+    """Turn a tool invocation into an addon command, rejecting tools not in blendertool.json.
+
+    Parameters are validated and coerced against the spec, which also turns
+    base64 text in binary parameters into bytes so they travel as raw frame
+    attachments.
+    """
+    if tool_name not in TOOL_INDEX:
+        raise McpError(ErrorData(code=INVALID_PARAMS, message=f"Tool '{tool_name}' not found in blendertool.json."))
+    params = params or {}
+    if validate:
+        try:
+            params = tool_validator(tool_name)(params)
+        except tool_spec.SpecValidationError as e:
+            raise McpError(ErrorData(code=INVALID_PARAMS, message=str(e)))
+    return {"type": tool_name, "params": params}
+
+def build_batch_command(arguments: Dict[str, Any]) -> Dict[str, Any]:
+    commands = []
+    for index, item in enumerate(arguments.get("commands", [])):
+        if not isinstance(item, dict):
+            commands.append({"type": None, "error": f"Step {index} must be an object with a tool_name"})
+            continue
+        # Steps that reference earlier results are validated by the addon once resolved.
+        params = item.get("params")
+        try:
+            command = build_command(item.get("tool_name"), params, validate=not has_batch_refs(params))
+        except McpError as e:
+            # Sent along so the addon fails just this step, as the batch mode says.
+            command = {"type": item.get("tool_name"), "error": str(e)}
+        command["id"] = item.get("id")
+        commands.append(command)
+    return {"type": "batch", "params": {"commands": commands, "mode": arguments.get("mode", "stop_on_error")}}
+
+def result_text(value: Any) -> List[TextContent]:
+    """Tool result as compact JSON, or indented when BLENDER_MCP_DEBUG is set."""
+    if DEBUG:
+        text = json.dumps(value, indent=2, default=protocol.b64_default)
+    else:
+        text = protocol.encode_json(value).decode("utf-8")
+    return [TextContent(type="text", text=text)]
+
+TOOL_CALL_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "tool_name": {"type": "string", "description": "Name of the tool to invoke (see blendertool.json)."},
+        "params": {"type": "object", "description": "Parameters for the tool."}
+    },
+    "required": ["tool_name"]
+}
+
+WORKER_TOOLS = [
+    Tool(
+        name="WORKER_COMMAND",
+        description="Invoke a Blender tool on the least-loaded headless Blender worker instead of the interactive Blender. Workers start from an empty scene, so load a .blend first (e.g. with WORKER_MAP steps).",
+        inputSchema=TOOL_CALL_SCHEMA,
+    ),
+    Tool(
+        name="WORKER_MAP",
+        description="Run independent jobs in parallel across the headless Blender workers, e.g. one job per frame range or asset. Each job is a single tool call, or a list of steps run in order on one worker as a batch ({\"commands\": [...], \"mode\": ...}). Returns one result per job in order.",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "jobs": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "tool_name": {"type": "string", "description": "Tool to invoke for a single-call job."},
+                            "params": {"type": "object", "description": "Parameters for the tool."},
+                            "commands": {"type": "array", "items": TOOL_CALL_SCHEMA, "description": "Steps of a multi-call job."},
+                            "mode": {"type": "string", "enum": ["stop_on_error", "continue_on_error"], "description": "Batch mode for a multi-call job."}
+                        }
+                    }
+                }
+            },
+            "required": ["jobs"]
+        },
+    ),
+    Tool(
+        name="WORKER_STATUS",
+        description="Summarize the headless Blender workers: health, requests in flight, completed and failed jobs, restarts and utilization.",
+        inputSchema={"type": "object"},
+    ),
+]
 
 # --- Main Server ---
 async def serve() -> None:
     server = Server("blender-mcp")
-    blender_connection = BlenderConnection()
+    blender_connection = BlenderConnectionPool()
+    scene_mirror = SceneMirror(blender_connection)
+    response_cache = ResponseCache(blender_connection)
+    worker_pool: Optional["WorkerPool"] = None
+    worker_pool_lock = asyncio.Lock()
 
-    @server.list_tools()
-    async def list_tools() -> List[Tool]:
-        return [
+    async def get_worker_pool() -> "WorkerPool":
+        nonlocal worker_pool
+        async with worker_pool_lock:
+            if worker_pool is None:
+                if WORKER_COUNT < 1:
+                    raise McpError(ErrorData(code=INVALID_PARAMS, message="Worker pool is disabled; set BLENDER_MCP_WORKERS to the number of workers."))
+                from blender_mcp_workers import WorkerPool
+                pool = WorkerPool(
+                    WORKER_COUNT,
+                    lambda port: BlenderConnection(port=port, max_reconnect_attempts=1),
+                    base_port=WORKER_BASE_PORT,
+                )
+                await pool.start()
+                worker_pool = pool
+            return worker_pool
+
+    def build_tool_list() -> List[Tool]:
+        tools = [
             Tool(
                 name="LIST_COMMAND",
-                description="List all available Blender tools and their metadata as defined in blendertool.json.",
-                inputSchema={"type": "object"},
+                description="List the available Blender tools and their metadata as defined in blendertool.json. Filter by category or name prefix, page with cursor/limit, and use summary for names and descriptions only. The reply carries a hash; pass it back as if_none_match to get {\"not_modified\": true} while the catalog is unchanged.",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "if_none_match": {"type": "string", "description": "Catalog hash from an earlier reply."},
+                        "category": {"type": "string", "description": "Only tools in this category or below it, e.g. 'bpy.ops' or 'bpy.ops.mesh'."},
+                        "prefix": {"type": "string", "description": "Only tools whose name starts with this."},
+                        "summary": {"type": "boolean", "description": "Omit parameter schemas (default false)."},
+                        "cursor": {"type": "integer", "minimum": 0, "description": "Index of the first tool to return (default 0)."},
+                        "limit": {"type": "integer", "minimum": 1, "description": "Maximum number of tools to return."}
+                    }
+                },
             ),
             Tool(
                 name="USE_COMMAND",
-                description="Invoke a Blender tool by name with parameters. The tool_name must match an entry in blendertool.json.",
+                description="Invoke a Blender tool by name with parameters. The tool_name must match an entry in blendertool.json; every such tool is also listed as its own MCP tool with a typed schema.",
+                inputSchema=TOOL_CALL_SCHEMA,
+            ),
+            Tool(
+                name="BATCH_COMMAND",
+                description="Invoke many Blender tools in order in a single round trip. A parameter value of {\"$ref\": \"<step id or index>.<field>\"} is replaced with that field of an earlier step's result, e.g. {\"$ref\": \"0.object_name\"}.",
                 inputSchema={
                     "type": "object",
                     "properties": {
-                        "tool_name": {"type": "string", "description": "Name of the tool to invoke (see blendertool.json)."},
-                        "params": {"type": "object", "description": "Parameters for the tool."}
+                        "commands": {
+                            "type": "array",
+                            "description": "Ordered tool invocations.",
+                            "items": {
+                                "type": "object",
+                                "properties": {
+                                    "tool_name": {"type": "string", "description": "Name of the tool to invoke (see blendertool.json)."},
+                                    "params": {"type": "object", "description": "Parameters for the tool."},
+                                    "id": {"type": "string", "description": "Optional label later steps can reference."}
+                                },
+                                "required": ["tool_name"]
+                            }
+                        },
+                        "mode": {"type": "string", "enum": ["stop_on_error", "continue_on_error"], "description": "Whether to stop at the first failing step (default) or run every step."}
                     },
-                    "required": ["tool_name"]
+                    "required": ["commands"]
+                },
+            ),
+            Tool(
+                name="CONNECTION_STATUS",
+                description="Report the relay's connection pool to Blender: open, idle and in-use connections, reconnects, ping results and circuit breaker state.",
+                inputSchema={"type": "object"},
+            ),
+            Tool(
+                name="LOG_CONFIG",
+                description="Show or change logging at runtime, for the relay and the Blender addon alike. level is one of DEBUG, INFO, WARNING, ERROR; sample_every maps a command name to N so only one in N of its log records is kept (1 logs every call).",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "level": {"type": "string", "enum": ["DEBUG", "INFO", "WARNING", "ERROR"], "description": "New log level."},
+                        "sample_every": {"type": "object", "additionalProperties": {"type": "integer", "minimum": 1}, "description": "Sampling rate per command name."}
+                    }
                 },
             ),
+            Tool(
+                name="STATS",
+                description="Report per-command latency (p50/p95/p99 per phase), call and error counts, throughput and payload bytes for the relay and the Blender addon. Addon phases are queue_wait, execute, decode, encode, send and total; relay phases are encode, round_trip and decode per Blender command, and total per MCP tool. Set profile to a command name to run its next profile_runs calls under cProfile; the top functions are attached to that command's reply and listed here under profiles.",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "command": {"type": "string", "description": "Only report this command."},
+                        "reset": {"type": "boolean", "description": "Clear the metrics after reporting them."},
+                        "profile": {"type": "string", "description": "Command to profile; an empty string cancels pending profiling."},
+                        "profile_runs": {"type": "integer", "minimum": 1, "description": "Number of calls to profile (default 1)."},
+                        "profile_top": {"type": "integer", "minimum": 1, "description": "Number of functions to report, by cumulative time (default 25)."}
+                    }
+                },
+            ),
+            Tool(
+                name="SCENE_CHANGES",
+                description="Report what changed in the Blender scene since the previous SCENE_CHANGES call: datablocks added, removed, renamed, transformed or with new geometry. The first call (or one after the change log overflowed) returns a full snapshot of datablock names instead.",
+                inputSchema={"type": "object"},
+            ),
         ]
+        if WORKER_COUNT > 0:
+            tools.extend(WORKER_TOOLS)
+        return tools + [
+            Tool(name=tool["tool_name"], description=tool.get("description", ""), inputSchema=SPEC_DERIVED["schemas"][tool["tool_name"]])
+            for tool in BLENDER_TOOL_SPEC["commands"]
+        ]
+
+    # The tool list never changes while the relay runs, so build it on the
+    # first request rather than before answering initialize.
+    tool_list: List[Tool] = []
+
+    @server.list_tools()
+    async def list_tools() -> List[Tool]:
+        if not tool_list:
+            tool_list.extend(build_tool_list())
+        return tool_list
 
     @server.call_tool()
     async def call_tool(name: str, arguments: dict) -> List[TextContent]:
+        start = time.perf_counter()
+        ok = False
+        try:
+            result = await dispatch_tool(name, arguments or {})
+            ok = True
+            TOOL_METRICS.add_bytes(name, sent=sum(len(content.text) for content in result))
+            return result
+        finally:
+            TOOL_METRICS.observe(name, "total", time.perf_counter() - start)
+            TOOL_METRICS.count(name, ok)
+
+    async def dispatch_tool(name: str, arguments: dict) -> List[TextContent]:
         try:
             if name == "LIST_COMMAND":
-                return [TextContent(type="text", text=json.dumps(BLENDER_TOOL_SPEC["commands"], indent=2))]
+                try:
+                    text = CATALOG.serialized(**CATALOG.validate(arguments))
+                except tool_spec.SpecValidationError as e:
+                    raise McpError(ErrorData(code=INVALID_PARAMS, message=str(e)))
+                return [TextContent(type="text", text=text)]
             elif name == "USE_COMMAND":
-                tool_name = arguments.get("tool_name")
-                params = arguments.get("params", {})
-                # Only look up real tools in blendertool.json
-                tool_def = next((cmd for cmd in BLENDER_TOOL_SPEC["commands"] if cmd["tool_name"] == tool_name), None)
-                if not tool_def:
-                    raise McpError(ErrorData(code=INVALID_PARAMS, message=f"Tool '{tool_name}' not found in blendertool.json."))
-                response = blender_connection.send_command({
-                    "type": tool_name,
-                    "params": params
-                })
+                response = await response_cache.send_command(build_command(arguments.get("tool_name"), arguments.get("params")))
                 if response.get("status") == "error":
                     raise McpError(ErrorData(code=INTERNAL_ERROR, message=response.get("message", "Unknown error")))
-                return [TextContent(type="text", text=json.dumps(response, indent=2))]
+                return result_text(response)
+            elif name == "BATCH_COMMAND":
+                response = await response_cache.send_command(build_batch_command(arguments))
+                return result_text(response)
+            elif name == "WORKER_COMMAND":
+                command = build_command(arguments.get("tool_name"), arguments.get("params"))
+                response = await (await get_worker_pool()).submit(command)
+                return result_text(response)
+            elif name == "WORKER_MAP":
+                commands = [
+                    build_batch_command(job) if "commands" in job else build_command(job.get("tool_name"), job.get("params"))
+                    for job in arguments.get("jobs", [])
+                ]
+                results = await (await get_worker_pool()).map(commands)
+                results = [
+                    {"status": "error", "message": str(result)} if isinstance(result, Exception) else result
+                    for result in results
+                ]
+                return result_text(results)
+            elif name == "WORKER_STATUS":
+                summary = worker_pool.summary() if worker_pool else {"size": WORKER_COUNT, "started": False}
+                return result_text(summary)
+            elif name == "CONNECTION_STATUS":
+                return result_text(blender_connection.metrics())
+            elif name == "LOG_CONFIG":
+                try:
+                    relay_config = mcp_logging.configure(logger.name, arguments.get("level"), arguments.get("sample_every"))
+                except (TypeError, ValueError) as e:
+                    raise McpError(ErrorData(code=INVALID_PARAMS, message=str(e)))
+                params = {key: arguments[key] for key in ("level", "sample_every") if arguments.get(key) is not None}
+                try:
+                    blender_config = (await blender_connection.send_command({"type": "log_config", "params": params}))["result"]
+                except ConnectionError as e:
+                    blender_config = {"error": str(e)}
+                return result_text({"relay": relay_config, "blender": blender_config})
+            elif name == "STATS":
+                params = {key: arguments[key] for key in ("command", "reset", "profile", "profile_runs", "profile_top") if arguments.get(key) is not None}
+                command = arguments.get("command")
+                stats = {
+                    "relay": {
+                        "tools": TOOL_METRICS.snapshot(command),
+                        "commands": COMMAND_METRICS.snapshot(command),
+                        "response_cache": response_cache.metrics(),
+                    },
+                }
+                if arguments.get("reset"):
+                    TOOL_METRICS.reset()
+                    COMMAND_METRICS.reset()
+                try:
+                    stats["blender"] = (await blender_connection.send_command({"type": "stats", "params": params}))["result"]
+                except ConnectionError as e:
+                    stats["blender"] = {"error": str(e)}
+                return result_text(stats)
+            elif name == "SCENE_CHANGES":
+                return result_text(await scene_mirror.sync())
+            elif name in TOOL_INDEX:
+                response = await response_cache.send_command(build_command(name, arguments))
+                return result_text(response)
             else:
                 raise McpError(ErrorData(code=INVALID_PARAMS, message=f"Unknown tool: {name}"))
         except McpError as e:
@@ -196,9 +997,17 @@ async def serve() -> None:
             ))
 
     options = server.create_initialization_options()
-    async with stdio_server() as (read_stream, write_stream):
-        await server.run(read_stream, write_stream, options, raise_exceptions=True)
+    blender_connection.warm_up()
+    try:
+        async with stdio_server() as (read_stream, write_stream):
+            await server.run(read_stream, write_stream, options, raise_exceptions=True)
+    finally:
+        await blender_connection.close()
+        if worker_pool:
+            await worker_pool.stop()
 
 if __name__ == "__main__":
-    import asyncio
-    asyncio.run(serve()) 
\ No newline at end of file
+    try:
+        asyncio.run(serve())
+    finally:
+        mcp_logging.shutdown(logger.name) 
\ No newline at end of file
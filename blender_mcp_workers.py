@@ -0,0 +1,233 @@
+"""Pool of headless Blender processes supervised by the relay.
+
+Each worker is ``blender --background`` running the socket-server addon on
+its own localhost port, a free one unless a base port is given. Commands go to the healthy worker with the fewest
+requests in flight, and a health loop pings every worker with
+``test_connection``, relaunching any that exited or stopped answering.
+"""
+import asyncio
+import logging
+import os
+import secrets
+import shutil
+import socket
+import tempfile
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+ADDON_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "blender_mcp_socket_server.py")
+logger = logging.getLogger("BlenderMCPRelay.workers")
+
+
+def find_blender() -> str:
+    path = os.environ.get("BLENDER_PATH") or shutil.which("blender")
+    if not path:
+        raise FileNotFoundError("Blender executable not found; put it on PATH or set BLENDER_PATH")
+    return path
+
+
+def free_port() -> int:
+    """A port nothing listens on now; the worker binds it shortly after."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as probe:
+        probe.bind(("0.0.0.0", 0))
+        return probe.getsockname()[1]
+
+
+@dataclass
+class Worker:
+    index: int
+    port: int
+    connection: Any = None
+    process: Optional[asyncio.subprocess.Process] = None
+    healthy: bool = False
+    in_flight: int = 0
+    completed: int = 0
+    failed: int = 0
+    restarts: int = 0
+    token: str = ""
+    started_at: float = 0.0
+    busy_time: float = 0.0
+    _busy_since: Optional[float] = None
+
+    @property
+    def log_path(self) -> str:
+        return os.path.join(tempfile.gettempdir(), f"blender_mcp_worker_{self.port}.log")
+
+    def begin(self):
+        if self.in_flight == 0:
+            self._busy_since = time.monotonic()
+        self.in_flight += 1
+
+    def end(self, ok: bool):
+        self.in_flight -= 1
+        if ok:
+            self.completed += 1
+        else:
+            self.failed += 1
+        if self.in_flight == 0 and self._busy_since is not None:
+            self.busy_time += time.monotonic() - self._busy_since
+            self._busy_since = None
+
+    def summary(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        busy = self.busy_time + (now - self._busy_since if self._busy_since is not None else 0.0)
+        uptime = now - self.started_at if self.started_at else 0.0
+        return {
+            "index": self.index,
+            "port": self.port,
+            "pid": self.process.pid if self.process else None,
+            "healthy": self.healthy,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "failed": self.failed,
+            "restarts": self.restarts,
+            "uptime": round(uptime, 1),
+            "busy_time": round(busy, 3),
+            "utilization": round(busy / uptime, 3) if uptime else 0.0,
+        }
+
+
+@dataclass
+class WorkerPool:
+    """Launch, route to and supervise ``size`` headless Blender workers.
+
+    ``connection_factory(port)`` returns a connection object with an async
+    ``send_command(command, timeout)`` and ``disconnect()``, normally a
+    relay ``BlenderConnection``. Without ``base_port`` every launch picks a
+    free port, so several relays can run pools side by side.
+    """
+    size: int
+    connection_factory: Callable[[int], Any]
+    base_port: Optional[int] = None
+    blender_path: Optional[str] = None
+    addon_path: str = ADDON_PATH
+    startup_timeout: float = 60.0
+    health_interval: float = 5.0
+    ping_timeout: float = 5.0
+    workers: List[Worker] = field(default_factory=list)
+    _health_task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        self.blender_path = self.blender_path or find_blender()
+        self.workers = [Worker(i, self.base_port + i if self.base_port else 0) for i in range(self.size)]
+        try:
+            await asyncio.gather(*(self._launch(worker) for worker in self.workers))
+        except Exception:
+            await self.stop()
+            raise
+        self._health_task = asyncio.create_task(self._health_loop())
+        logger.info(f"Started {self.size} Blender workers on ports {', '.join(str(worker.port) for worker in self.workers)}")
+
+    async def stop(self):
+        task, self._health_task = self._health_task, None
+        if task:
+            task.cancel()
+        await asyncio.gather(*(self._terminate(worker) for worker in self.workers))
+
+    async def _launch(self, worker: Worker):
+        if not self.base_port:
+            worker.port = free_port()
+        # The worker echoes the token, so a server already on the port is not
+        # mistaken for it.
+        worker.token = secrets.token_hex(16)
+        with open(worker.log_path, "ab") as log_file:
+            worker.process = await asyncio.create_subprocess_exec(
+                self.blender_path, "--background", "--factory-startup",
+                "--python", self.addon_path, "--", "--port", str(worker.port), "--exit-with-parent",
+                "--worker-token", worker.token,
+                stdin=asyncio.subprocess.DEVNULL, stdout=log_file, stderr=asyncio.subprocess.STDOUT,
+            )
+        worker.connection = self.connection_factory(worker.port)
+        deadline = time.monotonic() + self.startup_timeout
+        while True:
+            if worker.process.returncode is not None:
+                raise RuntimeError(f"Blender worker on port {worker.port} exited with code {worker.process.returncode}; see {worker.log_path}")
+            try:
+                response = await worker.connection.send_command({"type": "test_connection"}, timeout=self.ping_timeout)
+            except (ConnectionError, TimeoutError):
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"Blender worker on port {worker.port} did not start within {self.startup_timeout} seconds; see {worker.log_path}")
+                await asyncio.sleep(0.5)
+                continue
+            if response.get("worker_token") != worker.token:
+                raise RuntimeError(f"Port {worker.port} is served by another Blender, not the worker launched for it; see {worker.log_path}")
+            break
+        worker.healthy = True
+        worker.started_at = time.monotonic()
+        worker.busy_time = 0.0
+        logger.info(f"Blender worker {worker.index} ready on port {worker.port} (pid {worker.process.pid})")
+
+    async def _terminate(self, worker: Worker):
+        worker.healthy = False
+        if worker.connection:
+            await worker.connection.disconnect()
+        process = worker.process
+        if process is None or process.returncode is not None:
+            return
+        process.terminate()
+        try:
+            await asyncio.wait_for(process.wait(), 10)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(self.health_interval)
+            await asyncio.gather(*(self._check(worker) for worker in self.workers))
+
+    async def _check(self, worker: Worker):
+        if worker.process.returncode is None:
+            try:
+                # test_connection is answered by the addon's socket thread, so a
+                # worker busy with a long job still passes.
+                response = await worker.connection.send_command({"type": "test_connection"}, timeout=self.ping_timeout)
+                if response.get("worker_token") != worker.token:
+                    raise RuntimeError(f"port {worker.port} is served by another Blender")
+                worker.healthy = True
+                return
+            except Exception as e:
+                logger.warning(f"Blender worker {worker.index} failed its health check: {str(e)}")
+        else:
+            logger.warning(f"Blender worker {worker.index} exited with code {worker.process.returncode}")
+        await self._terminate(worker)
+        worker.restarts += 1
+        try:
+            await self._launch(worker)
+        except Exception as e:
+            logger.error(f"Failed to restart Blender worker {worker.index}: {str(e)}")
+
+    def _pick(self) -> Worker:
+        healthy = [worker for worker in self.workers if worker.healthy]
+        if not healthy:
+            raise ConnectionError("No healthy Blender workers")
+        return min(healthy, key=lambda worker: (worker.in_flight, worker.busy_time))
+
+    async def submit(self, command: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Run ``command`` on the least-loaded healthy worker."""
+        worker = self._pick()
+        worker.begin()
+        ok = False
+        try:
+            response = await worker.connection.send_command(command, timeout)
+            ok = True
+            return response
+        except ConnectionError:
+            worker.healthy = False
+            raise
+        finally:
+            worker.end(ok)
+
+    async def map(self, commands: List[Dict[str, Any]], timeout: Optional[float] = None) -> List[Any]:
+        """Spread independent commands over the workers; failures are returned as exceptions."""
+        return await asyncio.gather(*(self.submit(command, timeout) for command in commands), return_exceptions=True)
+
+    def summary(self) -> Dict[str, Any]:
+        workers = [worker.summary() for worker in self.workers]
+        return {
+            "size": self.size,
+            "healthy": sum(worker["healthy"] for worker in workers),
+            "in_flight": sum(worker["in_flight"] for worker in workers),
+            "workers": workers,
+        }
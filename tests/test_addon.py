@@ -0,0 +1,200 @@
+"""End-to-end tests of the socket server addon and relay, run against the fake
+``bpy`` in benchmarks/fake_blender."""
+import asyncio
+import json
+import os
+import socket
+import sys
+import threading
+import types
+
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks", "fake_blender"))
+
+import bpy  # noqa: E402  (the fake)
+import blender_mcp_protocol as protocol  # noqa: E402
+import blender_mcp_socket_server as addon  # noqa: E402
+import blender_mcp_stdio_relay as relay  # noqa: E402
+from blender_mcp_workers import free_port  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def port():
+    server = addon.MCPSocketServer(free_port())
+    server.start()
+    assert server.running
+
+    def drive():
+        # What run_headless does: the fake's timers never fire.
+        while server.running:
+            if not addon.run_pending_jobs():
+                addon._jobs_ready.wait(0.01)
+                addon._jobs_ready.clear()
+
+    thread = threading.Thread(target=drive, daemon=True)
+    thread.start()
+    yield server.port
+    server.stop()
+    thread.join(5)
+
+
+def run(port, body, **options):
+    """Run ``body(connection)`` against the addon on a fresh relay connection."""
+    async def main():
+        conn = relay.BlenderConnection(port=port, timeout=10, max_reconnect_attempts=1, **options)
+        try:
+            return await body(conn)
+        finally:
+            await conn.disconnect()
+    return asyncio.run(main())
+
+
+def depsgraph(*blocks, transform=False):
+    updates = [types.SimpleNamespace(id=block, is_updated_transform=transform, is_updated_geometry=False) for block in blocks]
+    return types.SimpleNamespace(updates=updates)
+
+
+def bare_exchange(port, payloads):
+    """Send bare-JSON messages one at a time on one socket and return the replies."""
+    replies = []
+    decoder = protocol.JsonStreamDecoder()
+    with socket.create_connection(("127.0.0.1", port), timeout=5) as sock:
+        for payload in payloads:
+            sock.sendall(payload)
+            messages = []
+            while not messages:
+                data = sock.recv(65536)
+                assert data, "addon closed the connection"
+                messages = decoder.feed(data)
+            replies += messages
+    return replies
+
+
+@pytest.mark.parametrize("codecs", [["json"], protocol.available_codecs()])
+def test_framed_connection_negotiates_codec_and_carries_binary(port, codecs):
+    async def body(conn):
+        assert await conn.connect()
+        assert conn.protocol_version == protocol.PROTOCOL_VERSION
+        assert conn.codec.name == protocol.negotiate_codec(codecs)
+        points = np.arange(12, dtype=np.float32)
+        created = await conn.send_command(relay.build_command("mesh_create_from_buffers", {
+            "object_name": f"Framed_{conn.codec.name}",
+            "vertices": memoryview(points).cast("B"),
+        }))
+        assert created["vertices"] == 4
+        return await conn.send_command(relay.build_command("scene_query", {"fields": ["location"]}))
+
+    response = run(port, body, codecs=codecs, compress_threshold=1)
+    field = response["fields"]["location"]
+    assert field["dtype"] == "<f4"
+    assert bytes(field["data"]) == np.zeros(field["shape"], dtype=np.float32).tobytes()
+
+
+def test_bare_json_client_gets_binary_as_base64(port):
+    async def body(conn):
+        response = await conn.send_command(relay.build_command("scene_query", {"fields": ["scale"]}))
+        assert conn.protocol_version is None
+        return response
+
+    field = run(port, body, use_framing=False)["fields"]["scale"]
+    assert np.frombuffer(protocol.binary_value(field["data"]), dtype="<f4").tolist() == [1.0] * (3 * field["shape"][0])
+
+
+def test_read_only_replies_are_cached_until_the_scene_changes(port):
+    assert {"list_objects", "describe", "test_connection", "scene_query"} <= addon.READ_ONLY_COMMANDS
+
+    async def body(conn):
+        cache = relay.ResponseCache(conn, version_ttl=60)
+        ping = await cache.send_command(relay.build_command("test_connection", {}))
+        assert ping["scene_version"][0] == addon.CHANGE_FEED.feed_id
+        first = await cache.send_command(relay.build_command("list_objects", {}))
+        again = await cache.send_command(relay.build_command("list_objects", {}))
+        assert again["result"] == first["result"]
+        hits = cache.metrics()["hits"]
+        await cache.send_command({"type": "create_object", "params": {"name": "Cached"}})
+        after = await cache.send_command(relay.build_command("list_objects", {}))
+        return hits, first, after, cache.metrics()
+
+    hits, first, after, metrics = run(port, body)
+    assert hits == 1
+    assert "Cached" in after["result"] and "Cached" not in first["result"]
+    assert after["scene_version"][1] > first["scene_version"][1]
+    assert metrics["hits"] == 1
+
+
+def test_change_feed_sends_changes_then_resyncs_after_falling_behind(port, monkeypatch):
+    feed = addon.ChangeFeed(size=3)
+    monkeypatch.setattr(addon, "CHANGE_FEED", feed)
+    feed.reset()
+
+    async def body(conn):
+        mirror = relay.SceneMirror(conn)
+        synced = [await mirror.sync()]
+        added = bpy.data.objects.new("FeedAdded", None)
+        addon._on_depsgraph_update(None, depsgraph(added))
+        synced.append(await mirror.sync())
+        for _ in range(4):
+            addon._on_depsgraph_update(None, depsgraph(added, transform=True))
+        synced.append(await mirror.sync())
+        feed.feed_id = "restarted"
+        synced.append(await mirror.sync())
+        return mirror, synced
+
+    mirror, (initial, incremental, behind, restarted) = run(port, body)
+    assert initial["resync"]
+    assert not incremental["resync"]
+    assert [(c["change"], c["name"]) for c in incremental["changes"]] == [("added", "FeedAdded")]
+    assert behind["resync"] and behind["version"] == feed.version
+    assert restarted["resync"] and mirror.feed_id == "restarted"
+    assert "FeedAdded" in mirror.datablocks["objects"]
+
+
+def test_batch_refs_reuse_earlier_outputs_and_bad_steps_fail_alone(port):
+    async def body(conn):
+        return await conn.send_command(relay.build_batch_command({
+            "mode": "continue_on_error",
+            "commands": [
+                {"tool_name": "mesh_create_from_buffers", "params": {"object_name": "BatchRef", "vertices": [0, 0, 0]}, "id": "made"},
+                "not a step",
+                {"tool_name": "object_delete", "params": {"object_names": [{"$ref": "made.object_name"}]}},
+                {"tool_name": "object_delete", "params": {"object_names": [{"$ref": "missing.object_name"}]}},
+            ],
+        }))
+
+    response = run(port, body)
+    assert (response["completed"], response["failed"]) == (4, 2)
+    made, bad, deleted, unresolved = response["results"]
+    assert made["object_name"] == "BatchRef" and deleted["status"] == "ok"
+    assert "Step 1" in bad["message"]
+    assert "missing" in unresolved["message"]
+    assert "BatchRef" not in bpy.data.objects
+
+
+def test_malformed_messages_get_errors_and_the_connection_keeps_working(port):
+    replies = bare_exchange(port, [b"[1, 2]", b'{"type": ["list"]}', b'{"params": {}}', b'{"type": "test_connection"}'])
+    assert [reply["status"] for reply in replies] == ["error", "error", "error", "ok"]
+    assert "string 'type'" in replies[0]["message"]
+
+    async def body(conn):
+        return await conn.send_command({"type": "test_connection"})
+
+    assert run(port, body)["status"] == "ok"
+
+
+def test_malformed_framed_message_gets_an_error_frame(port):
+    with socket.create_connection(("127.0.0.1", port), timeout=5) as sock:
+        sock.sendall(protocol.encode_json(protocol.hello_request(codecs=["json"])))
+        hello = json.loads(sock.recv(65536))
+        assert hello["protocol_version"] == protocol.PROTOCOL_VERSION
+        decoder = protocol.FrameDecoder()
+        sock.sendall(protocol.encode_frame(7, ["not", "a", "command"]) + protocol.encode_frame(8, {"type": "test_connection"}))
+        frames = []
+        while len(frames) < 2:
+            frames += decoder.feed(sock.recv(65536))
+    replies = {request_id: message for request_id, _flags, message in frames}
+    assert replies[7]["status"] == "error"
+    assert replies[8]["status"] == "ok"
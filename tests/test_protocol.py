@@ -0,0 +1,91 @@
+"""Tests for framing, codecs and the bare-JSON stream decoder in blender_mcp_protocol."""
+import base64
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import blender_mcp_protocol as protocol  # noqa: E402
+
+CHUNK = 64 * 1024
+
+
+def feed_chunks(decoder, data, size):
+    messages = []
+    for i in range(0, len(data), size):
+        messages += decoder.feed(data[i:i + size])
+    return messages
+
+
+def test_large_message_in_chunks_is_decoded_once(monkeypatch):
+    message = {
+        "type": "mesh_create_from_buffers",
+        "params": {
+            "name": "grid {not a bracket}",
+            "vertices": {"$b64": base64.b64encode(os.urandom(3 * 1024 * 1024)).decode()},
+            "faces": [[i, i + 1, i + 2] for i in range(20000)],
+        },
+    }
+    data = json.dumps(message).encode()
+    assert len(data) > 4 * 1024 * 1024
+    loads = []
+    real_loads = protocol.json.loads
+    monkeypatch.setattr(protocol.json, "loads", lambda s: loads.append(len(s)) or real_loads(s))
+    decoder = protocol.JsonStreamDecoder()
+    for i in range(0, len(data) - CHUNK, CHUNK):
+        assert decoder.feed(data[i:i + CHUNK]) == []
+    assert decoder.feed(data[i + CHUNK:]) == [message]
+    assert loads == [len(data)]
+    assert decoder.take_remaining() == b""
+
+
+def test_strings_escapes_and_utf8_split_at_every_byte():
+    messages = [
+        {"text": 'quote \\" and } ] { [ inside', "path": "C:\\temp\\"},
+        {"name": "Würfel ✓", "nested": [{"a": []}, [[]]]},
+        [1, 2, {"b": "\\"}],
+    ]
+    data = b" \n".join(json.dumps(m, ensure_ascii=False).encode() for m in messages)
+    assert feed_chunks(protocol.JsonStreamDecoder(), data, 1) == messages
+
+
+def test_complete_messages_are_returned_and_partial_bytes_kept():
+    decoder = protocol.JsonStreamDecoder()
+    assert decoder.feed(b'{"type": "a"}{"type": "b"}\n{"type": ') == [{"type": "a"}, {"type": "b"}]
+    assert decoder.take_remaining() == b'\n{"type": '
+    assert decoder.feed(b'{"type": "c"}') == [{"type": "c"}]
+
+
+def test_invalid_json_raises_protocol_error():
+    with pytest.raises(protocol.ProtocolError):
+        protocol.JsonStreamDecoder().feed(b'{"type": nope}')
+    with pytest.raises(protocol.ProtocolError):
+        protocol.JsonStreamDecoder().feed(b'{"a": 1}}')
+
+
+@pytest.mark.parametrize("codec_name", protocol.available_codecs())
+def test_frames_with_attachments_and_compression_split_at_every_byte(codec_name):
+    codec = protocol.get_codec(codec_name)
+    message = {"type": "mesh", "params": {"vertices": bytes(range(256)) * 4, "name": "grid " * 100}}
+    data = protocol.encode_frame(1, message, codec) + protocol.encode_frame(2, message, codec, compress_threshold=1)
+    frames = feed_chunks(protocol.FrameDecoder(codec=codec), data, 1)
+    assert [(request_id, bool(flags & protocol.FLAG_COMPRESSED)) for request_id, flags, _ in frames] == [(1, False), (2, True)]
+    for _request_id, _flags, decoded in frames:
+        assert bytes(decoded["params"]["vertices"]) == message["params"]["vertices"]
+        assert decoded["params"]["name"] == message["params"]["name"]
+
+
+def test_codec_negotiation_follows_the_peer_and_falls_back_to_json():
+    assert protocol.negotiate_codec(["nope", "json"]) == "json"
+    assert protocol.negotiate_codec(None) == "json"
+    assert protocol.negotiate_codec(protocol.available_codecs()) == protocol.available_codecs()[0]
+
+
+def test_bad_frame_header_raises_protocol_error():
+    frame = bytearray(protocol.encode_frame(1, {"type": "a"}))
+    frame[:2] = b"XX"
+    with pytest.raises(protocol.ProtocolError):
+        protocol.FrameDecoder().feed(bytes(frame))